@@ -3,6 +3,7 @@ Configuración centralizada de la aplicación SegurosPy
 """
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -13,10 +14,18 @@ class Settings(BaseSettings):
     app_env: str = "development"
     debug: bool = True
     secret_key: str = "cambiar-en-produccion"
+    site_url: str = "https://segurospy.com"  # URL pública (og:url, sitemap)
     
     # Base de datos
     database_url: str = "sqlite+aiosqlite:///./segurospy.db"
     
+    # Perfil SQLite: "produccion" (WAL + PRAGMAs de abajo) o "ninguno"
+    sqlite_perfil: Literal["produccion", "ninguno"] = "produccion"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 20000  # por conexión
+    sqlite_mmap_size_mb: int = 256
+    sqlite_pool_size: int = 5
+    
     # Email
     smtp_host: str = "smtp.gmail.com"
     smtp_port: int = 587
@@ -24,13 +33,77 @@ class Settings(BaseSettings):
     smtp_password: str = ""
     email_from: str = "info@segurospy.com"
     notification_email: str = "info@segurospy.com"
+    smtp_pool_tamano: int = 2  # conexiones SMTP autenticadas que se mantienen abiertas
+    smtp_pool_inactividad: float = 240.0  # segundos antes de descartar una conexión ociosa
+    smtp_timeout: float = 30.0
     
     # Telegram
     telegram_bot_token: str = ""
     telegram_chat_id: str = ""
+    telegram_timeout: float = 10.0
+    telegram_max_conexiones: int = 10
+    telegram_intervalo_chat: float = 1.0  # segundos mínimos entre mensajes al mismo chat
+    telegram_max_reintentos: int = 3  # reintentos tras un 429 (respetando retry_after)
+    
+    # Group commit: agrupar altas concurrentes en una sola transacción (opcional)
+    leads_group_commit: bool = False
+    leads_group_commit_max_lote: int = 64
+    leads_group_commit_espera_ms: float = 5.0
+    
+    # Caché de totales del listado de leads (acota la deriva entre workers)
+    leads_conteo_ttl: float = 30.0
+    
+    # Importación masiva de leads
+    importacion_lote: int = 500  # filas por INSERT
+    importacion_max_errores: int = 1000  # errores detallados en la respuesta
+    
+    # Outbox de notificaciones (worker en segundo plano)
+    outbox_workers: int = 2
+    outbox_intervalo: float = 5.0  # segundos entre sondeos si no hay trabajo
+    outbox_max_intentos: int = 6
+    outbox_backoff_base: float = 30.0  # segundos, se duplica en cada reintento
+    outbox_backoff_max: float = 3600.0
+    outbox_bloqueo: float = 120.0  # segundos que una notificación queda reservada
+    outbox_retencion_dias: int = 30  # las enviadas/descartadas se borran pasado este plazo
     
     # OpenAI
     openai_api_key: str = ""
+    openai_base_url: str = ""  # vacío = API oficial; p. ej. scripts/fake_openai.py para pruebas de carga
+    openai_timeout: float = 15.0  # plazo total por llamada (incluye reintentos)
+    openai_max_reintentos: int = 1
+    openai_max_concurrencia: int = 8  # llamadas simultáneas por worker
+    openai_espera_hueco: float = 2.0  # si no hay hueco en este tiempo, respuesta predefinida
+    openai_circuito_fallos: int = 5  # fallos seguidos que abren el circuito
+    openai_circuito_reapertura: float = 30.0  # segundos con el circuito abierto
+    
+    # Sesiones del chatbot en memoria
+    chat_max_sesiones: int = 2000
+    chat_sesion_ttl: float = 1800.0  # segundos sin actividad antes de olvidar la sesión
+    chat_max_mensajes: int = 20  # turnos guardados por sesión
+    chat_escritura_espera_ms: float = 250.0  # ventana para agrupar turnos en un INSERT
+    chat_escritura_max_lote: int = 200
+    
+    # Caché de respuestas a preguntas sin contexto (primer mensaje de la sesión)
+    chat_cache_respuestas_max: int = 500
+    chat_cache_respuestas_ttl: float = 3600.0
+    
+    # Tokens de historial por llamada a OpenAI (lo que no cabe se resume)
+    chat_presupuesto_historial: int = 600
+    
+    # Límite de mensajes del chat (token bucket por sesión y por IP)
+    chat_limite_almacen: str = "bd"  # "bd" (compartido entre workers) o "memoria"
+    chat_limite_sesion_rafaga: int = 10
+    chat_limite_sesion_por_minuto: float = 10.0
+    chat_limite_ip_rafaga: int = 30
+    chat_limite_ip_por_minuto: float = 30.0
+    chat_limite_max_claves: int = 10000  # solo almacén "memoria"
+    
+    # Índice del blog para el chatbot (python scripts/indexar_blog.py)
+    chat_indice_dir: str = "data/indice_blog"
+    chat_indice_fragmentos: int = 3  # fragmentos que van al prompt
+    chat_indice_umbral_contexto: float = 0.08  # similitud mínima para ir al prompt
+    chat_indice_umbral_directo: float = 0.35  # responder con el enlace sin llamar a OpenAI
+    chat_indice_min_extracto: int = 200  # caracteres mínimos del extracto de una respuesta directa
     
     # Empresa
     company_name: str = "SegurosPy"
@@ -1,16 +1,71 @@
 """
 Configuración de la Base de Datos - SQLAlchemy Async
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
 from models import Base
 
+
+# Perfiles de conexión para SQLite (PRAGMAs aplicados al abrir cada conexión)
+# - WAL: los lectores no bloquean al escritor ni al revés
+# - synchronous=NORMAL: en WAL es seguro ante caídas de la app, y evita un fsync por commit
+# - busy_timeout: esperar al bloqueo de escritura en vez de fallar con "database is locked"
+PERFILES_SQLITE = {
+    "produccion": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "cache_size": -settings.sqlite_cache_size_kb,  # negativo = KiB
+        "mmap_size": settings.sqlite_mmap_size_mb * 1024 * 1024,
+        "temp_store": "MEMORY"
+    },
+    "ninguno": {}
+}
+
+
+def crear_engine(database_url: str, perfil: str = "ninguno", echo: bool = False) -> AsyncEngine:
+    """
+    Crea el motor aplicando el perfil de SQLite si corresponde
+    
+    Con perfil se usa además un pool de conexiones persistentes, para que la
+    caché de páginas y el mmap de cada conexión se reutilicen entre peticiones.
+    """
+    if perfil not in PERFILES_SQLITE:
+        raise ValueError(f"Perfil de SQLite desconocido: {perfil!r} (válidos: {', '.join(PERFILES_SQLITE)})")
+    
+    url = make_url(database_url)
+    pragmas = PERFILES_SQLITE[perfil] if url.get_backend_name() == "sqlite" else {}
+    
+    # WAL y mmap no aplican a bases de datos en memoria
+    if url.database in (None, "", ":memory:"):
+        pragmas = {}
+    
+    opciones = {}
+    if pragmas:
+        opciones = {"poolclass": AsyncAdaptedQueuePool, "pool_size": settings.sqlite_pool_size}
+    
+    motor = create_async_engine(database_url, echo=echo, future=True, **opciones)
+    
+    if pragmas:
+        @event.listens_for(motor.sync_engine, "connect")
+        def _aplicar_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for nombre, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nombre}={valor}")
+            cursor.close()
+    
+    return motor
+
+
 # Motor de base de datos asíncrono
-engine = create_async_engine(
+engine = crear_engine(
     settings.database_url,
-    echo=settings.debug,  # Mostrar SQL en desarrollo
-    future=True
+    perfil=settings.sqlite_perfil,
+    echo=settings.debug  # Mostrar SQL en desarrollo
 )
 
 # Sesión asíncrona
@@ -21,10 +76,18 @@ AsyncSessionLocal = sessionmaker(
 )
 
 
+def _crear_indices(conn):
+    """create_all no añade índices nuevos a tablas que ya existían"""
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(conn, checkfirst=True)
+
+
 async def init_db():
     """Crear todas las tablas en la base de datos"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_crear_indices)
 
 
 async def get_db():
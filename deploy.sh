@@ -12,6 +12,12 @@ source venv/bin/activate
 # Instalar dependencias
 pip install -r requirements.txt
 
+# Índice del blog para el chatbot
+python scripts/indexar_blog.py
+
+# Estáticos con hash y precomprimidos (static/dist)
+python scripts/construir_estaticos.py
+
 # Reiniciar servicio
 sudo systemctl restart segurospy
 
@@ -5,6 +5,7 @@ Equivalente a todo el sistema de segurospy.com pero en Python
 Ejecutar con: uvicorn main:app --reload
 """
 from fastapi import FastAPI
+from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -13,7 +14,14 @@ import logging
 from config import settings
 from database import init_db
 from routers import leads_router, chat_router, pages_router
+from routers.pages import precalentar
+from services.estaticos import EstaticosInmutables
 from tasks import iniciar_tareas, detener_tareas
+from services import (
+    outbox_service, email_service, telegram_service,
+    conteo_leads_service, estadisticas_service, ingesta_service, chatbot_service,
+    conversaciones_service, limitador_chat, cache_paginas
+)
 
 # Configurar logging
 logging.basicConfig(
@@ -27,23 +35,45 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """
     Eventos de ciclo de vida de la aplicación
-    - Al iniciar: crear BD y arrancar tareas
-    - Al cerrar: detener tareas
+    - Al iniciar: crear BD, arrancar tareas y el outbox de notificaciones
+    - Al cerrar: detener tareas y outbox
     """
     logger.info("🚀 Iniciando SegurosPy...")
     
     # Inicializar base de datos
     await init_db()
+    await estadisticas_service.sincronizar()
     logger.info("✅ Base de datos inicializada")
     
     # Iniciar tareas programadas (equivalente a n8n)
     iniciar_tareas()
     logger.info("✅ Tareas programadas activas")
     
+    # Cliente HTTP compartido y cola de envío de Telegram
+    await telegram_service.iniciar()
+    
+    # Workers que envían las notificaciones de leads
+    await outbox_service.iniciar()
+    logger.info("✅ Outbox de notificaciones activo")
+    
+    # Escritura por lotes del historial del chatbot
+    await conversaciones_service.iniciar()
+    
+    # Índice del blog (mmap): se abre ahora y no en la primera pregunta
+    chatbot_service.indice.cargar()
+    
+    # Páginas públicas renderizadas antes de la primera visita
+    logger.info(f"✅ {precalentar()} páginas prerenderizadas")
+    
     yield
     
     # Cleanup
+    await ingesta_service.detener()
+    await conversaciones_service.detener()
+    await outbox_service.detener()
     detener_tareas()
+    await telegram_service.cerrar()
+    await email_service.cerrar()
     logger.info("👋 SegurosPy detenido")
 
 
@@ -82,7 +112,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Montar archivos estáticos (CSS, JS, imágenes)
+# static/sitemap.xml ya no existe: el sitemap se genera desde PAGINAS en
+# /sitemap.xml. Va antes del montaje de /static, que si no se quedaría la ruta
+@app.get("/static/sitemap.xml", include_in_schema=False)
+async def sitemap_antiguo():
+    """Redirección permanente para los buscadores que tenían la URL antigua"""
+    return RedirectResponse("/sitemap.xml", status_code=301)
+
+
+# Montar archivos estáticos (CSS, JS, imágenes). static/dist (build con hash,
+# scripts/construir_estaticos.py) va antes: variantes .br/.gz y caché immutable
+app.mount("/static/dist", EstaticosInmutables(directory="static/dist", check_dir=False), name="static_dist")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Registrar routers
@@ -112,37 +152,29 @@ async def health_check():
 async def get_stats():
     """
     Estadísticas básicas del sistema
+    Se leen del rollup diario (estadisticas_diarias), sin recorrer la tabla de leads
     """
-    from sqlalchemy import select, func
-    from database import AsyncSessionLocal
-    from models import Lead
-    from datetime import datetime, timedelta
-    
-    async with AsyncSessionLocal() as db:
-        # Total leads
-        total_result = await db.execute(select(func.count()).select_from(Lead))
-        total_leads = total_result.scalar()
-        
-        # Leads hoy
-        hoy = datetime.utcnow().date()
-        inicio_dia = datetime.combine(hoy, datetime.min.time())
-        hoy_result = await db.execute(
-            select(func.count()).select_from(Lead).where(Lead.created_at >= inicio_dia)
-        )
-        leads_hoy = hoy_result.scalar()
-        
-        # Leads esta semana
-        inicio_semana = datetime.utcnow() - timedelta(days=7)
-        semana_result = await db.execute(
-            select(func.count()).select_from(Lead).where(Lead.created_at >= inicio_semana)
-        )
-        leads_semana = semana_result.scalar()
-        
-        return {
-            "total_leads": total_leads,
-            "leads_hoy": leads_hoy,
-            "leads_semana": leads_semana
-        }
+    return await estadisticas_service.resumen()
+
+
+@app.get("/api/metricas", tags=["Sistema"])
+async def get_metricas():
+    """
+    Métricas internas de los servicios (pools de conexiones, etc.)
+    """
+    return {
+        "email": email_service.metricas(),
+        "telegram": telegram_service.metricas(),
+        "conteo_leads": conteo_leads_service.metricas(),
+        "ingesta": ingesta_service.metricas(),
+        "chat_sesiones": chatbot_service.metricas(),
+        "chat_respuestas": chatbot_service.cache_respuestas.metricas(),
+        "chat_contexto": chatbot_service.contexto.metricas(),
+        "chat_blog": chatbot_service.indice.metricas(),
+        "openai": chatbot_service.proteccion.metricas(),
+        "chat_limite": limitador_chat.metricas(),
+        "paginas": cache_paginas.metricas()
+    }
 
 
 # =============================================
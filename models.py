@@ -2,7 +2,7 @@
 Modelos de Base de Datos - SQLAlchemy
 Equivalente a las estructuras de datos que manejas en Google Sheets/n8n
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, Enum, Float, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -37,6 +37,11 @@ class Lead(Base):
     Modelo de Lead - Equivalente a lo que guardas en Google Sheets
     """
     __tablename__ = "leads"
+    __table_args__ = (
+        # Listado del CRM filtrado y ordenado por fecha (paginación por cursor)
+        Index("ix_leads_estado_created_at", "estado", "created_at"),
+        Index("ix_leads_tipo_seguro_created_at", "tipo_seguro", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -70,7 +75,7 @@ class Lead(Base):
     user_agent = Column(Text, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     contacted_at = Column(DateTime, nullable=True)
     
@@ -155,6 +160,53 @@ class SolicitudResena(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class NotificacionPendiente(Base):
+    """
+    Outbox de notificaciones - Se escribe en la misma transacción que el Lead
+    y la vacía el worker de notificaciones en segundo plano
+    """
+    __tablename__ = "notificaciones_pendientes"
+    __table_args__ = (
+        Index("ix_notificaciones_estado_proximo", "estado", "proximo_intento"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
+    
+    tipo = Column(String(50), nullable=False)  # email_admin, telegram, email_cliente
+    payload = Column(Text, nullable=False)  # JSON con los datos del lead
+    
+    # Control de reintentos
+    estado = Column(String(20), default="pendiente")  # pendiente, enviada, fallida, descartada
+    intentos = Column(Integer, default=0)
+    proximo_intento = Column(DateTime, default=datetime.utcnow)
+    ultimo_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    enviada_at = Column(DateTime, nullable=True)
+
+
+class EstadisticaDiaria(Base):
+    """
+    Contador de leads por día - Rollup que alimenta /api/stats sin recorrer leads
+    """
+    __tablename__ = "estadisticas_diarias"
+    
+    fecha = Column(Date, primary_key=True)
+    leads = Column(Integer, nullable=False, default=0)
+
+
+class LimiteChat(Base):
+    """
+    Cubetas de tokens del límite de mensajes del chat - Compartidas entre workers
+    """
+    __tablename__ = "limites_chat"
+    
+    clave = Column(String(150), primary_key=True)  # "sesion:<id>" o "ip:<ip>"
+    tokens = Column(Float, nullable=False)
+    actualizado = Column(Float, nullable=False)  # epoch (time.time()) del último consumo
+
+
 class ConfiguracionSEO(Base):
     """
     Configuración SEO por página (equivalente a los meta tags en HTML)
@@ -1,19 +1,38 @@
 """
 Router del Chatbot IA
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+import json
+import math
+
 from schemas import ChatMessage, ChatResponse
-from services import chatbot_service
+from services import chatbot_service, limitador_chat
 
 router = APIRouter(prefix="/api/chat", tags=["Chatbot"])
 
 
+async def _comprobar_limite(mensaje: ChatMessage, request: Request) -> None:
+    """429 con Retry-After si la sesión o la IP superan su límite de mensajes"""
+    ip = request.client.host if request.client else "desconocida"
+    espera = await limitador_chat.consumir(mensaje.session_id, ip)
+    if espera > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiados mensajes seguidos. Espera unos segundos.",
+            headers={"Retry-After": str(math.ceil(espera))}
+        )
+
+
 @router.post("/", response_model=ChatResponse)
-async def chat(mensaje: ChatMessage):
+async def chat(mensaje: ChatMessage, request: Request):
     """
     Endpoint del chatbot IA
     Recibe un mensaje y devuelve la respuesta del asistente
     """
+    await _comprobar_limite(mensaje, request)
+    
     resultado = await chatbot_service.responder(
         mensaje=mensaje.mensaje,
         session_id=mensaje.session_id
@@ -24,3 +43,40 @@ async def chat(mensaje: ChatMessage):
         session_id=resultado["session_id"],
         sugerencias=resultado.get("sugerencias")
     )
+
+
+async def _eventos_sse(mensaje: ChatMessage) -> AsyncIterator[str]:
+    """Traduce los eventos del chatbot al formato text/event-stream"""
+    async for evento, datos in chatbot_service.responder_stream(
+        mensaje=mensaje.mensaje,
+        session_id=mensaje.session_id
+    ):
+        yield f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+@router.delete("/cache")
+async def purgar_cache_respuestas():
+    """
+    Vaciar la caché de respuestas del chatbot (para panel admin)
+    Útil tras cambiar el prompt o los datos de contacto
+    """
+    return {"purgadas": chatbot_service.cache_respuestas.purgar()}
+
+
+@router.post("/stream")
+async def chat_stream(mensaje: ChatMessage, request: Request):
+    """
+    Endpoint del chatbot IA con la respuesta en streaming (Server-Sent Events)
+    
+    Eventos: `inicio` (session_id), `token` (texto) y `fin` (sugerencias)
+    """
+    await _comprobar_limite(mensaje, request)
+    
+    return StreamingResponse(
+        _eventos_sse(mensaje),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Nginx: no acumular la respuesta
+        }
+    )
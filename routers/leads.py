@@ -3,18 +3,22 @@ Router de Leads - API para gestión de leads
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Optional
+from sqlalchemy import select, tuple_
+from typing import Optional, Tuple
 from datetime import datetime
+import base64
+import json
 
 from database import get_db
 from models import Lead
 from schemas import (
     LeadCreate, LeadUpdate, LeadResponse, 
     LeadListResponse, ContactoForm, ContactoResponse,
-    ComparadorForm, ComparadorResponse
+    ComparadorForm, ComparadorResponse, ImportacionLeadsResponse,
+    ModoTotalEnum
 )
-from services import email_service, telegram_service
+from services import ingesta_service, importacion_service, conteo_leads_service
+from services.importacion_service import ErrorFormato
 
 router = APIRouter(prefix="/api/leads", tags=["Leads"])
 
@@ -29,45 +33,23 @@ async def crear_lead(
     Crear un nuevo lead desde el formulario
     Equivalente al webhook de n8n que recibe el formulario
     """
-    # Crear el lead
-    nuevo_lead = Lead(
-        nombre=lead_data.nombre,
-        email=lead_data.email,
-        telefono=lead_data.telefono,
-        tipo_seguro=lead_data.tipo_seguro.value,
-        mensaje=lead_data.mensaje,
-        localidad=lead_data.localidad,
-        codigo_postal=lead_data.codigo_postal,
-        origen=lead_data.origen,
-        landing_page=lead_data.landing_page,
-        utm_source=lead_data.utm_source,
-        utm_medium=lead_data.utm_medium,
-        utm_campaign=lead_data.utm_campaign,
-        ip_address=request.client.host if request.client else None,
-        user_agent=request.headers.get("user-agent")
-    )
-    
-    db.add(nuevo_lead)
-    await db.commit()
-    await db.refresh(nuevo_lead)
-    
-    # Preparar datos para notificaciones
-    lead_dict = {
-        "nombre": nuevo_lead.nombre,
-        "email": nuevo_lead.email,
-        "telefono": nuevo_lead.telefono,
-        "tipo_seguro": nuevo_lead.tipo_seguro,
-        "mensaje": nuevo_lead.mensaje,
-        "origen": nuevo_lead.origen,
-        "created_at": nuevo_lead.created_at.strftime("%d/%m/%Y %H:%M")
-    }
-    
-    # Enviar notificaciones (en background idealmente)
-    await email_service.notificar_nuevo_lead(lead_dict)
-    await telegram_service.notificar_nuevo_lead(lead_dict)
-    await email_service.enviar_confirmacion_cliente(lead_dict)
-    
-    return nuevo_lead
+    # Crear el lead (las notificaciones las envía el outbox)
+    return await ingesta_service.crear(db, {
+        "nombre": lead_data.nombre,
+        "email": lead_data.email,
+        "telefono": lead_data.telefono,
+        "tipo_seguro": lead_data.tipo_seguro.value,
+        "mensaje": lead_data.mensaje,
+        "localidad": lead_data.localidad,
+        "codigo_postal": lead_data.codigo_postal,
+        "origen": lead_data.origen,
+        "landing_page": lead_data.landing_page,
+        "utm_source": lead_data.utm_source,
+        "utm_medium": lead_data.utm_medium,
+        "utm_campaign": lead_data.utm_campaign,
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent")
+    })
 
 
 @router.post("/contacto", response_model=ContactoResponse)
@@ -83,33 +65,21 @@ async def formulario_contacto(
         raise HTTPException(status_code=400, detail="Debe aceptar la política de privacidad")
     
     # Crear lead desde contacto
-    nuevo_lead = Lead(
-        nombre=form.nombre,
-        email=form.email,
-        telefono=form.telefono,
-        tipo_seguro="consulta",
-        mensaje=f"[{form.asunto}] {form.mensaje}",
-        origen="formulario_contacto",
-        ip_address=request.client.host if request.client else None
+    nuevo_lead = await ingesta_service.crear(
+        db,
+        {
+            "nombre": form.nombre,
+            "email": form.email,
+            "telefono": form.telefono,
+            "tipo_seguro": "consulta",
+            "mensaje": f"[{form.asunto}] {form.mensaje}",
+            "origen": "formulario_contacto",
+            "ip_address": request.client.host if request.client else None
+        },
+        tipos=("email_admin", "telegram"),
+        notificacion={"tipo_seguro": "Consulta General", "mensaje": form.mensaje}
     )
     
-    db.add(nuevo_lead)
-    await db.commit()
-    await db.refresh(nuevo_lead)
-    
-    # Notificar
-    lead_dict = {
-        "nombre": form.nombre,
-        "email": form.email,
-        "telefono": form.telefono,
-        "tipo_seguro": "Consulta General",
-        "mensaje": form.mensaje,
-        "origen": "formulario_contacto"
-    }
-    
-    await email_service.notificar_nuevo_lead(lead_dict)
-    await telegram_service.notificar_nuevo_lead(lead_dict)
-    
     return ContactoResponse(
         success=True,
         mensaje="¡Gracias! Hemos recibido tu mensaje. Te contactaremos pronto.",
@@ -142,34 +112,16 @@ async def formulario_comparador(
     mensaje = " | ".join(detalles) if detalles else None
     
     # Crear lead
-    nuevo_lead = Lead(
-        nombre=form.nombre,
-        email=form.email,
-        telefono=form.telefono,
-        tipo_seguro=form.tipo_seguro.value,
-        mensaje=mensaje,
-        codigo_postal=form.codigo_postal,
-        origen="comparador",
-        ip_address=request.client.host if request.client else None
-    )
-    
-    db.add(nuevo_lead)
-    await db.commit()
-    await db.refresh(nuevo_lead)
-    
-    # Notificar
-    lead_dict = {
+    nuevo_lead = await ingesta_service.crear(db, {
         "nombre": form.nombre,
         "email": form.email,
         "telefono": form.telefono,
         "tipo_seguro": form.tipo_seguro.value,
         "mensaje": mensaje,
-        "origen": "comparador"
-    }
-    
-    await email_service.notificar_nuevo_lead(lead_dict)
-    await telegram_service.notificar_nuevo_lead(lead_dict)
-    await email_service.enviar_confirmacion_cliente(lead_dict)
+        "codigo_postal": form.codigo_postal,
+        "origen": "comparador",
+        "ip_address": request.client.host if request.client else None
+    })
     
     return ComparadorResponse(
         success=True,
@@ -178,17 +130,82 @@ async def formulario_comparador(
     )
 
 
+@router.post("/bulk", response_model=ImportacionLeadsResponse)
+async def importar_leads(
+    request: Request,
+    formato: Optional[str] = None,
+    notificar: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importación masiva de leads (migraciones desde Google Sheets o comparadores)
+    
+    El cuerpo se procesa en streaming: NDJSON (un lead por línea) o CSV con
+    cabecera usando los mismos campos que `POST /api/leads/`. Se inserta por
+    lotes y se devuelven los errores por fila. Por defecto no se envía
+    ninguna notificación.
+    """
+    if formato is None:
+        content_type = request.headers.get("content-type", "")
+        formato = "csv" if "csv" in content_type else "ndjson"
+    
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Formato no soportado (ndjson o csv)")
+    
+    try:
+        resultado = await importacion_service.importar(
+            db,
+            request.stream(),
+            formato=formato,
+            notificar=notificar
+        )
+    except ErrorFormato as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return ImportacionLeadsResponse(**resultado)
+
+
+def _codificar_cursor(lead: Lead) -> str:
+    """Cursor opaco a partir de (created_at, id) del último lead de la página"""
+    crudo = json.dumps([lead.created_at.isoformat(), lead.id])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverso de _codificar_cursor"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(created_at), int(lead_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
 @router.get("/", response_model=LeadListResponse)
 async def listar_leads(
     pagina: int = 1,
     por_pagina: int = 20,
     estado: Optional[str] = None,
     tipo_seguro: Optional[str] = None,
+    after: Optional[str] = None,
+    total: ModoTotalEnum = ModoTotalEnum.cache,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Listar leads con paginación y filtros (para panel admin/CRM)
+    
+    Con `after` (el campo `siguiente` de la respuesta anterior) se pagina por
+    cursor sobre (created_at, id): cualquier página cuesta lo mismo que la
+    primera. Sin él se mantiene la paginación clásica por `pagina`; no se
+    pueden combinar (400), y en modo cursor la respuesta lleva `pagina` a null.
+    
+    `total` controla el conteo: `cache` (por defecto, total cacheado por
+    filtro), `exact` (COUNT siempre), `estimate` (aproximado, sin coste) o
+    `none` (sin total, para scroll infinito).
     """
+    if after and pagina != 1:
+        raise HTTPException(status_code=400, detail="Usa 'after' o 'pagina', no ambos")
+    
     query = select(Lead)
     
     # Filtros
@@ -197,31 +214,38 @@ async def listar_leads(
     if tipo_seguro:
         query = query.where(Lead.tipo_seguro == tipo_seguro)
     
-    # Ordenar por más reciente
-    query = query.order_by(Lead.created_at.desc())
-    
-    # Contar total
-    count_query = select(func.count()).select_from(Lead)
-    if estado:
-        count_query = count_query.where(Lead.estado == estado)
-    if tipo_seguro:
-        count_query = count_query.where(Lead.tipo_seguro == tipo_seguro)
+    # Ordenar por más reciente (id desempata leads del mismo instante)
+    query = query.order_by(Lead.created_at.desc(), Lead.id.desc())
     
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # Contar total (desde la caché por filtro salvo que se pida otra cosa)
+    total_leads = await conteo_leads_service.contar(
+        db, estado=estado, tipo_seguro=tipo_seguro, modo=total.value
+    )
     
-    # Paginar
-    offset = (pagina - 1) * por_pagina
-    query = query.offset(offset).limit(por_pagina)
+    # Paginar: por cursor si viene `after`, si no por offset
+    if after:
+        created_at, lead_id = _decodificar_cursor(after)
+        # Comparación de filas: SQLite busca directamente en el índice de
+        # created_at (con OR recorrería el índice desde el lead más reciente)
+        query = query.where(tuple_(Lead.created_at, Lead.id) < tuple_(created_at, lead_id))
+    else:
+        query = query.offset((pagina - 1) * por_pagina)
     
-    result = await db.execute(query)
+    # Pedir uno más para saber si hay página siguiente
+    result = await db.execute(query.limit(por_pagina + 1))
     leads = result.scalars().all()
     
+    siguiente = None
+    if len(leads) > por_pagina:
+        leads = leads[:por_pagina]
+        siguiente = _codificar_cursor(leads[-1])
+    
     return LeadListResponse(
-        total=total,
-        pagina=pagina,
+        total=total_leads,
+        pagina=None if after else pagina,
         por_pagina=por_pagina,
-        leads=leads
+        leads=leads,
+        siguiente=siguiente
     )
 
 
@@ -254,6 +278,8 @@ async def actualizar_lead(
     if not lead:
         raise HTTPException(status_code=404, detail="Lead no encontrado")
     
+    estado_anterior = lead.estado
+    
     # Actualizar campos
     if update_data.estado:
         lead.estado = update_data.estado.value
@@ -268,5 +294,6 @@ async def actualizar_lead(
     
     await db.commit()
     await db.refresh(lead)
+    conteo_leads_service.registrar_cambio_estado(lead.tipo_seguro, estado_anterior, lead.estado)
     
     return lead
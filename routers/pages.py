@@ -1,271 +1,273 @@
 """
 Router de Páginas - Renderiza las vistas HTML con Jinja2
 Enfocado en Sierra de Madrid Noroeste
+
+Todas las páginas públicas están en la tabla PAGINAS: de ella salen las
+rutas, el sitemap.xml y la lista de páginas que se prerenderizan al
+arrancar. Añadir una landing es añadir una fila (y su plantilla).
 """
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional
+from xml.sax.saxutils import escape
+import logging
+
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, Response
+
+from config import settings
+from services.cache_paginas import cache_paginas
+from services.estaticos import asset_url, css_critico, imagen, manifiesto
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Páginas"])
 
-# Configurar templates
-templates = Jinja2Templates(directory="templates")
+# Templates (las páginas se sirven prerenderizadas desde cache_paginas)
+templates = cache_paginas.templates
+templates.env.globals["asset_url"] = asset_url
+templates.env.globals["imagen"] = imagen
+templates.env.globals["css_critico"] = css_critico
 
 # Zona de servicio
 ZONA = "Sierra de Madrid"
 LOCALIDADES = "Villalba, Galapagar, Alpedrete, Torrelodones, Guadarrama, Los Molinos y Cercedilla"
 
 
-# =============================================
-# PÁGINAS PRINCIPALES
-# =============================================
-
-@router.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    """Página principal"""
-    return templates.TemplateResponse(
-        "pages/index.html",
-        {
-            "request": request,
-            "titulo": f"SegurosPy - Tu Agente de Seguros en la {ZONA} 💜",
-            "meta_description": f"Agente de seguros en {LOCALIDADES}. Comparamos más de 20 aseguradoras para ofrecerte el mejor precio. ¡Ahorra hasta un 40%!"
-        }
-    )
-
-
-@router.get("/seguro-hogar", response_class=HTMLResponse)
-async def seguro_hogar(request: Request):
-    """Página de seguro de hogar"""
-    return templates.TemplateResponse(
-        "pages/seguro-hogar.html",
-        {
-            "request": request,
-            "titulo": f"Seguro de Hogar en {ZONA} | SegurosPy",
-            "meta_description": f"Protege tu hogar en {LOCALIDADES}. Comparamos todas las aseguradoras para encontrarte el mejor precio."
-        }
-    )
-
-
-@router.get("/seguro-coche", response_class=HTMLResponse)
-async def seguro_coche(request: Request):
-    """Página de seguro de coche"""
-    return templates.TemplateResponse(
-        "pages/seguro-coche.html",
-        {
-            "request": request,
-            "titulo": f"Seguro de Coche en {ZONA} | SegurosPy",
-            "meta_description": f"Ahorra hasta un 40% en tu seguro de coche en {LOCALIDADES}. Terceros, todo riesgo y franquicia."
-        }
-    )
-
-
-@router.get("/seguro-vida", response_class=HTMLResponse)
-async def seguro_vida(request: Request):
-    """Página de seguro de vida"""
-    return templates.TemplateResponse(
-        "pages/seguro-vida.html",
-        {
-            "request": request,
-            "titulo": f"Seguro de Vida en {ZONA} | SegurosPy",
-            "meta_description": f"Protege el futuro de tu familia con un seguro de vida. Asesoramiento gratuito en {LOCALIDADES}."
-        }
-    )
-
-
-@router.get("/seguro-decesos", response_class=HTMLResponse)
-async def seguro_decesos(request: Request):
-    """Página de seguro de decesos"""
-    return templates.TemplateResponse(
-        "pages/seguro-decesos.html",
-        {
-            "request": request,
-            "titulo": f"Seguro de Decesos en {ZONA} | SegurosPy",
-            "meta_description": f"Tranquilidad para ti y tu familia en {LOCALIDADES}. Seguro de decesos con todas las gestiones incluidas."
-        }
-    )
-
-
-@router.get("/seguro-salud", response_class=HTMLResponse)
-async def seguro_salud(request: Request):
-    """Página de seguro de salud"""
-    return templates.TemplateResponse(
-        "pages/seguro-salud.html",
-        {
-            "request": request,
-            "titulo": f"Seguro de Salud en {ZONA} | SegurosPy",
-            "meta_description": f"Accede a los mejores especialistas sin esperas. Seguros de salud en {LOCALIDADES}."
-        }
-    )
-
-
-@router.get("/seguro-mujer", response_class=HTMLResponse)
-async def seguro_mujer(request: Request):
-    """Página de seguro exclusivo para mujeres - Producto estrella"""
-    return templates.TemplateResponse(
-        "pages/seguro-mujer.html",
-        {
-            "request": request,
-            "titulo": f"Seguro Exclusivo para Ti que Eres Mujer | {ZONA} | SegurosPy",
-            "meta_description": f"Seguro exclusivo para mujeres con asistencia oncológica, vida diaria, gestión de sucesiones y bonus por no siniestralidad. Villalba, Galapagar y Sierra de Madrid."
-        }
-    )
-
-
-@router.get("/comparador", response_class=HTMLResponse)
-async def comparador(request: Request):
-    """Comparador de seguros"""
-    return templates.TemplateResponse(
-        "pages/comparador.html",
-        {
-            "request": request,
-            "titulo": f"Comparador de Seguros en {ZONA} | SegurosPy",
-            "meta_description": f"Compara seguros en {LOCALIDADES}. Más de 20 aseguradoras. Cotización en 2 minutos."
-        }
-    )
-
-
-@router.get("/blog", response_class=HTMLResponse)
-async def blog(request: Request):
-    """Blog de seguros"""
-    return templates.TemplateResponse(
-        "pages/blog.html",
-        {
-            "request": request,
-            "titulo": "Blog de Seguros | SegurosPy",
-            "meta_description": "Artículos y guías sobre seguros. Aprende a elegir el mejor seguro para ti."
+class PaginaWeb(NamedTuple):
+    """Página pública: ruta, plantilla, SEO y su entrada en el sitemap"""
+    ruta: str
+    nombre: str  # nombre de la ruta (url_for)
+    resumen: str  # descripción en /docs
+    plantilla: str
+    titulo: str
+    meta_description: str
+    prioridad: Optional[float] = None  # None: fuera del sitemap
+    frecuencia: str = "monthly"
+    
+    def contexto(self) -> Dict:
+        """Variables de la plantilla (iguales en todas las peticiones)"""
+        return {
+            "titulo": self.titulo,
+            "meta_description": self.meta_description,
+            "url_canonica": f"{settings.site_url}{self.ruta}",
+            "plantilla": self.plantilla
         }
-    )
-
-
-@router.get("/contacto", response_class=HTMLResponse)
-async def contacto(request: Request):
-    """Página de contacto"""
-    return templates.TemplateResponse(
-        "pages/contacto.html",
-        {
-            "request": request,
-            "titulo": "Contacto | SegurosPy",
-            "meta_description": f"Contacta con SegurosPy. Teléfono: 647 801 213. Email: norte.oficina.villalba@gmail.com. {LOCALIDADES}"
-        }
-    )
-
-
-@router.get("/politica-privacidad", response_class=HTMLResponse)
-async def privacidad(request: Request):
-    """Política de privacidad"""
-    return templates.TemplateResponse(
-        "pages/privacidad.html",
-        {
-            "request": request,
-            "titulo": "Política de Privacidad | SegurosPy",
-            "meta_description": "Política de privacidad y protección de datos de SegurosPy."
-        }
-    )
-
-
-@router.get("/aviso-legal", response_class=HTMLResponse)
-async def aviso_legal(request: Request):
-    """Aviso legal"""
-    return templates.TemplateResponse(
-        "pages/aviso-legal.html",
-        {
-            "request": request,
-            "titulo": "Aviso Legal | SegurosPy",
-            "meta_description": "Aviso legal y condiciones de uso de SegurosPy."
-        }
-    )
 
 
-@router.get("/cookies", response_class=HTMLResponse)
-async def cookies(request: Request):
-    """Política de cookies"""
-    return templates.TemplateResponse(
-        "pages/cookies.html",
-        {
-            "request": request,
-            "titulo": "Política de Cookies | SegurosPy",
-            "meta_description": "Información sobre el uso de cookies en SegurosPy."
-        }
-    )
+PAGINAS: List[PaginaWeb] = [
+    # =============================================
+    # PÁGINAS PRINCIPALES
+    # =============================================
+    PaginaWeb(
+        "/", "home", "Página principal", "pages/index.html",
+        titulo=f"SegurosPy - Tu Agente de Seguros en la {ZONA} 💜",
+        meta_description=f"Agente de seguros en {LOCALIDADES}. Comparamos más de 20 aseguradoras para ofrecerte el mejor precio. ¡Ahorra hasta un 40%!",
+        prioridad=1.0, frecuencia="weekly"
+    ),
+    PaginaWeb(
+        "/seguro-hogar", "seguro_hogar", "Página de seguro de hogar", "pages/seguro-hogar.html",
+        titulo=f"Seguro de Hogar en {ZONA} | SegurosPy",
+        meta_description=f"Protege tu hogar en {LOCALIDADES}. Comparamos todas las aseguradoras para encontrarte el mejor precio.",
+        prioridad=0.9
+    ),
+    PaginaWeb(
+        "/seguro-coche", "seguro_coche", "Página de seguro de coche", "pages/seguro-coche.html",
+        titulo=f"Seguro de Coche en {ZONA} | SegurosPy",
+        meta_description=f"Ahorra hasta un 40% en tu seguro de coche en {LOCALIDADES}. Terceros, todo riesgo y franquicia.",
+        prioridad=0.9
+    ),
+    PaginaWeb(
+        "/seguro-vida", "seguro_vida", "Página de seguro de vida", "pages/seguro-vida.html",
+        titulo=f"Seguro de Vida en {ZONA} | SegurosPy",
+        meta_description=f"Protege el futuro de tu familia con un seguro de vida. Asesoramiento gratuito en {LOCALIDADES}.",
+        prioridad=0.9
+    ),
+    PaginaWeb(
+        "/seguro-decesos", "seguro_decesos", "Página de seguro de decesos", "pages/seguro-decesos.html",
+        titulo=f"Seguro de Decesos en {ZONA} | SegurosPy",
+        meta_description=f"Tranquilidad para ti y tu familia en {LOCALIDADES}. Seguro de decesos con todas las gestiones incluidas.",
+        prioridad=0.9
+    ),
+    PaginaWeb(
+        "/seguro-salud", "seguro_salud", "Página de seguro de salud", "pages/seguro-salud.html",
+        titulo=f"Seguro de Salud en {ZONA} | SegurosPy",
+        meta_description=f"Accede a los mejores especialistas sin esperas. Seguros de salud en {LOCALIDADES}.",
+        prioridad=0.9
+    ),
+    PaginaWeb(
+        "/seguro-mujer", "seguro_mujer", "Página de seguro exclusivo para mujeres - Producto estrella", "pages/seguro-mujer.html",
+        titulo=f"Seguro Exclusivo para Ti que Eres Mujer | {ZONA} | SegurosPy",
+        meta_description="Seguro exclusivo para mujeres con asistencia oncológica, vida diaria, gestión de sucesiones y bonus por no siniestralidad. Villalba, Galapagar y Sierra de Madrid.",
+        prioridad=0.95
+    ),
+    PaginaWeb(
+        "/comparador", "comparador", "Comparador de seguros", "pages/comparador.html",
+        titulo=f"Comparador de Seguros en {ZONA} | SegurosPy",
+        meta_description=f"Compara seguros en {LOCALIDADES}. Más de 20 aseguradoras. Cotización en 2 minutos.",
+        prioridad=0.9, frecuencia="weekly"
+    ),
+    PaginaWeb(
+        "/blog", "blog", "Blog de seguros", "pages/blog.html",
+        titulo="Blog de Seguros | SegurosPy",
+        meta_description="Artículos y guías sobre seguros. Aprende a elegir el mejor seguro para ti.",
+        prioridad=0.8, frecuencia="weekly"
+    ),
+    PaginaWeb(
+        "/contacto", "contacto", "Página de contacto", "pages/contacto.html",
+        titulo="Contacto | SegurosPy",
+        meta_description=f"Contacta con SegurosPy. Teléfono: 647 801 213. Email: norte.oficina.villalba@gmail.com. {LOCALIDADES}"
+    ),
+    PaginaWeb(
+        "/politica-privacidad", "privacidad", "Política de privacidad", "pages/privacidad.html",
+        titulo="Política de Privacidad | SegurosPy",
+        meta_description="Política de privacidad y protección de datos de SegurosPy.",
+        prioridad=0.3, frecuencia="yearly"
+    ),
+    PaginaWeb(
+        "/aviso-legal", "aviso_legal", "Aviso legal", "pages/aviso-legal.html",
+        titulo="Aviso Legal | SegurosPy",
+        meta_description="Aviso legal y condiciones de uso de SegurosPy."
+    ),
+    PaginaWeb(
+        "/cookies", "cookies", "Política de cookies", "pages/cookies.html",
+        titulo="Política de Cookies | SegurosPy",
+        meta_description="Información sobre el uso de cookies en SegurosPy."
+    ),
+    
+    # =============================================
+    # ARTÍCULOS DEL BLOG - SEO
+    # =============================================
+    PaginaWeb(
+        "/blog/seguro-hogar-villalba-guia-completa", "blog_seguro_hogar_villalba",
+        "Artículo SEO: Seguro de hogar en Collado Villalba",
+        "pages/blog/seguro-hogar-villalba-guia-completa.html",
+        titulo="Seguro de Hogar en Collado Villalba: Guía Completa 2024 | SegurosPy",
+        meta_description="Todo sobre seguro de hogar en Collado Villalba, Galapagar, Alpedrete y Sierra de Madrid. Coberturas, precios y cómo ahorrar hasta 40%.",
+        prioridad=0.7
+    ),
+    PaginaWeb(
+        "/blog/seguro-coche-galapagar-mejores-ofertas", "blog_seguro_coche_galapagar",
+        "Artículo SEO: Seguro de coche en Galapagar",
+        "pages/blog/seguro-coche-galapagar-mejores-ofertas.html",
+        titulo="Seguro de Coche en Galapagar: Mejores Ofertas 2024 | SegurosPy",
+        meta_description="Compara seguros de coche en Galapagar, Villalba y Sierra de Madrid. Terceros desde 180€/año. Todo riesgo con franquicia al mejor precio.",
+        prioridad=0.7
+    ),
+    PaginaWeb(
+        "/blog/seguro-decesos-sierra-madrid-todo-incluido", "blog_seguro_decesos",
+        "Artículo SEO: Seguro de decesos en la Sierra de Madrid",
+        "pages/blog/seguro-decesos-sierra-madrid-todo-incluido.html",
+        titulo="Seguro de Decesos en Sierra de Madrid: ¿Qué Incluye? | SegurosPy",
+        meta_description="Descubre qué cubre el seguro de decesos. Servicio 24h, traslados, gestiones incluidas. Desde 5€/mes en Villalba, Galapagar y toda la Sierra.",
+        prioridad=0.7
+    ),
+    PaginaWeb(
+        "/blog/seguro-mujer-coberturas-exclusivas", "blog_seguro_mujer",
+        "Artículo SEO: Seguro exclusivo para mujeres",
+        "pages/blog/seguro-mujer-coberturas-exclusivas.html",
+        titulo="Seguro Exclusivo para Mujeres: 6 Coberturas que No Conocías | SegurosPy",
+        meta_description="Seguro exclusivo para mujeres con asistencia oncológica, vida diaria, gestión de sucesiones y más. Pensado para ti, trabajes o no.",
+        prioridad=0.7
+    ),
+    PaginaWeb(
+        "/blog/como-ahorrar-seguro-hogar-alpedrete", "blog_ahorrar_seguro",
+        "Artículo SEO: Cómo ahorrar en seguro de hogar",
+        "pages/blog/como-ahorrar-seguro-hogar-alpedrete.html",
+        titulo="Cómo Ahorrar en tu Seguro de Hogar en Alpedrete y Torrelodones | SegurosPy",
+        meta_description="7 trucos para reducir la prima de tu seguro de hogar sin perder coberturas. Ahorra hasta 200€ al año en la Sierra de Madrid.",
+        prioridad=0.7
+    ),
+    PaginaWeb(
+        "/blog/seguro-mascotas-sierra-guadarrama", "blog_seguro_mascotas",
+        "Artículo SEO: Seguro de mascotas en la Sierra",
+        "pages/blog/seguro-mascotas-sierra-guadarrama.html",
+        titulo="Seguro de Mascotas en Sierra de Guadarrama: Guía 2024 | SegurosPy",
+        meta_description="Protege a tu perro o gato. Seguro de mascotas con cobertura veterinaria, responsabilidad civil y asistencia en viaje. Sierra de Madrid.",
+        prioridad=0.7
+    ),
+]
 
 
 # =============================================
-# ARTÍCULOS DEL BLOG - SEO
+# RUTAS
 # =============================================
 
-@router.get("/blog/seguro-hogar-villalba-guia-completa", response_class=HTMLResponse)
-async def blog_seguro_hogar_villalba(request: Request):
-    """Artículo SEO: Seguro de hogar en Collado Villalba"""
-    return templates.TemplateResponse(
-        "pages/blog/seguro-hogar-villalba-guia-completa.html",
-        {
-            "request": request,
-            "titulo": "Seguro de Hogar en Collado Villalba: Guía Completa 2024 | SegurosPy",
-            "meta_description": "Todo sobre seguro de hogar en Collado Villalba, Galapagar, Alpedrete y Sierra de Madrid. Coberturas, precios y cómo ahorrar hasta 40%."
-        }
-    )
+def _vista(pagina: PaginaWeb) -> Callable:
+    """Endpoint de una página: respuesta desde la caché (ETag y 304)"""
+    contexto = pagina.contexto()
 
+    async def vista(request: Request) -> Response:
+        return cache_paginas.respuesta(request, pagina.plantilla, contexto)
 
-@router.get("/blog/seguro-coche-galapagar-mejores-ofertas", response_class=HTMLResponse)
-async def blog_seguro_coche_galapagar(request: Request):
-    """Artículo SEO: Seguro de coche en Galapagar"""
-    return templates.TemplateResponse(
-        "pages/blog/seguro-coche-galapagar-mejores-ofertas.html",
-        {
-            "request": request,
-            "titulo": "Seguro de Coche en Galapagar: Mejores Ofertas 2024 | SegurosPy",
-            "meta_description": "Compara seguros de coche en Galapagar, Villalba y Sierra de Madrid. Terceros desde 180€/año. Todo riesgo con franquicia al mejor precio."
-        }
-    )
+    vista.__name__ = pagina.nombre
+    vista.__doc__ = pagina.resumen
+    return vista
 
 
-@router.get("/blog/seguro-decesos-sierra-madrid-todo-incluido", response_class=HTMLResponse)
-async def blog_seguro_decesos(request: Request):
-    """Artículo SEO: Seguro de decesos en la Sierra de Madrid"""
-    return templates.TemplateResponse(
-        "pages/blog/seguro-decesos-sierra-madrid-todo-incluido.html",
-        {
-            "request": request,
-            "titulo": "Seguro de Decesos en Sierra de Madrid: ¿Qué Incluye? | SegurosPy",
-            "meta_description": "Descubre qué cubre el seguro de decesos. Servicio 24h, traslados, gestiones incluidas. Desde 5€/mes en Villalba, Galapagar y toda la Sierra."
-        }
+for _pagina in PAGINAS:
+    router.add_api_route(
+        _pagina.ruta,
+        _vista(_pagina),
+        methods=["GET"],
+        response_class=HTMLResponse,
+        name=_pagina.nombre
     )
 
 
-@router.get("/blog/seguro-mujer-coberturas-exclusivas", response_class=HTMLResponse)
-async def blog_seguro_mujer(request: Request):
-    """Artículo SEO: Seguro exclusivo para mujeres"""
-    return templates.TemplateResponse(
-        "pages/blog/seguro-mujer-coberturas-exclusivas.html",
-        {
-            "request": request,
-            "titulo": "Seguro Exclusivo para Mujeres: 6 Coberturas que No Conocías | SegurosPy",
-            "meta_description": "Seguro exclusivo para mujeres con asistencia oncológica, vida diaria, gestión de sucesiones y más. Pensado para ti, trabajes o no."
-        }
-    )
+def precalentar() -> int:
+    """
+    Renderiza todas las páginas de PAGINAS (al arrancar la aplicación)
 
+    Returns:
+        int: Páginas renderizadas (las que fallan quedan en el log)
+    """
+    renderizadas = 0
+    for pagina in PAGINAS:
+        try:
+            cache_paginas.obtener(pagina.plantilla, pagina.contexto())
+            renderizadas += 1
+        except Exception as e:
+            logger.warning(f"No se pudo prerenderizar {pagina.ruta} ({pagina.plantilla}): {e!r}")
+    return renderizadas
 
-@router.get("/blog/como-ahorrar-seguro-hogar-alpedrete", response_class=HTMLResponse)
-async def blog_ahorrar_seguro(request: Request):
-    """Artículo SEO: Cómo ahorrar en seguro de hogar"""
-    return templates.TemplateResponse(
-        "pages/blog/como-ahorrar-seguro-hogar-alpedrete.html",
-        {
-            "request": request,
-            "titulo": "Cómo Ahorrar en tu Seguro de Hogar en Alpedrete y Torrelodones | SegurosPy",
-            "meta_description": "7 trucos para reducir la prima de tu seguro de hogar sin perder coberturas. Ahorra hasta 200€ al año en la Sierra de Madrid."
-        }
-    )
 
+# =============================================
+# SITEMAP
+# =============================================
 
-@router.get("/blog/seguro-mascotas-sierra-guadarrama", response_class=HTMLResponse)
-async def blog_seguro_mascotas(request: Request):
-    """Artículo SEO: Seguro de mascotas en la Sierra"""
-    return templates.TemplateResponse(
-        "pages/blog/seguro-mascotas-sierra-guadarrama.html",
-        {
-            "request": request,
-            "titulo": "Seguro de Mascotas en Sierra de Guadarrama: Guía 2024 | SegurosPy",
-            "meta_description": "Protege a tu perro o gato. Seguro de mascotas con cobertura veterinaria, responsabilidad civil y asistencia en viaje. Sierra de Madrid."
-        }
+@lru_cache(maxsize=1)
+def generar_sitemap() -> bytes:
+    """sitemap.xml con las páginas de PAGINAS que tienen prioridad"""
+    entradas = []
+    for pagina in PAGINAS:
+        if pagina.prioridad is None:
+            continue
+        # Fecha del último commit de la plantilla, calculada en el build
+        # (construir_fechas); el mtime no sirve: git no lo conserva y en el
+        # servidor es la hora del checkout. Sin fecha, sin <lastmod>
+        fecha = manifiesto.fecha(pagina.plantilla)
+        lastmod = f"        <lastmod>{fecha}</lastmod>\n" if fecha else ""
+        entradas.append(
+            "    <url>\n"
+            f"        <loc>{escape(settings.site_url + pagina.ruta)}</loc>\n"
+            f"{lastmod}"
+            f"        <changefreq>{pagina.frecuencia}</changefreq>\n"
+            f"        <priority>{pagina.prioridad}</priority>\n"
+            "    </url>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + "\n".join(entradas)
+        + "\n</urlset>\n"
+    ).encode("utf-8")
+
+
+@router.get("/sitemap.xml", include_in_schema=False)
+async def sitemap():
+    """Sitemap generado desde PAGINAS"""
+    return Response(
+        content=generar_sitemap(),
+        media_type="application/xml",
+        headers={"Cache-Control": "public, max-age=3600"}
     )
@@ -31,6 +31,14 @@ class EstadoLeadEnum(str, Enum):
     cerrado_perdido = "cerrado_perdido"
 
 
+class ModoTotalEnum(str, Enum):
+    """Cómo calcular el total del listado de leads"""
+    cache = "cache"
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
 # ===========================================
 # LEADS
 # ===========================================
@@ -78,10 +86,25 @@ class LeadResponse(LeadBase):
 
 class LeadListResponse(BaseModel):
     """Lista paginada de leads"""
-    total: int
-    pagina: int
+    total: Optional[int]  # None si se pidió total=none
+    pagina: Optional[int]  # None al paginar por cursor
     por_pagina: int
     leads: List[LeadResponse]
+    siguiente: Optional[str] = None  # Cursor opaco para pedir la página siguiente
+
+
+class ErrorImportacion(BaseModel):
+    """Error de validación de una fila importada"""
+    fila: int
+    errores: List[str]
+
+
+class ImportacionLeadsResponse(BaseModel):
+    """Resultado de una importación masiva de leads"""
+    procesadas: int
+    insertadas: int
+    con_errores: int
+    errores: List[ErrorImportacion]
 
 
 # ===========================================
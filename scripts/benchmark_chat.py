@@ -0,0 +1,172 @@
+"""
+Benchmark de carga del chat contra un OpenAI local (scripts/fake_openai.py)
+
+Uso: python scripts/benchmark_chat.py [--sesiones 50] [--mensajes 5]
+                                      [--latencia 0.5] [--errores 0.0]
+                                      [--colgado 0.0] [--stream]
+
+Levanta en el mismo proceso el servidor fake de OpenAI y la aplicación
+(uvicorn, con su lifespan y una base de datos SQLite temporal), y lanza N
+sesiones concurrentes que envían M mensajes seguidos a /api/chat/ (o a
+/api/chat/stream con --stream, midiendo también el primer token).
+
+Informa de latencias p50/p95/p99, porcentaje de respuestas predefinidas
+(fallback), crecimiento del RSS del proceso y tamaño del historial en
+memoria de ChatbotService.conversaciones.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, '.')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PUERTO_FAKE = 8761
+PUERTO_APP = 8762
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/benchmark.db"
+os.environ["DEBUG"] = "false"
+os.environ["OPENAI_API_KEY"] = "sk-fake"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PUERTO_FAKE}/v1"
+# Todas las sesiones salen de 127.0.0.1: el límite por IP no debe intervenir
+os.environ["CHAT_LIMITE_ALMACEN"] = "memoria"
+os.environ["CHAT_LIMITE_IP_RAFAGA"] = "1000000"
+os.environ["CHAT_LIMITE_IP_POR_MINUTO"] = "1000000"
+os.environ["CHAT_LIMITE_SESION_RAFAGA"] = "1000000"
+os.environ["CHAT_LIMITE_SESION_POR_MINUTO"] = "1000000"
+# Se mide el camino de OpenAI: sin respuestas directas del índice del blog
+os.environ["CHAT_INDICE_UMBRAL_DIRECTO"] = "2"
+
+import logging
+logging.disable(logging.ERROR)
+
+import httpx
+import uvicorn
+
+from fake_openai import Comportamiento, RESPUESTA_FAKE, crear_app
+
+
+def rss_mb() -> float:
+    """RSS actual del proceso en MiB (Linux; 0 si no está disponible)"""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def percentiles(valores):
+    if len(valores) < 2:
+        return {p: (valores[0] if valores else 0.0) for p in (50, 95, 99)}
+    cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return {50: cortes[49], 95: cortes[94], 99: cortes[98]}
+
+
+async def sesion(cliente: httpx.AsyncClient, n: int, mensajes: int, stream: bool, resultados: dict):
+    """Una conversación: `mensajes` preguntas seguidas con el mismo session_id"""
+    session_id = None
+    for m in range(mensajes):
+        cuerpo = {"mensaje": f"Sesión {n}, pregunta {m}: ¿qué cubre el seguro de hogar?", "session_id": session_id}
+        inicio = time.perf_counter()
+        try:
+            if stream:
+                texto, primero = "", None
+                async with cliente.stream("POST", "/api/chat/stream", json=cuerpo) as r:
+                    async for linea in r.aiter_lines():
+                        if linea.startswith("data:") and '"texto"' in linea:
+                            primero = primero or time.perf_counter() - inicio
+                            texto += linea
+                        elif linea.startswith("data:") and '"session_id"' in linea:
+                            session_id = linea.split('"session_id": "')[1].split('"')[0]
+                resultados["primer_token"].append(primero or 0.0)
+            else:
+                r = await cliente.post("/api/chat/", json=cuerpo)
+                r.raise_for_status()
+                datos = r.json()
+                texto, session_id = datos["respuesta"], datos["session_id"]
+        except Exception:
+            resultados["errores"] += 1
+            continue
+        
+        resultados["latencias"].append(time.perf_counter() - inicio)
+        if RESPUESTA_FAKE not in texto:
+            resultados["fallback"] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sesiones", type=int, default=50)
+    parser.add_argument("--mensajes", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.5)
+    parser.add_argument("--errores", type=float, default=0.0)
+    parser.add_argument("--colgado", type=float, default=0.0)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+    
+    fake = uvicorn.Server(uvicorn.Config(
+        crear_app(Comportamiento(latencia=args.latencia, errores=args.errores, colgado=args.colgado)),
+        port=PUERTO_FAKE, log_level="warning"
+    ))
+    
+    from main import app
+    from services import chatbot_service
+    servidor = uvicorn.Server(uvicorn.Config(app, port=PUERTO_APP, log_level="warning"))
+    
+    tareas = [asyncio.create_task(fake.serve()), asyncio.create_task(servidor.serve())]
+    while not (fake.started and servidor.started):
+        await asyncio.sleep(0.05)
+    
+    resultados = {"latencias": [], "primer_token": [], "fallback": 0, "errores": 0}
+    limites = httpx.Limits(max_connections=args.sesiones, max_keepalive_connections=args.sesiones)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PUERTO_APP}", timeout=120, limits=limites) as cliente:
+        # Calentamiento (imports perezosos, conexiones, tablas)
+        await cliente.post("/api/chat/", json={"mensaje": "hola"})
+        
+        rss_inicial = rss_mb()
+        inicio = time.perf_counter()
+        await asyncio.gather(*[
+            sesion(cliente, n, args.mensajes, args.stream, resultados)
+            for n in range(args.sesiones)
+        ])
+        duracion = time.perf_counter() - inicio
+        rss_final = rss_mb()
+    
+    servidor.should_exit = True
+    fake.should_exit = True
+    await asyncio.gather(*tareas)
+    
+    completados = len(resultados["latencias"])
+    total = completados + resultados["errores"]
+    print(f"{args.sesiones} sesiones x {args.mensajes} mensajes "
+          f"(OpenAI fake: latencia {args.latencia}s, errores {args.errores:.0%}, colgado {args.colgado:.0%})")
+    if not completados:
+        # Servidor caído, --mensajes 0...: no hay nada que medir
+        print(f"❌ Sin resultados: {total} peticiones, {resultados['errores']} errores HTTP")
+        return 1
+    
+    p = percentiles(resultados["latencias"])
+    print(f"  {total / duracion:8.1f} mensajes/s en {duracion:.1f} s")
+    print(f"  latencia     p50={p[50] * 1000:7.0f} ms  p95={p[95] * 1000:7.0f} ms  p99={p[99] * 1000:7.0f} ms")
+    if args.stream:
+        q = percentiles(resultados["primer_token"])
+        print(f"  1er token    p50={q[50] * 1000:7.0f} ms  p95={q[95] * 1000:7.0f} ms  p99={q[99] * 1000:7.0f} ms")
+    print(f"  fallback     {resultados['fallback'] / completados:.1%}  errores HTTP {resultados['errores']}")
+    print(f"  RSS          {rss_inicial:.1f} -> {rss_final:.1f} MiB ({rss_final - rss_inicial:+.1f} MiB)")
+    
+    metricas = chatbot_service.metricas()
+    print(f"  historial    {metricas['sesiones']} sesiones, {metricas['turnos']} turnos en memoria, "
+          f"{metricas['turnos_escritos']} escritos en BD")
+    print(f"  openai       {chatbot_service.proteccion.metricas()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,80 @@
+"""
+Benchmark de altas concurrentes de leads: commit por alta vs group commit
+
+Uso: python scripts/benchmark_ingesta.py [altas_por_nivel]
+
+Usa una base de datos SQLite temporal, no toca segurospy.db.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, '.')
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/benchmark.db"
+os.environ["DEBUG"] = "false"
+
+from database import init_db, AsyncSessionLocal
+from services.ingesta_service import IngestaLeadsService, EscritorAgrupado
+
+
+def datos_lead(n: int) -> dict:
+    return {
+        "nombre": f"Lead {n}",
+        "email": f"lead{n}@example.com",
+        "telefono": "612345678",
+        "tipo_seguro": "hogar",
+        "origen": "benchmark"
+    }
+
+
+async def medir(servicio: IngestaLeadsService, concurrencia: int, total: int) -> tuple:
+    """Lanza `total` altas con `concurrencia` peticiones a la vez"""
+    semaforo = asyncio.Semaphore(concurrencia)
+    errores = 0
+
+    async def alta(n: int):
+        nonlocal errores
+        async with semaforo:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await servicio.crear(db, datos_lead(n), tipos=())
+            except Exception:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(alta(n) for n in range(total)))
+    duracion = time.perf_counter() - inicio
+    return total / duracion, errores
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    await init_db()
+
+    individual = IngestaLeadsService()
+    individual.escritor = None
+
+    agrupado = IngestaLeadsService()
+    agrupado.escritor = EscritorAgrupado(agrupado, max_lote=64, espera_ms=5)
+
+    print(f"{'concurrencia':>12} | {'commit por alta':>18} | {'group commit':>18}")
+    print("-" * 56)
+    for concurrencia in (1, 8, 32, 128):
+        ops_ind, err_ind = await medir(individual, concurrencia, total)
+        ops_agr, err_agr = await medir(agrupado, concurrencia, total)
+        print(
+            f"{concurrencia:>12} | {ops_ind:>9.0f} altas/s ({err_ind} err) "
+            f"| {ops_agr:>9.0f} altas/s ({err_agr} err)"
+        )
+
+    await agrupado.detener()
+    print()
+    print(f"Group commit: {agrupado.metricas()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark del detector de intenciones del chatbot
+
+Uso: python scripts/benchmark_intenciones.py [repeticiones]
+
+Compara la cadena if/elif original de `_respuesta_fallback` (hasta nueve
+búsquedas de subcadenas seguidas) con la expresión regular compilada de
+services/intenciones.py sobre una muestra de mensajes reales y largos, con
+la tabla actual y con una tabla ampliada (el coste de la cadena crece con
+cada palabra clave; el del detector apenas cambia).
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, '.')
+os.environ.setdefault("DEBUG", "false")
+
+from services.intenciones import INTENCIONES, DetectorIntenciones, Intencion, detector_intenciones
+
+
+MENSAJES = [
+    "Hola",
+    "¿Cuánto cuesta el seguro de hogar?",
+    "Quiero asegurar mi coche nuevo",
+    "Tenéis seguro para perros?",
+    "Me podéis llamar mañana por la tarde?",
+    "Información sobre decesos para mis padres",
+    "Necesito un médico especialista sin esperas",
+    "buenas tardes, me gustaría saber qué coberturas tiene el seguro de vida",
+    "asdf",
+    # Mensaje largo sin palabras clave: el peor caso de la cadena original
+    "Estoy mirando opciones para el año que viene y quería consultar varias "
+    "cosas con calma antes de decidir nada, gracias de antemano por la ayuda " * 3,
+]
+
+GRUPOS_ORIGINALES = [
+    ("precio", ["precio", "coste", "cuanto", "cuánto"]),
+    ("hogar", ["hogar", "casa", "vivienda", "piso"]),
+    ("auto", ["coche", "auto", "vehiculo", "vehículo"]),
+    ("vida", ["vida"]),
+    ("decesos", ["decesos", "funeral"]),
+    ("salud", ["salud", "médico", "medico"]),
+    ("mascotas", ["mascota", "perro", "gato"]),
+    ("saludo", ["hola", "buenos", "buenas"]),
+    ("contacto", ["contacto", "llamar", "teléfono", "telefono", "whatsapp"]),
+]
+
+
+def cadena_original(mensaje: str, grupos=GRUPOS_ORIGINALES):
+    """La lógica de antes, con las mismas listas de palabras y el mismo orden"""
+    mensaje_lower = mensaje.lower()
+    for nombre, palabras in grupos:
+        if any(p in mensaje_lower for p in palabras):
+            return nombre
+    return None
+
+
+def detector(mensaje: str, detector_=detector_intenciones):
+    intencion = detector_.detectar(mensaje)
+    return intencion.nombre if intencion else None
+
+
+def ampliar(factor: int):
+    """Tablas con `factor` veces más intenciones (palabras que no aparecen)"""
+    grupos = list(GRUPOS_ORIGINALES)
+    intenciones = list(INTENCIONES)
+    for n in range(1, factor):
+        for nombre, palabras in GRUPOS_ORIGINALES:
+            grupos.insert(0, (f"{nombre}{n}", [f"{p}x{n}" for p in palabras]))
+        for intencion in INTENCIONES:
+            intenciones.append(Intencion(
+                f"{intencion.nombre}{n}",
+                tuple(f"{p}x{n}" for p in intencion.palabras),
+                intencion.respuesta
+            ))
+    return grupos, DetectorIntenciones(intenciones)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor de 15 tandas (el mínimo filtra el ruido de la máquina), en µs por mensaje"""
+    duracion = min(timeit.repeat(
+        lambda: [funcion(m) for m in MENSAJES],
+        number=repeticiones,
+        repeat=15
+    ))
+    return duracion / (repeticiones * len(MENSAJES)) * 1e6
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    
+    print(f"{'mensaje':<45} {'original':>10} {'detector':>10}")
+    for mensaje in MENSAJES:
+        print(f"{mensaje[:45]:<45} {str(cadena_original(mensaje)):>10} {str(detector(mensaje)):>10}")
+    print()
+    
+    print(f"{'palabras clave':<16} {'if/elif original':>18} {'regex compilada':>18}")
+    for factor in (1, 5, 20):
+        grupos, detector_ampliado = ampliar(factor)
+        palabras = sum(len(p) for _, p in grupos)
+        original = medir(lambda m: cadena_original(m, grupos), repeticiones)
+        compilada = medir(lambda m: detector(m, detector_ampliado), repeticiones)
+        print(f"{palabras:<16} {original:14.2f} µs {compilada:14.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de memoria de las sesiones del chatbot
+
+Uso: python scripts/benchmark_sesiones_chat.py [sesiones] [mensajes_por_sesion]
+
+Simula una avalancha de sesiones distintas (bots, recargas sin cookie) y
+compara la memoria retenida por el diccionario sin límite original con la
+del AlmacenSesiones acotado por LRU y tope de mensajes.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, '.')
+os.environ.setdefault("DEBUG", "false")
+
+from services.sesiones_chat import AlmacenSesiones
+
+
+MENSAJE = "Hola, quería saber cuánto cuesta un seguro de hogar para un piso de 80 m2"
+RESPUESTA = "🏠 El precio depende de varios factores. Un asesor te preparará una cotización gratuita."
+
+
+def diccionario_sin_limite(sesiones: int, mensajes: int) -> dict:
+    """Comportamiento anterior: un dict por mensaje y nada se olvida"""
+    conversaciones = {}
+    for s in range(sesiones):
+        historial = conversaciones.setdefault(f"sesion-{s}", [])
+        for _ in range(mensajes):
+            historial.append({"role": "user", "content": MENSAJE})
+            historial.append({"role": "assistant", "content": RESPUESTA})
+    return conversaciones
+
+
+def almacen_acotado(sesiones: int, mensajes: int) -> AlmacenSesiones:
+    almacen = AlmacenSesiones()
+    for s in range(sesiones):
+        for _ in range(mensajes):
+            almacen.agregar(f"sesion-{s}", "user", MENSAJE)
+            almacen.agregar(f"sesion-{s}", "assistant", RESPUESTA)
+    return almacen
+
+
+def medir(nombre: str, funcion, sesiones: int, mensajes: int) -> None:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion(sesiones, mensajes)
+    duracion = time.perf_counter() - inicio
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(
+        f"{nombre:<22} sesiones={len(resultado):>7}  "
+        f"retenida={actual / 1024 / 1024:7.1f} MiB  pico={pico / 1024 / 1024:7.1f} MiB  "
+        f"{sesiones * mensajes * 2 / duracion:,.0f} turnos/s"
+    )
+    if isinstance(resultado, AlmacenSesiones):
+        print(f"{'':<22} {resultado.estadisticas()}")
+
+
+def main():
+    sesiones = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    mensajes = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    
+    print(f"{sesiones} sesiones x {mensajes} intercambios\n")
+    medir("dict sin límite", diccionario_sin_limite, sesiones, mensajes)
+    medir("AlmacenSesiones", almacen_acotado, sesiones, mensajes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de concurrencia lectura/escritura en SQLite por perfil de conexión
+
+Uso: python scripts/benchmark_sqlite.py [segundos] [lectores] [escritores]
+
+Compara el perfil "ninguno" (journal rollback, valores por defecto) con
+"produccion" (WAL, synchronous=NORMAL, busy_timeout, caché, mmap) sobre
+bases de datos temporales, con lectores y escritores a la vez.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, '.')
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import select, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from database import crear_engine
+from models import Base, Lead
+
+
+FILAS_INICIALES = 20000
+
+
+def datos_lead(n: int) -> dict:
+    return {
+        "nombre": f"Lead {n}",
+        "email": f"lead{n}@example.com",
+        "telefono": "612345678",
+        "tipo_seguro": ("hogar", "auto", "vida")[n % 3],
+        "estado": ("nuevo", "contactado")[n % 2],
+        "origen": "benchmark"
+    }
+
+
+async def medir(perfil: str, segundos: float, lectores: int, escritores: int) -> dict:
+    """Ejecuta lectores y escritores concurrentes durante `segundos`"""
+    ruta = os.path.join(tempfile.mkdtemp(), f"{perfil}.db")
+    motor = crear_engine(f"sqlite+aiosqlite:///{ruta}", perfil=perfil)
+    Sesion = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+
+    async with motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Lead), [datos_lead(n) for n in range(FILAS_INICIALES)])
+
+    resultado = {"lecturas": 0, "escrituras": 0, "errores": 0, "espera_max_ms": 0.0}
+    fin = time.perf_counter() + segundos
+
+    async def lector():
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                async with Sesion() as db:
+                    await db.execute(
+                        select(Lead).where(Lead.estado == "nuevo")
+                        .order_by(Lead.created_at.desc()).limit(20)
+                    )
+                    await db.execute(select(func.count()).select_from(Lead))
+                resultado["lecturas"] += 1
+            except Exception:
+                resultado["errores"] += 1
+            resultado["espera_max_ms"] = max(
+                resultado["espera_max_ms"], (time.perf_counter() - inicio) * 1000
+            )
+
+    async def escritor(numero: int):
+        n = FILAS_INICIALES + numero * 1_000_000
+        while time.perf_counter() < fin:
+            n += 1
+            try:
+                async with Sesion() as db:
+                    await db.execute(insert(Lead).values(**datos_lead(n)))
+                    await db.commit()
+                resultado["escrituras"] += 1
+            except Exception:
+                resultado["errores"] += 1
+
+    await asyncio.gather(
+        *(lector() for _ in range(lectores)),
+        *(escritor(i) for i in range(escritores))
+    )
+    await motor.dispose()
+
+    resultado["lecturas"] /= segundos
+    resultado["escrituras"] /= segundos
+    return resultado
+
+
+async def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    lectores = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    escritores = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    print(f"⏱️  {segundos}s, {lectores} lectores, {escritores} escritores, {FILAS_INICIALES} leads")
+    print()
+    print(f"{'perfil':>12} | {'lecturas/s':>10} | {'escrituras/s':>12} | {'errores':>7} | {'lectura máx':>11}")
+    print("-" * 66)
+    for perfil in ("ninguno", "produccion"):
+        r = await medir(perfil, segundos, lectores, escritores)
+        print(
+            f"{perfil:>12} | {r['lecturas']:>10.0f} | {r['escrituras']:>12.0f} | "
+            f"{r['errores']:>7} | {r['espera_max_ms']:>8.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
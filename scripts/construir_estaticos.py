@@ -0,0 +1,100 @@
+"""
+Build de estáticos: nombres con hash y versiones .gz/.br en static/dist/,
+CSS minificado, variantes AVIF/WebP por ancho de las imágenes, el CSS
+crítico de cada página y la fecha del último commit de cada plantilla
+(<lastmod> del sitemap). Al final borra de static/dist lo que dejó de usarse
+hace más de un día (podar)
+
+Uso: python scripts/construir_estaticos.py
+
+Se ejecuta en cada despliegue (deploy.sh) antes de reiniciar la aplicación;
+las páginas toman las URLs nuevas al arrancar.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from jinja2 import TemplateNotFound
+
+from services.css_critico import DIRECTORIO_CACHE
+from services.estaticos import (
+    DIRECTORIO_DIST, DIRECTORIO_ORIGEN, HOJA_CRITICA, Image, Manifiesto, brotli,
+    construir, construir_critico, construir_fechas, construir_imagenes, podar
+)
+
+
+def main():
+    manifiesto = construir()
+    print(f"✅ {len(manifiesto)} ficheros en {DIRECTORIO_DIST}/"
+          + ("" if brotli is not None else " (sin .br: pip install Brotli)"))
+    for original, con_hash in manifiesto.items():
+        salida = DIRECTORIO_DIST / con_hash
+        tamanos = [f"{salida.stat().st_size / 1024:.1f} KB"]
+        for extension in (".gz", ".br"):
+            comprimido = salida.with_name(salida.name + extension)
+            if comprimido.exists():
+                tamanos.append(f"{extension} {comprimido.stat().st_size / 1024:.1f} KB")
+        print(f"   {original} -> {con_hash}  ({', '.join(tamanos)})")
+    
+    if Image is None:
+        print("⚠️  Sin variantes de imágenes (pip install Pillow)")
+    else:
+        construir_variantes()
+    
+    # Después de las imágenes: el pliegue se calcula sobre el HTML que se servirá
+    construir_paginas_critico(manifiesto)
+    construir_fechas_paginas()
+    
+    borrados = podar()
+    print(f"🧹 {len(borrados)} ficheros antiguos borrados de {DIRECTORIO_DIST}/")
+    for ruta in borrados:
+        print(f"   {ruta}")
+
+
+def construir_variantes():
+    imagenes = construir_imagenes()
+    print(f"✅ {len(imagenes)} imágenes con variantes")
+    for original, datos in imagenes.items():
+        print(f"   {original} ({datos['ancho']}x{datos['alto']}, "
+              f"{(DIRECTORIO_ORIGEN / original).stat().st_size / 1024:.1f} KB)")
+        print(f"      respaldo {datos['respaldo']}: {(DIRECTORIO_DIST / datos['respaldo']).stat().st_size / 1024:.1f} KB")
+        for formato, variantes in datos["variantes"].items():
+            tamanos = [f"{ancho}w {(DIRECTORIO_DIST / ruta).stat().st_size / 1024:.1f} KB" for ancho, ruta in variantes]
+            print(f"      {formato}: {', '.join(tamanos)}")
+
+
+def construir_paginas_critico(manifiesto):
+    from routers.pages import PAGINAS, templates
+    
+    # Las páginas como en producción (URLs con hash, <picture>), con un
+    # manifiesto propio recién leído y sin avisar de critico.json, que es
+    # justo lo que se está construyendo
+    entorno = templates.env.overlay()
+    entorno.globals = {**templates.env.globals, **Manifiesto(activo=True, avisar=False).globales_jinja()}
+    
+    paginas = {}
+    for pagina in PAGINAS:
+        try:
+            paginas[pagina.plantilla] = entorno.get_template(pagina.plantilla).render(pagina.contexto())
+        except TemplateNotFound:
+            print(f"⚠️  {pagina.ruta}: no existe templates/{pagina.plantilla}")
+    
+    criticos = construir_critico(paginas)
+    completa = (DIRECTORIO_DIST / manifiesto[HOJA_CRITICA]).stat().st_size
+    print(f"✅ CSS crítico de {len(criticos)} páginas (hoja completa {completa / 1024:.1f} KB, caché en {DIRECTORIO_CACHE}/)")
+    for plantilla, css in criticos.items():
+        print(f"   {plantilla}: {len(css.encode('utf-8')) / 1024:.1f} KB")
+
+
+
+def construir_fechas_paginas():
+    from routers.pages import PAGINAS
+    
+    plantillas = {pagina.plantilla for pagina in PAGINAS}
+    fechas = construir_fechas(plantillas)
+    print(f"✅ Fecha del último commit de {len(fechas)} plantillas (lastmod del sitemap)")
+    for plantilla in sorted(plantillas - fechas.keys()):
+        print(f"⚠️  {plantilla}: git no tiene fecha, el sitemap va sin <lastmod>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Servidor local compatible con la API de chat de OpenAI (solo para pruebas)
+
+Uso: python scripts/fake_openai.py [--puerto 8001] [--latencia 0.5] [--jitter 0.2]
+                                   [--tokens-por-segundo 50] [--errores 0.0]
+                                   [--limitado 0.0] [--colgado 0.0]
+
+Implementa POST /v1/chat/completions (normal y stream=True) con latencia
+configurable e inyección de errores 500, 429 y peticiones que no responden.
+Para usarlo con la aplicación:
+
+    OPENAI_API_KEY=sk-fake OPENAI_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+
+Las respuestas empiezan por RESPUESTA_FAKE para distinguirlas de las
+respuestas predefinidas del chatbot.
+"""
+from dataclasses import dataclass
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+RESPUESTA_FAKE = "[fake]"
+
+
+@dataclass
+class Comportamiento:
+    latencia: float = 0.5  # segundos hasta el primer token
+    jitter: float = 0.2  # variación aleatoria de la latencia (±)
+    tokens_por_segundo: float = 50.0
+    tokens_respuesta: int = 40
+    errores: float = 0.0  # probabilidad de 500
+    limitado: float = 0.0  # probabilidad de 429
+    colgado: float = 0.0  # probabilidad de no responder nunca
+
+
+def _error(estado: int, tipo: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=estado,
+        content={"error": {"message": f"error simulado ({tipo})", "type": tipo, "code": None}}
+    )
+
+
+def crear_app(comportamiento: Comportamiento) -> FastAPI:
+    """Aplicación FastAPI que imita /v1/chat/completions"""
+    app = FastAPI(title="OpenAI fake")
+    app.state.peticiones = 0
+    
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        cuerpo = await request.json()
+        app.state.peticiones += 1
+        
+        azar = random.random()
+        if azar < comportamiento.colgado:
+            await asyncio.sleep(3600)
+        azar -= comportamiento.colgado
+        if azar < comportamiento.errores:
+            return _error(500, "server_error")
+        azar -= comportamiento.errores
+        if azar < comportamiento.limitado:
+            return _error(429, "rate_limit_exceeded")
+        
+        latencia = max(0.0, comportamiento.latencia + random.uniform(-1, 1) * comportamiento.jitter)
+        await asyncio.sleep(latencia)
+        
+        ultimo = cuerpo["messages"][-1]["content"]
+        palabras = [RESPUESTA_FAKE] + [f"palabra{n}" for n in range(comportamiento.tokens_respuesta - 1)]
+        id_ = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        creado = int(time.time())
+        modelo = cuerpo.get("model", "gpt-4o-mini")
+        pausa = 1 / comportamiento.tokens_por_segundo if comportamiento.tokens_por_segundo else 0
+        
+        if not cuerpo.get("stream"):
+            await asyncio.sleep(pausa * len(palabras))
+            return {
+                "id": id_,
+                "object": "chat.completion",
+                "created": creado,
+                "model": modelo,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(palabras)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": sum(len(m["content"]) // 4 for m in cuerpo["messages"]),
+                    "completion_tokens": len(palabras),
+                    "total_tokens": len(palabras) + len(ultimo) // 4
+                }
+            }
+        
+        async def fragmentos():
+            for n, palabra in enumerate(palabras):
+                if n:
+                    await asyncio.sleep(pausa)
+                chunk = {
+                    "id": id_,
+                    "object": "chat.completion.chunk",
+                    "created": creado,
+                    "model": modelo,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": palabra if n == 0 else f" {palabra}"},
+                        "finish_reason": None
+                    }]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(fragmentos(), media_type="text/event-stream")
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--puerto", type=int, default=8001)
+    parser.add_argument("--latencia", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--tokens-por-segundo", type=float, default=50.0)
+    parser.add_argument("--errores", type=float, default=0.0)
+    parser.add_argument("--limitado", type=float, default=0.0)
+    parser.add_argument("--colgado", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    import uvicorn
+    comportamiento = Comportamiento(
+        latencia=args.latencia,
+        jitter=args.jitter,
+        tokens_por_segundo=args.tokens_por_segundo,
+        errores=args.errores,
+        limitado=args.limitado,
+        colgado=args.colgado
+    )
+    uvicorn.run(crear_app(comportamiento), host="127.0.0.1", port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
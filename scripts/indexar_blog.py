@@ -0,0 +1,43 @@
+"""
+Construye el índice vectorial del blog para el chatbot
+
+Uso: python scripts/indexar_blog.py [--directorio data/indice_blog] [--probar "pregunta"]
+
+Hay que volver a ejecutarlo cuando cambian las plantillas de
+templates/pages/blog/ (deploy.sh lo hace en cada despliegue). Los workers
+abren el índice nuevo al reiniciarse.
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+sys.path.insert(0, '.')
+
+from config import settings
+from services.indice_blog import IndiceBlog, construir, extracto, fragmentos_plantillas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directorio", default=settings.chat_indice_dir)
+    parser.add_argument("--probar", action="append", default=[], help="pregunta de prueba (repetible)")
+    args = parser.parse_args()
+    
+    inicio = time.perf_counter()
+    fragmentos = list(fragmentos_plantillas())
+    total = construir(fragmentos, args.directorio)
+    tamano = sum(f.stat().st_size for f in Path(args.directorio).iterdir() if f.is_file())
+    print(f"✅ {total} fragmentos de {len({f.url for f in fragmentos})} artículos "
+          f"en {args.directorio} ({tamano / 1024:.0f} KB, {time.perf_counter() - inicio:.2f} s)")
+    
+    indice = IndiceBlog(args.directorio)
+    for pregunta in args.probar:
+        print(f"\n❓ {pregunta}")
+        for resultado in indice.buscar(pregunta, k=3):
+            f = resultado.fragmento
+            print(f"   {resultado.puntuacion:.3f}  {f.url}  [{f.seccion or f.titulo}]")
+            print(f"          {extracto(f, 120)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Verifica que las rutas generadas desde PAGINAS (routers/pages.py) son
+exactamente las de siempre
+
+Uso: python scripts/verificar_rutas.py
+
+Comprueba:
+- que el router de páginas expone las mismas URLs (y nombres de ruta) que
+  tenían las funciones escritas a mano
+- que cada plantilla existe y la página responde 200 con ETag, y 304 al
+  repetir la petición con If-None-Match
+- que sitemap.xml contiene las páginas esperadas y que el antiguo
+  /static/sitemap.xml redirige a él con un 301
+
+Termina con código 1 si algo no cuadra.
+"""
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+sys.path.insert(0, '.')
+
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/rutas.db")
+
+from fastapi.testclient import TestClient
+from fastapi.routing import APIRoute
+
+# URL -> nombre de la ruta, tal como estaban antes del registro
+RUTAS_ESPERADAS = {
+    "/": "home",
+    "/seguro-hogar": "seguro_hogar",
+    "/seguro-coche": "seguro_coche",
+    "/seguro-vida": "seguro_vida",
+    "/seguro-decesos": "seguro_decesos",
+    "/seguro-salud": "seguro_salud",
+    "/seguro-mujer": "seguro_mujer",
+    "/comparador": "comparador",
+    "/blog": "blog",
+    "/contacto": "contacto",
+    "/politica-privacidad": "privacidad",
+    "/aviso-legal": "aviso_legal",
+    "/cookies": "cookies",
+    "/blog/seguro-hogar-villalba-guia-completa": "blog_seguro_hogar_villalba",
+    "/blog/seguro-coche-galapagar-mejores-ofertas": "blog_seguro_coche_galapagar",
+    "/blog/seguro-decesos-sierra-madrid-todo-incluido": "blog_seguro_decesos",
+    "/blog/seguro-mujer-coberturas-exclusivas": "blog_seguro_mujer",
+    "/blog/como-ahorrar-seguro-hogar-alpedrete": "blog_ahorrar_seguro",
+    "/blog/seguro-mascotas-sierra-guadarrama": "blog_seguro_mascotas",
+}
+
+# Las del antiguo static/sitemap.xml más /seguro-decesos, que faltaba
+SITEMAP_ESPERADO = {
+    "/", "/seguro-hogar", "/seguro-coche", "/seguro-vida", "/seguro-decesos", "/seguro-salud",
+    "/seguro-mujer", "/comparador", "/blog", "/politica-privacidad",
+    "/blog/seguro-hogar-villalba-guia-completa", "/blog/seguro-coche-galapagar-mejores-ofertas",
+    "/blog/seguro-decesos-sierra-madrid-todo-incluido", "/blog/seguro-mujer-coberturas-exclusivas",
+    "/blog/como-ahorrar-seguro-hogar-alpedrete", "/blog/seguro-mascotas-sierra-guadarrama",
+}
+
+
+def main() -> int:
+    from config import settings
+    from main import app
+    from routers.pages import PAGINAS, router
+    
+    errores = 0
+    
+    def fallo(texto: str) -> None:
+        nonlocal errores
+        errores += 1
+        print(f"   ❌ {texto}")
+    
+    print("1️⃣  Rutas generadas")
+    generadas = {
+        r.path: r.name for r in router.routes
+        if isinstance(r, APIRoute) and "GET" in r.methods and r.path != "/sitemap.xml"
+    }
+    for ruta in sorted(RUTAS_ESPERADAS.keys() - generadas.keys()):
+        fallo(f"falta {ruta}")
+    for ruta in sorted(generadas.keys() - RUTAS_ESPERADAS.keys()):
+        fallo(f"sobra {ruta}")
+    for ruta in sorted(RUTAS_ESPERADAS.keys() & generadas.keys()):
+        if generadas[ruta] != RUTAS_ESPERADAS[ruta]:
+            fallo(f"{ruta} se llama {generadas[ruta]!r} (antes {RUTAS_ESPERADAS[ruta]!r})")
+    if len(PAGINAS) != len({p.ruta for p in PAGINAS}):
+        fallo("hay rutas repetidas en PAGINAS")
+    if not errores:
+        print(f"   ✅ {len(generadas)} rutas, iguales a las anteriores")
+    
+    print("\n2️⃣  Páginas")
+    cliente = TestClient(app)
+    for pagina in PAGINAS:
+        if not os.path.exists(os.path.join("templates", pagina.plantilla)):
+            print(f"   ⚠️  {pagina.ruta}: no existe templates/{pagina.plantilla}")
+            continue
+        r = cliente.get(pagina.ruta)
+        etag = r.headers.get("etag")
+        if r.status_code != 200 or not etag:
+            fallo(f"{pagina.ruta}: {r.status_code}, ETag {etag!r}")
+            continue
+        r = cliente.get(pagina.ruta, headers={"If-None-Match": etag})
+        if r.status_code != 304:
+            fallo(f"{pagina.ruta}: If-None-Match devuelve {r.status_code}")
+            continue
+        print(f"   ✅ {pagina.ruta}")
+    
+    print("\n3️⃣  sitemap.xml")
+    r = cliente.get("/sitemap.xml")
+    espacio = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+    locs = {e.text for e in ET.fromstring(r.content).iter(f"{espacio}loc")}
+    en_sitemap = {loc[len(settings.site_url):] for loc in locs if loc.startswith(settings.site_url)}
+    if r.status_code != 200 or len(en_sitemap) != len(locs):
+        fallo(f"respuesta {r.status_code}, {len(locs) - len(en_sitemap)} URLs fuera de {settings.site_url}")
+    for ruta in sorted(SITEMAP_ESPERADO - en_sitemap):
+        fallo(f"falta {ruta}")
+    for ruta in sorted(en_sitemap - SITEMAP_ESPERADO):
+        fallo(f"sobra {ruta}")
+    if en_sitemap == SITEMAP_ESPERADO:
+        print(f"   ✅ {len(en_sitemap)} URLs")
+    r = cliente.get("/static/sitemap.xml", follow_redirects=False)
+    if r.status_code != 301 or r.headers.get("location") != "/sitemap.xml":
+        fallo(f"/static/sitemap.xml: {r.status_code} -> {r.headers.get('location')!r}")
+    else:
+        print("   ✅ /static/sitemap.xml -> 301 /sitemap.xml")
+    
+    print()
+    print("✅ Todo correcto" if not errores else f"❌ {errores} errores")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
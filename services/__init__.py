@@ -3,6 +3,18 @@ Servicio __init__ - Exporta todos los servicios
 """
 from .email_service import email_service
 from .telegram_service import telegram_service
+from .conversaciones_service import conversaciones_service
 from .chatbot_service import chatbot_service
+from .outbox_service import outbox_service
+from .conteo_service import conteo_leads_service
+from .estadisticas_service import estadisticas_service
+from .ingesta_service import ingesta_service
+from .importacion_service import importacion_service
+from .limite_chat import limitador_chat
+from .cache_paginas import cache_paginas
 
-__all__ = ["email_service", "telegram_service", "chatbot_service"]
+__all__ = [
+    "email_service", "telegram_service", "conversaciones_service", "chatbot_service",
+    "outbox_service", "conteo_leads_service", "estadisticas_service",
+    "ingesta_service", "importacion_service", "limitador_chat", "cache_paginas"
+]
@@ -0,0 +1,114 @@
+"""
+Caché de páginas - HTML prerenderizado con ETag
+
+Las páginas públicas no dependen de la petición: su contexto (título,
+descripción, zona) es fijo. Cada plantilla se renderiza una sola vez, la
+primera vez que se pide, y se guardan los bytes con un ETag fuerte (hash del
+contenido). Las siguientes visitas son una búsqueda en un diccionario, y si
+el navegador ya tiene esa versión (If-None-Match) se responde 304 sin cuerpo.
+
+En modo debug se vigila la fecha de modificación de templates/: al editar
+cualquier plantilla (también base.html) se vacía la caché.
+"""
+from pathlib import Path
+from typing import Dict, NamedTuple
+import hashlib
+import os
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from fastapi.templating import Jinja2Templates
+
+from config import settings
+
+# Se revalida en cada visita: un despliegue se ve al momento y la
+# comprobación cuesta un 304
+CACHE_CONTROL = "public, no-cache"
+
+
+class Pagina(NamedTuple):
+    """Página ya renderizada"""
+    cuerpo: bytes
+    etag: str
+
+
+def coincide_etag(cabecera: str, etag: str) -> bool:
+    """¿Algún ETag de If-None-Match coincide? (comparación débil, RFC 9110)"""
+    if cabecera.strip() == "*":
+        return True
+    for candidato in cabecera.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+class CachePaginas:
+    """Plantillas renderizadas una vez y servidas desde memoria"""
+    
+    def __init__(self, directorio: str = "templates", recargar: bool = False):
+        self.directorio = Path(directorio)
+        self.recargar = recargar
+        self.templates = Jinja2Templates(directory=directorio)
+        
+        self._paginas: Dict[str, Pagina] = {}
+        self._firma = self._firma_plantillas() if recargar else 0.0
+        self._metricas: Dict[str, int] = {"aciertos": 0, "renderizados": 0, "no_modificadas": 0, "recargas": 0}
+    
+    def _firma_plantillas(self) -> float:
+        """Fecha de modificación más reciente bajo el directorio de plantillas"""
+        firma = 0.0
+        for raiz, _, ficheros in os.walk(self.directorio):
+            for nombre in ficheros:
+                firma = max(firma, os.stat(os.path.join(raiz, nombre)).st_mtime)
+        return firma
+    
+    def obtener(self, plantilla: str, contexto: Dict) -> Pagina:
+        """Página renderizada (la renderiza la primera vez)"""
+        if self.recargar:
+            firma = self._firma_plantillas()
+            if firma != self._firma:
+                self._firma = firma
+                self._paginas.clear()
+                self._metricas["recargas"] += 1
+        
+        pagina = self._paginas.get(plantilla)
+        if pagina is not None:
+            self._metricas["aciertos"] += 1
+            return pagina
+        
+        cuerpo = self.templates.get_template(plantilla).render(contexto).encode("utf-8")
+        etag = f'"{hashlib.blake2b(cuerpo, digest_size=16).hexdigest()}"'
+        pagina = self._paginas[plantilla] = Pagina(cuerpo, etag)
+        self._metricas["renderizados"] += 1
+        return pagina
+    
+    def respuesta(self, request: Request, plantilla: str, contexto: Dict) -> Response:
+        """
+        Respuesta HTML desde la caché, o 304 si el navegador ya la tiene
+        
+        El contexto no puede depender de la petición: solo se usa al renderizar
+        la primera vez.
+        """
+        pagina = self.obtener(plantilla, contexto)
+        cabeceras = {"ETag": pagina.etag, "Cache-Control": CACHE_CONTROL}
+        
+        si_no_coincide = request.headers.get("if-none-match")
+        if si_no_coincide and coincide_etag(si_no_coincide, pagina.etag):
+            self._metricas["no_modificadas"] += 1
+            return Response(status_code=304, headers=cabeceras)
+        return HTMLResponse(content=pagina.cuerpo, headers=cabeceras)
+    
+    def vaciar(self) -> None:
+        """Descarta todas las páginas renderizadas"""
+        self._paginas.clear()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Aciertos, renderizados y respuestas 304"""
+        return {**self._metricas, "paginas": len(self._paginas)}
+
+
+# Instancia singleton
+cache_paginas = CachePaginas("templates", recargar=settings.debug)
@@ -0,0 +1,87 @@
+"""
+Caché de respuestas del chatbot para preguntas repetidas
+
+Solo se usa en mensajes sin contexto (primer turno de la sesión), donde la
+respuesta de OpenAI depende únicamente del texto de la pregunta. La clave es
+la pregunta normalizada, así que "¿Cuánto cuesta el seguro de hogar?" y
+"cuanto cuesta el seguro de hogar" comparten entrada.
+
+Es una caché por proceso: la purga afecta al worker que la recibe y el TTL
+acota cuánto tardan los demás en olvidar una respuesta.
+"""
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Union
+import time
+
+from .normalizacion import normalizar
+
+
+class RespuestaCacheada(NamedTuple):
+    """Respuesta guardada con su instante de alta"""
+    respuesta: str
+    sugerencias: List[str]
+    creada: float
+
+
+class CacheRespuestas:
+    """Caché LRU con TTL de respuestas por pregunta normalizada"""
+    
+    def __init__(self, max_entradas: int = 500, ttl: float = 3600.0, max_longitud: int = 200):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.max_longitud = max_longitud  # preguntas más largas no se repiten literalmente
+        
+        self._entradas: "OrderedDict[str, RespuestaCacheada]" = OrderedDict()
+        self._stats: Dict[str, int] = {"aciertos": 0, "fallos": 0, "expulsadas": 0, "caducadas": 0}
+    
+    def clave(self, mensaje: str) -> Optional[str]:
+        """Clave de caché del mensaje (None si no es cacheable)"""
+        clave = normalizar(mensaje)
+        if not clave or len(clave) > self.max_longitud:
+            return None
+        return clave
+    
+    def obtener(self, mensaje: str) -> Optional[RespuestaCacheada]:
+        """Respuesta guardada para la pregunta, si existe y no ha caducado"""
+        clave = self.clave(mensaje)
+        entrada = self._entradas.get(clave) if clave else None
+        
+        if entrada is not None and time.monotonic() - entrada.creada >= self.ttl:
+            del self._entradas[clave]
+            self._stats["caducadas"] += 1
+            entrada = None
+        
+        if entrada is None:
+            self._stats["fallos"] += 1
+            return None
+        
+        self._stats["aciertos"] += 1
+        self._entradas.move_to_end(clave)
+        return entrada
+    
+    def guardar(self, mensaje: str, respuesta: str, sugerencias: List[str]) -> None:
+        """Guarda la respuesta expulsando la menos usada si se llena"""
+        clave = self.clave(mensaje)
+        if not clave or not respuesta:
+            return
+        
+        self._entradas[clave] = RespuestaCacheada(respuesta, list(sugerencias), time.monotonic())
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self._stats["expulsadas"] += 1
+    
+    def purgar(self) -> int:
+        """Vacía la caché y devuelve cuántas entradas había"""
+        cantidad = len(self._entradas)
+        self._entradas.clear()
+        return cantidad
+    
+    def metricas(self) -> Dict[str, Union[int, float]]:
+        """Aciertos, fallos, tasa de acierto y tamaño"""
+        consultas = self._stats["aciertos"] + self._stats["fallos"]
+        return {
+            **self._stats,
+            "entradas": len(self._entradas),
+            "tasa_acierto": round(self._stats["aciertos"] / consultas, 3) if consultas else 0.0
+        }
@@ -3,10 +3,18 @@ Servicio de Chatbot IA - Equivalente al chat widget con OpenAI
 """
 from openai import AsyncOpenAI
 from config import settings
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import logging
 import uuid
 
+from .conversaciones_service import conversaciones_service
+from .cache_respuestas import CacheRespuestas
+from .intenciones import detector_intenciones, RESPUESTA_POR_DEFECTO
+from .contexto_chat import ConstructorContexto
+from .sesiones_chat import Turno
+from .proteccion_openai import ProteccionOpenAI, OpenAINoDisponible
+from .indice_blog import indice_blog, documentacion, extracto, Resultado
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,18 +53,85 @@ class ChatbotService:
     """Servicio de chatbot con OpenAI"""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
-        self.conversaciones: Dict[str, List[Dict]] = {}
+        self.client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            timeout=settings.openai_timeout,
+            max_retries=settings.openai_max_reintentos
+        ) if settings.openai_api_key else None
+        self.proteccion = ProteccionOpenAI(
+            max_concurrencia=settings.openai_max_concurrencia,
+            espera_hueco=settings.openai_espera_hueco,
+            plazo=settings.openai_timeout,
+            umbral_fallos=settings.openai_circuito_fallos,
+            reapertura=settings.openai_circuito_reapertura
+        )
+        self.conversaciones = conversaciones_service
+        self.cache_respuestas = CacheRespuestas(
+            max_entradas=settings.chat_cache_respuestas_max,
+            ttl=settings.chat_cache_respuestas_ttl
+        )
+        self.contexto = ConstructorContexto(
+            presupuesto=settings.chat_presupuesto_historial,
+            max_sesiones=settings.chat_max_sesiones
+        )
+        self.indice = indice_blog
     
     def _generar_session_id(self) -> str:
         """Genera un ID único de sesión"""
         return str(uuid.uuid4())
     
-    def _get_historial(self, session_id: str) -> List[Dict]:
+    async def _get_historial(self, session_id: str) -> List[Turno]:
         """Obtiene el historial de una conversación"""
-        if session_id not in self.conversaciones:
-            self.conversaciones[session_id] = []
-        return self.conversaciones[session_id]
+        return await self.conversaciones.historial(session_id)
+    
+    def _construir_mensajes(
+        self,
+        session_id: str,
+        mensaje: str,
+        historial: List[Turno],
+        articulos: List[Resultado]
+    ) -> List[Dict]:
+        """Prompt del sistema, fragmentos del blog, resumen de lo antiguo, historial reciente y mensaje actual"""
+        return self.contexto.construir(
+            session_id, SYSTEM_PROMPT, historial, mensaje, documentacion(articulos)
+        )
+    
+    def _buscar_articulos(self, mensaje: str) -> List[Resultado]:
+        """Fragmentos del blog relacionados con el mensaje"""
+        return self.indice.buscar(
+            mensaje,
+            k=settings.chat_indice_fragmentos,
+            minimo=settings.chat_indice_umbral_contexto
+        )
+    
+    def _respuesta_directa(self, articulos: List[Resultado]) -> Optional[str]:
+        """
+        Respuesta con enlace al blog si el mejor fragmento responde claramente
+        
+        La introducción del artículo (título y entradilla, sin sección) puntúa
+        alto en cualquier pregunta sobre el tema pero no responde nada
+        concreto: esa, y los fragmentos muy cortos, van a OpenAI como contexto.
+        """
+        if not articulos:
+            return None
+        mejor = articulos[0]
+        if (
+            mejor.puntuacion >= settings.chat_indice_umbral_directo
+            and mejor.fragmento.seccion
+            and len(extracto(mejor.fragmento)) >= settings.chat_indice_min_extracto
+        ):
+            return self.indice.respuesta_directa(mejor)
+        return None
+    
+    def _guardar_turno(self, session_id: str, mensaje: str, respuesta: str) -> None:
+        """Añade pregunta y respuesta al historial"""
+        self.conversaciones.agregar(session_id, "user", mensaje)
+        self.conversaciones.agregar(session_id, "assistant", respuesta)
+    
+    def metricas(self) -> Dict[str, int]:
+        """Estadísticas del historial de sesiones"""
+        return self.conversaciones.metricas()
     
     async def responder(
         self,
@@ -73,8 +148,9 @@ class ChatbotService:
         Returns:
             Dict con respuesta, session_id y sugerencias
         """
-        # Generar session_id si no existe
-        if not session_id:
+        # Generar session_id si no existe (sesión nueva: sin historial que leer)
+        nueva = not session_id
+        if nueva:
             session_id = self._generar_session_id()
         
         # Si no hay API key, usar respuestas predefinidas
@@ -82,36 +158,50 @@ class ChatbotService:
             return self._respuesta_fallback(mensaje, session_id)
         
         try:
-            # Obtener historial
-            historial = self._get_historial(session_id)
+            historial = [] if nueva else await self._get_historial(session_id)
             
-            # Construir mensajes
-            mensajes = [
-                {"role": "system", "content": SYSTEM_PROMPT}
-            ]
+            # Sin contexto la respuesta solo depende de la pregunta
+            if not historial:
+                cacheada = self.cache_respuestas.obtener(mensaje)
+                if cacheada is not None:
+                    self._guardar_turno(session_id, mensaje, cacheada.respuesta)
+                    return {
+                        "respuesta": cacheada.respuesta,
+                        "session_id": session_id,
+                        "sugerencias": cacheada.sugerencias
+                    }
             
-            # Añadir historial (últimos 10 mensajes)
-            mensajes.extend(historial[-10:])
+            # Pregunta que responde una guía del blog: enlace sin llamar a OpenAI
+            articulos = self._buscar_articulos(mensaje)
+            directa = None if historial else self._respuesta_directa(articulos)
+            if directa is not None:
+                self._guardar_turno(session_id, mensaje, directa)
+                return {
+                    "respuesta": directa,
+                    "session_id": session_id,
+                    "sugerencias": self._generar_sugerencias(mensaje, directa)
+                }
             
-            # Añadir mensaje actual
-            mensajes.append({"role": "user", "content": mensaje})
+            mensajes = self._construir_mensajes(session_id, mensaje, historial, articulos)
             
-            # Llamar a OpenAI
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=mensajes,
-                max_tokens=300,
-                temperature=0.7
-            )
+            # Llamar a OpenAI (con límite de concurrencia, plazo y circuit breaker)
+            async with self.proteccion.llamada() as llamada:
+                response = await llamada.esperar(self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=mensajes,
+                    max_tokens=300,
+                    temperature=0.7
+                ))
             
             respuesta = response.choices[0].message.content
             
             # Guardar en historial
-            historial.append({"role": "user", "content": mensaje})
-            historial.append({"role": "assistant", "content": respuesta})
+            self._guardar_turno(session_id, mensaje, respuesta)
             
             # Generar sugerencias
             sugerencias = self._generar_sugerencias(mensaje, respuesta)
+            if not historial:
+                self.cache_respuestas.guardar(mensaje, respuesta, sugerencias)
             
             return {
                 "respuesta": respuesta,
@@ -119,34 +209,117 @@ class ChatbotService:
                 "sugerencias": sugerencias
             }
             
+        except OpenAINoDisponible as e:
+            logger.warning(f"Chatbot sin OpenAI ({e}), usando respuestas predefinidas")
+            return self._respuesta_fallback(mensaje, session_id)
         except Exception as e:
-            logger.error(f"Error en chatbot: {e}")
+            logger.error(f"Error en chatbot: {e!r}")
             return self._respuesta_fallback(mensaje, session_id)
     
+    async def responder_stream(
+        self,
+        mensaje: str,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Genera la respuesta token a token (para Server-Sent Events)
+        
+        Produce eventos (nombre, datos):
+        - ("inicio", {"session_id"}) nada más empezar
+        - ("token", {"texto"}) por cada fragmento de la respuesta
+        - ("fin", {"sugerencias"}) al terminar; solo entonces se guarda el historial
+        
+        Si OpenAI falla antes del primer token se envía la respuesta
+        predefinida como un único fragmento.
+        """
+        nueva = not session_id
+        if nueva:
+            session_id = self._generar_session_id()
+        
+        yield "inicio", {"session_id": session_id}
+        
+        if not self.client:
+            fallback = self._respuesta_fallback(mensaje, session_id)
+            yield "token", {"texto": fallback["respuesta"]}
+            yield "fin", {"sugerencias": fallback["sugerencias"]}
+            return
+        
+        fragmentos: List[str] = []
+        historial: List[Turno] = []
+        completa = False  # solo se cachean respuestas que no se cortaron
+        try:
+            historial = [] if nueva else await self._get_historial(session_id)
+            
+            if not historial:
+                cacheada = self.cache_respuestas.obtener(mensaje)
+                if cacheada is not None:
+                    self._guardar_turno(session_id, mensaje, cacheada.respuesta)
+                    yield "token", {"texto": cacheada.respuesta}
+                    yield "fin", {"sugerencias": cacheada.sugerencias}
+                    return
+            
+            articulos = self._buscar_articulos(mensaje)
+            directa = None if historial else self._respuesta_directa(articulos)
+            if directa is not None:
+                self._guardar_turno(session_id, mensaje, directa)
+                yield "token", {"texto": directa}
+                yield "fin", {"sugerencias": self._generar_sugerencias(mensaje, directa)}
+                return
+            
+            mensajes = self._construir_mensajes(session_id, mensaje, historial, articulos)
+            async with self.proteccion.llamada() as llamada:
+                stream = await llamada.esperar(self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=mensajes,
+                    max_tokens=300,
+                    temperature=0.7,
+                    stream=True
+                ))
+                
+                # El plazo cubre también la espera de cada fragmento
+                fragmentos_stream = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await llamada.esperar(fragmentos_stream.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.choices:
+                        continue
+                    texto = chunk.choices[0].delta.content
+                    if texto:
+                        fragmentos.append(texto)
+                        yield "token", {"texto": texto}
+            completa = True
+        except OpenAINoDisponible as e:
+            logger.warning(f"Chatbot sin OpenAI ({e}), usando respuestas predefinidas")
+        except Exception as e:
+            logger.error(f"Error en chatbot (stream): {e!r}")
+        
+        # Fallo antes del primer token: respuesta predefinida
+        if not completa and not fragmentos:
+            fallback = self._respuesta_fallback(mensaje, session_id)
+            yield "token", {"texto": fallback["respuesta"]}
+            yield "fin", {"sugerencias": fallback["sugerencias"]}
+            return
+        
+        respuesta = "".join(fragmentos)
+        
+        # Guardar en historial
+        self._guardar_turno(session_id, mensaje, respuesta)
+        
+        sugerencias = self._generar_sugerencias(mensaje, respuesta)
+        if not historial and completa:
+            self.cache_respuestas.guardar(mensaje, respuesta, sugerencias)
+        
+        yield "fin", {"sugerencias": sugerencias}
+    
     def _respuesta_fallback(self, mensaje: str, session_id: str) -> Dict:
-        """Respuestas predefinidas cuando no hay API"""
-        mensaje_lower = mensaje.lower()
-        
-        if any(p in mensaje_lower for p in ["precio", "coste", "cuanto", "cuánto"]):
-            respuesta = "💰 El precio depende de varios factores. Un asesor te preparará una cotización personalizada gratuita. ¿Quieres que te llamemos? Déjanos tu teléfono."
-        elif any(p in mensaje_lower for p in ["hogar", "casa", "vivienda", "piso"]):
-            respuesta = "🏠 ¡El seguro de hogar es fundamental! Cubrimos daños por agua, incendio, robo y mucho más. ¿Te gustaría que un asesor te explique las opciones?"
-        elif any(p in mensaje_lower for p in ["coche", "auto", "vehiculo", "vehículo"]):
-            respuesta = "🚗 Comparamos más de 20 aseguradoras para encontrarte el mejor precio en seguro de coche. ¿Tienes el vehículo ya o es nuevo?"
-        elif any(p in mensaje_lower for p in ["vida"]):
-            respuesta = "💚 El seguro de vida protege a tu familia económicamente. Podemos encontrar opciones desde 10€/mes. ¿Quieres más información?"
-        elif any(p in mensaje_lower for p in ["decesos", "funeral"]):
-            respuesta = "🕊️ El seguro de decesos cubre todos los gastos y gestiones. Es muy económico y da tranquilidad a la familia. ¿Te informamos?"
-        elif any(p in mensaje_lower for p in ["salud", "médico", "medico"]):
-            respuesta = "🏥 Con el seguro de salud tendrás acceso a los mejores especialistas sin esperas. ¿Buscas cobertura individual o familiar?"
-        elif any(p in mensaje_lower for p in ["mascota", "perro", "gato"]):
-            respuesta = "🐾 ¡Protege a tu peludo! Cubrimos veterinario, responsabilidad civil y más. ¿Qué tipo de mascota tienes?"
-        elif any(p in mensaje_lower for p in ["hola", "buenos", "buenas"]):
-            respuesta = "👋 ¡Hola! Soy el asistente virtual de SegurosPy. ¿En qué puedo ayudarte? Puedo informarte sobre seguros de hogar, auto, vida, salud y más."
-        elif any(p in mensaje_lower for p in ["contacto", "llamar", "teléfono", "telefono", "whatsapp"]):
-            respuesta = "📞 Puedes contactarnos en:\n• Teléfono/WhatsApp: 661 854 126\n• Email: info@segurospy.com\n• Horario: L-V 10:00-19:00"
+        """Respuestas predefinidas cuando no hay API (sin intención, el enlace al blog si lo responde)"""
+        intencion = detector_intenciones.detectar(mensaje)
+        if intencion is not None:
+            respuesta = intencion.respuesta
         else:
-            respuesta = "Gracias por tu mensaje. Para darte la mejor información, ¿podrías indicarme qué tipo de seguro te interesa? (hogar, coche, vida, salud, decesos, mascotas)"
+            respuesta = self._respuesta_directa(self._buscar_articulos(mensaje)) or RESPUESTA_POR_DEFECTO
         
         return {
             "respuesta": respuesta,
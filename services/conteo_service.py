@@ -0,0 +1,125 @@
+"""
+Servicio de Conteo - Caché de totales del listado de leads (CRM)
+
+Cada combinación de filtros (estado, tipo_seguro) guarda su último COUNT(*).
+Las altas y cambios de estado de este proceso actualizan los contadores en
+memoria; el TTL acota la deriva causada por escrituras de otros workers.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+import logging
+import time
+
+from config import settings
+from models import Lead
+
+logger = logging.getLogger(__name__)
+
+
+Clave = Tuple[Optional[str], Optional[str]]  # (estado, tipo_seguro)
+
+# Combinaciones de filtros distintas que se recuerdan como máximo
+MAX_CLAVES = 256
+
+
+class ConteoLeadsService:
+    """Caché de totales por filtro con actualización incremental"""
+    
+    def __init__(self):
+        self.ttl = settings.leads_conteo_ttl
+        self._cache: Dict[Clave, Tuple[int, float]] = {}  # clave -> (total, instante)
+        self._metricas: Dict[str, int] = {"aciertos": 0, "fallos": 0, "estimaciones": 0}
+    
+    @staticmethod
+    def _claves(estado: Optional[str], tipo_seguro: Optional[str]) -> List[Clave]:
+        """Todas las combinaciones de filtros que incluyen a un lead"""
+        return [(None, None), (estado, None), (None, tipo_seguro), (estado, tipo_seguro)]
+    
+    async def contar(
+        self,
+        db: AsyncSession,
+        estado: Optional[str] = None,
+        tipo_seguro: Optional[str] = None,
+        modo: str = "cache"
+    ) -> Optional[int]:
+        """
+        Total de leads que cumplen los filtros
+        
+        Args:
+            modo: "cache" (valor en caché si no ha caducado), "exact" (COUNT
+                siempre), "estimate" (cualquier valor en caché o una
+                estimación barata) o "none" (no contar)
+        """
+        if modo == "none":
+            return None
+        
+        clave = (estado, tipo_seguro)
+        entrada = self._cache.get(clave)
+        
+        if entrada and modo != "exact":
+            total, instante = entrada
+            if modo == "estimate" or time.monotonic() - instante < self.ttl:
+                self._metricas["aciertos"] += 1
+                return total
+        
+        if modo == "estimate" and clave == (None, None):
+            # Sin filtros, el mayor id es una buena aproximación y usa el índice
+            self._metricas["estimaciones"] += 1
+            result = await db.execute(select(func.max(Lead.id)))
+            return result.scalar() or 0
+        
+        self._metricas["fallos"] += 1
+        count_query = select(func.count()).select_from(Lead)
+        if estado:
+            count_query = count_query.where(Lead.estado == estado)
+        if tipo_seguro:
+            count_query = count_query.where(Lead.tipo_seguro == tipo_seguro)
+        
+        result = await db.execute(count_query)
+        total = result.scalar()
+        self._guardar(clave, total)
+        return total
+    
+    def _guardar(self, clave: Clave, total: int) -> None:
+        """Guarda un total descartando la clave más antigua si se llena"""
+        self._cache.pop(clave, None)
+        if len(self._cache) >= MAX_CLAVES:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[clave] = (total, time.monotonic())
+    
+    def _sumar(self, claves: List[Clave], delta: int) -> None:
+        """Ajusta los totales ya cacheados (sin crear entradas nuevas)"""
+        for clave in set(claves):
+            entrada = self._cache.get(clave)
+            if entrada:
+                self._cache[clave] = (max(entrada[0] + delta, 0), entrada[1])
+    
+    def registrar_alta(self, estado: str, tipo_seguro: str, cantidad: int = 1) -> None:
+        """Llamar tras el commit de leads nuevos"""
+        self._sumar(self._claves(estado, tipo_seguro), cantidad)
+    
+    def registrar_cambio_estado(
+        self,
+        tipo_seguro: str,
+        estado_anterior: Optional[str],
+        estado_nuevo: str
+    ) -> None:
+        """Llamar tras el commit de un cambio de estado"""
+        if estado_anterior == estado_nuevo:
+            return
+        
+        self._sumar([(estado_anterior, None), (estado_anterior, tipo_seguro)], -1)
+        self._sumar([(estado_nuevo, None), (estado_nuevo, tipo_seguro)], 1)
+    
+    def invalidar(self) -> None:
+        """Vacía la caché (p. ej. tras cambios masivos)"""
+        self._cache.clear()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Aciertos/fallos de la caché de totales"""
+        return {**self._metricas, "claves": len(self._cache)}
+
+
+# Instancia singleton
+conteo_leads_service = ConteoLeadsService()
@@ -0,0 +1,199 @@
+"""
+Contexto del chatbot - Historial por presupuesto de tokens y resumen rodante
+
+En lugar de enviar siempre los últimos 10 mensajes, se envían los más
+recientes que quepan en CHAT_PRESUPUESTO_HISTORIAL tokens. Los que no caben
+se pliegan en un resumen breve (temas detectados y últimas preguntas del
+usuario) que se guarda por sesión y solo se amplía con los turnos que van
+saliendo de la ventana, así que el prompt queda acotado por larga que sea
+la conversación.
+
+Los tokens se estiman localmente (sin tokenizador ni red): cada palabra
+cuenta un token por cada 4 caracteres y cada signo o emoji cuenta uno, lo
+que para español queda cerca de lo que cuenta el tokenizador de OpenAI.
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+import re
+
+from .intenciones import detector_intenciones
+from .sesiones_chat import Turno
+
+# Tokens fijos de cada mensaje en el formato de chat (rol y separadores)
+TOKENS_POR_MENSAJE = 4
+
+_PIEZAS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación local del número de tokens de un texto"""
+    tokens = 0
+    for pieza in _PIEZAS.findall(texto):
+        tokens += (len(pieza) + 3) // 4 if pieza[0].isalnum() else 1
+    return tokens
+
+
+def tokens_mensaje(contenido: str) -> int:
+    """Tokens de un mensaje del prompt, incluida la sobrecarga del formato"""
+    return estimar_tokens(contenido) + TOKENS_POR_MENSAJE
+
+
+class Resumen:
+    """Resumen extractivo de los turnos que ya no caben en el prompt"""
+    __slots__ = ("temas", "preguntas", "ultimo")
+    
+    def __init__(self, max_preguntas: int):
+        self.temas: Dict[str, None] = {}  # conjunto ordenado
+        self.preguntas: Deque[str] = deque(maxlen=max_preguntas)
+        self.ultimo: Optional[Turno] = None  # último turno plegado
+    
+    def plegar(self, turno: Turno, max_caracteres: int) -> None:
+        """Incorpora un turno al resumen"""
+        self.ultimo = turno
+        if turno.rol != "user":
+            return
+        
+        intencion = detector_intenciones.detectar(turno.contenido)
+        if intencion is not None:
+            self.temas.pop(intencion.nombre, None)
+            self.temas[intencion.nombre] = None
+        
+        texto = " ".join(turno.contenido.split())
+        if len(texto) > max_caracteres:
+            texto = texto[:max_caracteres - 1].rstrip() + "…"
+        self.preguntas.append(texto)
+    
+    def texto(self) -> str:
+        """Resumen listo para un mensaje de sistema"""
+        partes = ["Resumen de la conversación anterior con este usuario."]
+        if self.temas:
+            partes.append(f"Temas tratados: {', '.join(self.temas)}.")
+        if self.preguntas:
+            partes.append("Mensajes anteriores del usuario: " + " | ".join(self.preguntas))
+        return " ".join(partes)
+
+
+class ConstructorContexto:
+    """Elige los turnos del prompt según el presupuesto y mantiene los resúmenes"""
+    
+    def __init__(
+        self,
+        presupuesto: int = 800,
+        max_sesiones: int = 2000,
+        max_preguntas: int = 5,
+        max_caracteres: int = 120
+    ):
+        self.presupuesto = presupuesto
+        self.max_sesiones = max_sesiones
+        self.max_preguntas = max_preguntas
+        self.max_caracteres = max_caracteres
+        
+        self._resumenes: "OrderedDict[str, Resumen]" = OrderedDict()
+        self._metricas: Dict[str, int] = {
+            "prompts": 0,
+            "tokens_historial": 0,
+            "max_tokens_historial": 0,
+            "turnos_plegados": 0,
+            "resumenes_reconstruidos": 0,
+            "prompts_con_documentacion": 0
+        }
+    
+    def seleccionar(self, historial: List[Turno]) -> Tuple[List[Turno], List[Turno]]:
+        """
+        Separa el historial en (plegados, recientes)
+        
+        Los recientes son el sufijo más largo que cabe en el presupuesto,
+        siempre en pares completos pregunta/respuesta cuando es posible.
+        """
+        usados = 0
+        inicio = len(historial)
+        for posicion in range(len(historial) - 1, -1, -1):
+            coste = tokens_mensaje(historial[posicion].contenido)
+            if usados + coste > self.presupuesto:
+                break
+            usados += coste
+            inicio = posicion
+        
+        # No empezar la ventana con una respuesta suelta
+        if inicio < len(historial) and historial[inicio].rol == "assistant":
+            inicio += 1
+        return historial[:inicio], historial[inicio:]
+    
+    def _resumen(self, session_id: str, historial: List[Turno], corte: int) -> Resumen:
+        """Resumen de la sesión ampliado con los turnos plegados nuevos (historial[:corte])"""
+        resumen = self._resumenes.get(session_id)
+        
+        # Turnos nuevos desde el último plegado, buscado desde el final (si
+        # la ventana ha retrocedido no hay nada nuevo que plegar). Se compara
+        # por identidad: la caché de sesiones devuelve los mismos objetos
+        # Turno en cada llamada y así dos mensajes iguales no se confunden.
+        nuevos = historial[:corte]
+        if resumen is not None and resumen.ultimo is not None:
+            for posicion in range(len(historial) - 1, -1, -1):
+                if historial[posicion] is resumen.ultimo:
+                    nuevos = historial[posicion + 1:corte]
+                    break
+            else:
+                # El historial ya no contiene el último turno plegado
+                # (sesión recargada de la BD): se rehace el resumen
+                resumen = None
+        
+        if resumen is None:
+            resumen = Resumen(self.max_preguntas)
+            self._metricas["resumenes_reconstruidos"] += 1
+        
+        for turno in nuevos:
+            resumen.plegar(turno, self.max_caracteres)
+        self._metricas["turnos_plegados"] += len(nuevos)
+        
+        self._resumenes[session_id] = resumen
+        self._resumenes.move_to_end(session_id)
+        while len(self._resumenes) > self.max_sesiones:
+            self._resumenes.popitem(last=False)
+        return resumen
+    
+    def construir(
+        self,
+        session_id: str,
+        system_prompt: str,
+        historial: List[Turno],
+        mensaje: str,
+        documentacion: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Mensajes para OpenAI: sistema, documentación del blog (si la hay),
+        resumen (si hay turnos plegados), historial reciente dentro del
+        presupuesto y mensaje actual
+        """
+        plegados, recientes = self.seleccionar(historial)
+        
+        mensajes = [{"role": "system", "content": system_prompt}]
+        if documentacion:
+            mensajes.append({"role": "system", "content": documentacion})
+            self._metricas["prompts_con_documentacion"] += 1
+        inicio_historial = len(mensajes)
+        if plegados:
+            resumen = self._resumen(session_id, historial, len(plegados))
+            mensajes.append({"role": "system", "content": resumen.texto()})
+        
+        mensajes.extend({"role": t.rol, "content": t.contenido} for t in recientes)
+        mensajes.append({"role": "user", "content": mensaje})
+        
+        tokens = sum(tokens_mensaje(m["content"]) for m in mensajes[inicio_historial:-1])
+        self._metricas["prompts"] += 1
+        self._metricas["tokens_historial"] += tokens
+        self._metricas["max_tokens_historial"] = max(self._metricas["max_tokens_historial"], tokens)
+        return mensajes
+    
+    def olvidar(self, session_id: str) -> None:
+        """Descarta el resumen de una sesión"""
+        self._resumenes.pop(session_id, None)
+    
+    def metricas(self) -> Dict[str, int]:
+        """Tokens de historial enviados y actividad de los resúmenes"""
+        prompts = self._metricas["prompts"]
+        return {
+            **self._metricas,
+            "media_tokens_historial": self._metricas["tokens_historial"] // prompts if prompts else 0,
+            "resumenes": len(self._resumenes)
+        }
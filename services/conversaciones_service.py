@@ -0,0 +1,230 @@
+"""
+Servicio de Conversaciones - Historial del chatbot compartido entre workers
+
+Los turnos se guardan en la tabla `conversaciones` con escritura diferida:
+`agregar` solo los anota en memoria y una tarea de fondo los inserta por
+lotes (un INSERT y un commit cada CHAT_ESCRITURA_ESPERA_MS como mucho).
+
+Cada worker mantiene además una caché caliente (AlmacenSesiones). Al leer el
+historial se hace una única consulta por el índice de session_id:
+- fallo de caché: los últimos `max_mensajes` turnos de la sesión
+- acierto: solo las filas con id mayor que el último visto (normalmente
+  ninguna), para incorporar lo que haya escrito otro worker
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+import asyncio
+import logging
+
+from sqlalchemy import select, insert
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Conversacion
+from .sesiones_chat import AlmacenSesiones, Sesion, Turno
+
+logger = logging.getLogger(__name__)
+
+
+class _TurnoPendiente(NamedTuple):
+    """Turno anotado en memoria que aún no está en la BD"""
+    session_id: str
+    rol: str
+    mensaje: str
+    created_at: datetime
+
+
+class ConversacionesService:
+    """Historial de sesiones del chatbot con caché en memoria y escritura por lotes"""
+    
+    def __init__(self):
+        self.cache = AlmacenSesiones(
+            max_sesiones=settings.chat_max_sesiones,
+            ttl=settings.chat_sesion_ttl,
+            max_mensajes=settings.chat_max_mensajes
+        )
+        self.espera = settings.chat_escritura_espera_ms / 1000
+        self.max_lote = settings.chat_escritura_max_lote
+        
+        self._pendientes: List[_TurnoPendiente] = []
+        self._hay_pendientes: Optional[asyncio.Event] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._metricas: Dict[str, int] = {
+            "lecturas_completas": 0,
+            "lecturas_incrementales": 0,
+            "turnos_de_otros_workers": 0,
+            "turnos_escritos": 0,
+            "lotes": 0,
+            "errores_escritura": 0
+        }
+    
+    async def iniciar(self) -> None:
+        """Arranca la tarea de escritura diferida"""
+        if self._tarea is None:
+            self._hay_pendientes = asyncio.Event()
+            if self._pendientes:
+                self._hay_pendientes.set()
+            self._tarea = asyncio.create_task(self._bucle(), name="conversaciones-escritura")
+    
+    async def detener(self) -> None:
+        """Para la tarea y escribe lo que quede pendiente"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            await asyncio.gather(self._tarea, return_exceptions=True)
+            self._tarea = None
+        
+        while self._pendientes:
+            if not await self.volcar():
+                logger.error(f"Se pierden {len(self._pendientes)} turnos de chat sin guardar")
+                break
+    
+    async def historial(self, session_id: str) -> List[Turno]:
+        """
+        Turnos de la sesión, incluidos los escritos por otros workers
+        
+        Returns:
+            List[Turno]: Como mucho los últimos `max_mensajes`
+        """
+        sesion = self.cache.obtener(session_id, crear=False)
+        
+        try:
+            if sesion is None:
+                sesion = await self._cargar(session_id)
+            else:
+                await self._actualizar(session_id, sesion)
+        except Exception as e:
+            # Sin BD se sigue con lo que haya en memoria
+            logger.error(f"Error leyendo historial de chat {session_id}: {e}")
+            if sesion is None:
+                sesion = self.cache.obtener(session_id)
+        
+        return list(sesion.turnos)
+    
+    async def _cargar(self, session_id: str) -> Sesion:
+        """Fallo de caché: últimos turnos de la sesión desde la BD"""
+        self._metricas["lecturas_completas"] += 1
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Conversacion.id, Conversacion.rol, Conversacion.mensaje, Conversacion.created_at)
+                .where(Conversacion.session_id == session_id)
+                .order_by(Conversacion.id.desc())
+                .limit(self.cache.max_mensajes)
+            )
+            filas = result.all()
+        
+        # Una sesión inactiva más allá del TTL empieza de cero, igual que en memoria
+        limite = datetime.utcnow() - timedelta(seconds=self.cache.ttl)
+        if filas and filas[0].created_at and filas[0].created_at < limite:
+            filas = []
+        
+        sesion = self.cache.obtener(session_id)
+        sesion.turnos.clear()
+        sesion.propios.clear()
+        sesion.ultimo_id = filas[0].id if filas else 0
+        for fila in reversed(filas):
+            sesion.turnos.append(Turno(fila.rol, fila.mensaje))
+        
+        # Turnos de esta sesión aún en cola (la sesión había salido de la caché)
+        for pendiente in self._pendientes:
+            if pendiente.session_id == session_id:
+                sesion.turnos.append(Turno(pendiente.rol, pendiente.mensaje))
+        return sesion
+    
+    async def _actualizar(self, session_id: str, sesion: Sesion) -> None:
+        """Acierto de caché: incorpora los turnos nuevos de otros workers"""
+        self._metricas["lecturas_incrementales"] += 1
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Conversacion.id, Conversacion.rol, Conversacion.mensaje)
+                .where(Conversacion.session_id == session_id, Conversacion.id > sesion.ultimo_id)
+                .order_by(Conversacion.id)
+            )
+            filas = result.all()
+        
+        for fila in filas:
+            if fila.id in sesion.propios:
+                sesion.propios.discard(fila.id)
+            else:
+                sesion.turnos.append(Turno(fila.rol, fila.mensaje))
+                self._metricas["turnos_de_otros_workers"] += 1
+            sesion.ultimo_id = max(sesion.ultimo_id, fila.id)
+    
+    def agregar(self, session_id: str, rol: str, contenido: str) -> None:
+        """Añade un turno a la caché y lo deja en cola para la BD"""
+        self.cache.obtener(session_id).turnos.append(Turno(rol, contenido))
+        self._pendientes.append(_TurnoPendiente(session_id, rol, contenido, datetime.utcnow()))
+        if self._hay_pendientes is not None:
+            self._hay_pendientes.set()
+    
+    async def _bucle(self) -> None:
+        """Espera a que haya turnos, deja pasar la ventana de agrupación y escribe"""
+        while True:
+            await self._hay_pendientes.wait()
+            if len(self._pendientes) < self.max_lote:
+                await asyncio.sleep(self.espera)
+            self._hay_pendientes.clear()
+            
+            if not await self.volcar():
+                # BD no disponible: reintentar más tarde sin perder la cola
+                await asyncio.sleep(max(self.espera, 1.0))
+                self._hay_pendientes.set()
+    
+    async def volcar(self) -> bool:
+        """
+        Inserta los turnos pendientes en un lote
+        
+        Returns:
+            bool: False si la escritura falló (los turnos vuelven a la cola)
+        """
+        lote = self._pendientes[:self.max_lote]
+        if not lote:
+            return True
+        del self._pendientes[:len(lote)]
+        
+        marcados = []
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    insert(Conversacion).returning(Conversacion.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "session_id": p.session_id,
+                            "rol": p.rol,
+                            "mensaje": p.mensaje,
+                            "created_at": p.created_at
+                        }
+                        for p in lote
+                    ]
+                )
+                # Se marcan antes del commit: ninguna lectura puede ver las filas sin saber que son propias
+                for pendiente, id_ in zip(lote, result.scalars()):
+                    sesion = self.cache.consultar(pendiente.session_id)
+                    if sesion is not None:
+                        sesion.propios.add(id_)
+                        marcados.append((sesion, id_))
+                await db.commit()
+        except Exception as e:
+            for sesion, id_ in marcados:
+                sesion.propios.discard(id_)
+            self._pendientes[:0] = lote
+            self._metricas["errores_escritura"] += 1
+            logger.error(f"Error guardando {len(lote)} turnos de chat: {e}")
+            return False
+        
+        self._metricas["lotes"] += 1
+        self._metricas["turnos_escritos"] += len(lote)
+        if self._pendientes and self._hay_pendientes is not None:
+            self._hay_pendientes.set()
+        return True
+    
+    def metricas(self) -> Dict[str, int]:
+        """Lecturas, escrituras por lotes y estado de la caché"""
+        return {
+            **self._metricas,
+            "pendientes": len(self._pendientes),
+            **self.cache.estadisticas()
+        }
+
+
+# Instancia singleton
+conversaciones_service = ConversacionesService()
@@ -0,0 +1,370 @@
+"""
+CSS crítico - Minificado de hojas de estilo y reglas "sobre el pliegue" por página
+
+Lo usa el build de estáticos (scripts/construir_estaticos.py):
+
+- minificar(): quita comentarios y espacios y descarta reglas vacías. Las
+  hojas de static/ se publican minificadas.
+- critico(): de la hoja minificada se queda con las reglas que aplican a lo
+  que se ve al cargar la página: cabecera, el principio de <main> y los
+  elementos fijos (WhatsApp, chat). Va en línea en el <head> de cada página,
+  y la hoja completa se carga sin bloquear el renderizado.
+
+La coincidencia de selectores es conservadora: se ignora la estructura
+(descendiente, hijo, hermano) y las pseudoclases, así que una regla entra si
+cada parte del selector coincide con algún elemento del pliegue. Sobra algo
+de CSS, pero no falta.
+
+Ambos resultados se guardan en DIRECTORIO_CACHE con el hash de su entrada:
+un build sin cambios en la hoja ni en la estructura de la página no repite
+el trabajo.
+"""
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+import hashlib
+import os
+import re
+
+DIRECTORIO_CACHE = Path("data/cache_css")
+
+# Elementos de <main> que cuentan como visibles al cargar (por orden del documento)
+ELEMENTOS_PLIEGUE = 60
+
+# Sin etiqueta de cierre
+ETIQUETAS_VACIAS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"
+})
+
+# Clases que pone main.js en tiempo de ejecución: cualquier elemento puede tenerlas
+CLASES_DINAMICAS = frozenset({"active", "animate-in"})
+
+# At-rules con declaraciones; el resto (@media, @supports, @keyframes...) anidan reglas
+AT_DECLARACIONES = frozenset({"@font-face", "@page", "@property", "@counter-style"})
+
+_CADENAS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_COMENTARIOS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.S)
+_ANIMACION = re.compile(r"(?:^|;)(?:-webkit-)?animation(?:-name)?:([^;]+)")
+
+
+class Regla(NamedTuple):
+    """Regla de estilo o at-rule; `hijas` solo en las que anidan reglas"""
+    prelude: str
+    declaraciones: str = ""
+    hijas: Optional[List["Regla"]] = None
+
+
+class Elemento(NamedTuple):
+    """Lo que necesita un selector simple: etiqueta, clases e id"""
+    etiqueta: str
+    clases: FrozenSet[str]
+    id: Optional[str]
+
+
+# =============================================
+# ANÁLISIS Y MINIFICADO
+# =============================================
+
+def _fuera_de_cadenas(texto: str, funcion: Callable[[str], str]) -> str:
+    """Aplica `funcion` al texto que no está entre comillas"""
+    partes = _CADENAS.split(texto)
+    return "".join(parte if i % 2 else funcion(parte) for i, parte in enumerate(partes))
+
+
+def _partir(texto: str, separadores: str, inicio: int = 0) -> Tuple[int, str]:
+    """Posición del primer separador fuera de cadenas, paréntesis y llaves"""
+    profundidad = 0
+    comilla = None
+    i = inicio
+    while i < len(texto):
+        c = texto[i]
+        if comilla:
+            if c == "\\":
+                i += 1
+            elif c == comilla:
+                comilla = None
+        elif c in "\"'":
+            comilla = c
+        elif c in "([":
+            profundidad += 1
+        elif c in ")]":
+            profundidad -= 1
+        elif profundidad == 0 and c in separadores:
+            return i, c
+        i += 1
+    return len(texto), ""
+
+
+def _cierre(texto: str, apertura: int) -> int:
+    """Posición de la llave que cierra la abierta en `apertura`"""
+    nivel = 0
+    i = apertura
+    while True:
+        i, c = _partir(texto, "{}", i)
+        if not c:
+            return len(texto)
+        nivel += 1 if c == "{" else -1
+        if nivel == 0:
+            return i
+        i += 1
+
+
+def analizar(css: str) -> List[Regla]:
+    """Reglas de una hoja de estilo (sin comentarios)"""
+    css = _COMENTARIOS.sub(lambda m: m.group(1) or "", css)
+    return _reglas(css)
+
+
+def _reglas(css: str) -> List[Regla]:
+    reglas: List[Regla] = []
+    i = 0
+    while i < len(css):
+        j, c = _partir(css, "{;", i)
+        prelude = css[i:j].strip()
+        if c != "{":
+            if prelude:
+                reglas.append(Regla(prelude))  # @import, @charset
+            i = j + 1
+            continue
+        
+        k = _cierre(css, j)
+        cuerpo = css[j + 1:k]
+        nombre = prelude.split(None, 1)[0].lower() if prelude.startswith("@") else ""
+        if nombre and nombre not in AT_DECLARACIONES:
+            reglas.append(Regla(prelude, hijas=_reglas(cuerpo)))
+        else:
+            reglas.append(Regla(prelude, cuerpo))
+        i = k + 1
+    return reglas
+
+
+def _minificar_prelude(prelude: str) -> str:
+    def compactar(texto: str) -> str:
+        texto = re.sub(r"\s+", " ", texto)
+        if prelude.startswith("@"):
+            return re.sub(r"\s*([:,])\s*", r"\1", texto)
+        return re.sub(r"\s*([>+~,])\s*", r"\1", texto)
+    return _fuera_de_cadenas(prelude.strip(), compactar)
+
+
+def _minificar_declaraciones(cuerpo: str) -> str:
+    def compactar(texto: str) -> str:
+        texto = re.sub(r"\s+", " ", texto)
+        texto = re.sub(r"\s*,\s*", ",", texto)
+        return re.sub(r"\s*!\s*important", "!important", texto)
+    
+    declaraciones = []
+    i = 0
+    while i < len(cuerpo):
+        j, _ = _partir(cuerpo, ";", i)
+        propiedad, _, valor = cuerpo[i:j].partition(":")
+        if propiedad.strip() and valor.strip():
+            declaraciones.append(f"{propiedad.strip()}:{_fuera_de_cadenas(valor.strip(), compactar)}")
+        i = j + 1
+    return ";".join(declaraciones)
+
+
+def serializar(reglas: Iterable[Regla]) -> str:
+    """CSS minificado de una lista de reglas (sin las vacías)"""
+    partes = []
+    for regla in reglas:
+        prelude = _minificar_prelude(regla.prelude)
+        if regla.hijas is not None:
+            interior = serializar(regla.hijas)
+            if interior:
+                partes.append(f"{prelude}{{{interior}}}")
+        elif not regla.declaraciones:
+            if prelude.startswith("@"):
+                partes.append(f"{prelude};")
+        else:
+            declaraciones = _minificar_declaraciones(regla.declaraciones)
+            if declaraciones:
+                partes.append(f"{prelude}{{{declaraciones}}}")
+    return "".join(partes)
+
+
+def minificar(css: str) -> str:
+    """Hoja de estilo minificada"""
+    return serializar(analizar(css))
+
+
+# =============================================
+# PLIEGUE
+# =============================================
+
+class _ExtractorPliegue(HTMLParser):
+    """
+    Elementos visibles al cargar: todo lo que no es <main> ni el pie, y los
+    primeros `limite` elementos de <main>. Se salta lo oculto con
+    style="display: none" (la ventana del chat)
+    """
+    
+    def __init__(self, limite: int):
+        super().__init__(convert_charrefs=True)
+        self.limite = limite
+        self.elementos: Set[Elemento] = set()
+        self._pila: List[Tuple[str, bool]] = []  # (etiqueta, fuera del pliegue)
+        self._en_main = False
+        self._vistos = 0
+    
+    def handle_starttag(self, tag, attrs):
+        atributos = dict(attrs)
+        estilo = (atributos.get("style") or "").replace(" ", "").lower()
+        fuera = (
+            any(f for _, f in self._pila)
+            or (tag == "footer" and not self._en_main)
+            or "display:none" in estilo
+        )
+        if tag not in ETIQUETAS_VACIAS:
+            self._pila.append((tag, fuera))
+        if tag == "main":
+            self._en_main = True
+        
+        if fuera:
+            return
+        if self._en_main and tag != "main":
+            if self._vistos >= self.limite:
+                return
+            self._vistos += 1
+        self.elementos.add(Elemento(tag, frozenset((atributos.get("class") or "").split()), atributos.get("id")))
+    
+    def handle_endtag(self, tag):
+        if tag == "main":
+            self._en_main = False
+        for i in range(len(self._pila) - 1, -1, -1):
+            if self._pila[i][0] == tag:
+                del self._pila[i:]
+                break
+
+
+def pliegue(html: str, limite: int = ELEMENTOS_PLIEGUE) -> FrozenSet[Elemento]:
+    """Elementos distintos sobre el pliegue de una página renderizada"""
+    extractor = _ExtractorPliegue(limite)
+    extractor.feed(html)
+    extractor.close()
+    return frozenset(extractor.elementos)
+
+
+# =============================================
+# EXTRACCIÓN
+# =============================================
+
+def _compuestos(selector: str) -> List[Elemento]:
+    """Partes de un selector, sin pseudoclases ni atributos"""
+    selector = re.sub(r"::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?", "", selector)
+    selector = re.sub(r"\[[^\]]*\]", "", selector)
+    compuestos = []
+    for parte in re.split(r"\s*[>+~]\s*|\s+", selector.strip()):
+        etiqueta = re.match(r"[a-zA-Z][\w-]*", parte)
+        clases = frozenset(re.findall(r"\.([\w-]+)", parte)) - CLASES_DINAMICAS
+        ids = re.findall(r"#([\w-]+)", parte)
+        compuestos.append(Elemento(etiqueta.group(0).lower() if etiqueta else "", clases, ids[0] if ids else None))
+    return compuestos
+
+
+def _coincide(selector: str, elementos: FrozenSet[Elemento]) -> bool:
+    for compuesto in _compuestos(selector):
+        if not any(
+            (not compuesto.etiqueta or compuesto.etiqueta == e.etiqueta)
+            and compuesto.clases <= e.clases
+            and (compuesto.id is None or compuesto.id == e.id)
+            for e in elementos
+        ):
+            return False
+    return True
+
+
+def _filtrar(reglas: List[Regla], elementos: FrozenSet[Elemento]) -> List[Regla]:
+    """Reglas de estilo que aplican al pliegue; las @keyframes se resuelven aparte"""
+    criticas = []
+    for regla in reglas:
+        nombre = regla.prelude.split(None, 1)[0].lower() if regla.prelude.startswith("@") else ""
+        if nombre.endswith("keyframes"):
+            criticas.append(regla)
+        elif regla.hijas is not None:
+            hijas = _filtrar(regla.hijas, elementos)
+            if hijas:
+                criticas.append(regla._replace(hijas=hijas))
+        elif nombre == "@font-face":
+            criticas.append(regla)
+        elif not nombre and any(_coincide(s, elementos) for s in _partir_selectores(regla.prelude)):
+            criticas.append(regla)
+    return criticas
+
+
+def _partir_selectores(prelude: str) -> List[str]:
+    selectores = []
+    i = 0
+    while i < len(prelude):
+        j, _ = _partir(prelude, ",", i)
+        selectores.append(prelude[i:j])
+        i = j + 1
+    return selectores
+
+
+def _animaciones(reglas: List[Regla]) -> Set[str]:
+    """Nombres de animación usados por las reglas"""
+    nombres: Set[str] = set()
+    for regla in reglas:
+        if regla.hijas is not None:
+            if not regla.prelude.lower().split(None, 1)[0].endswith("keyframes"):
+                nombres |= _animaciones(regla.hijas)
+        elif regla.declaraciones:
+            for valor in _ANIMACION.findall(_minificar_declaraciones(regla.declaraciones)):
+                nombres.update(re.split(r"[\s,]+", valor))
+    return nombres
+
+
+def _sin_animaciones_ajenas(reglas: List[Regla], usadas: Set[str]) -> List[Regla]:
+    resultado = []
+    for regla in reglas:
+        partes = regla.prelude.split()
+        if regla.prelude.startswith("@") and partes[0].lower().endswith("keyframes"):
+            if len(partes) > 1 and partes[1] in usadas:
+                resultado.append(regla)
+        elif regla.hijas is not None:
+            resultado.append(regla._replace(hijas=_sin_animaciones_ajenas(regla.hijas, usadas)))
+        else:
+            resultado.append(regla)
+    return resultado
+
+
+def critico(css: str, elementos: FrozenSet[Elemento]) -> str:
+    """CSS minificado con las reglas que necesitan los elementos del pliegue"""
+    reglas = _filtrar(analizar(css), elementos)
+    return serializar(_sin_animaciones_ajenas(reglas, _animaciones(reglas)))
+
+
+# =============================================
+# CACHÉ POR CONTENIDO
+# =============================================
+
+def _en_cache(clave: bytes, generar: Callable[[], str], directorio: Path) -> str:
+    """Resultado guardado con el hash de su entrada, o lo genera y lo guarda"""
+    ruta = directorio / f"{hashlib.blake2b(clave, digest_size=16).hexdigest()}.css"
+    try:
+        return ruta.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        pass
+    
+    resultado = generar()
+    directorio.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    temporal.write_text(resultado, encoding="utf-8")
+    os.replace(temporal, ruta)
+    return resultado
+
+
+def minificar_con_cache(css: str, directorio: Path = DIRECTORIO_CACHE) -> str:
+    """minificar() reutilizando el resultado si la hoja no ha cambiado"""
+    return _en_cache(b"min\0" + css.encode("utf-8"), lambda: minificar(css), directorio)
+
+
+def critico_con_cache(css: str, html: str, directorio: Path = DIRECTORIO_CACHE) -> str:
+    """critico() reutilizando el resultado si ni la hoja ni el pliegue han cambiado"""
+    elementos = pliegue(html)
+    firma = "\n".join(sorted(
+        f"{e.etiqueta}#{e.id or ''}.{'.'.join(sorted(e.clases))}" for e in elementos
+    ))
+    clave = f"critico\0{ELEMENTOS_PLIEGUE}\0{css}\0{firma}".encode("utf-8")
+    return _en_cache(clave, lambda: critico(css, elementos), directorio)
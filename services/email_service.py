@@ -2,15 +2,148 @@
 Servicio de Email - Equivalente al nodo de Gmail en n8n
 """
 import aiosmtplib
+from email.message import Message
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import settings
-from typing import Optional
+from typing import Dict, List, Optional
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+# Errores que indican que el servidor cerró una sesión reutilizada
+ERRORES_DESCONEXION = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError
+)
+
+
+class _ConexionSMTP:
+    """Sesión SMTP autenticada dentro del pool"""
+    __slots__ = ("smtp", "ultimo_uso")
+    
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.ultimo_uso = time.monotonic()
+
+
+class PoolSMTP:
+    """
+    Pool de conexiones SMTP persistentes
+    
+    Mantiene sesiones ya conectadas, con STARTTLS y login hechos, para que
+    cada email solo cueste el intercambio MAIL/RCPT/DATA. Las conexiones que
+    llevan demasiado tiempo ociosas o que el servidor ha cerrado se descartan
+    y se abren de nuevo.
+    """
+    
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        tamano: int = 2,
+        inactividad: float = 240.0,
+        timeout: float = 30.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.tamano = tamano
+        self.inactividad = inactividad
+        self.timeout = timeout
+        
+        self._libres: List[_ConexionSMTP] = []
+        self._semaforo = asyncio.Semaphore(tamano)
+        self._metricas: Dict[str, int] = {
+            "envios": 0,
+            "errores": 0,
+            "conexiones_nuevas": 0,
+            "reutilizadas": 0,
+            "reconexiones": 0,
+            "descartadas_inactivas": 0
+        }
+    
+    async def _conectar(self) -> _ConexionSMTP:
+        """Abre una sesión nueva (TCP + STARTTLS + login)"""
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            start_tls=True,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        self._metricas["conexiones_nuevas"] += 1
+        return _ConexionSMTP(smtp)
+    
+    async def _cerrar_conexion(self, conexion: _ConexionSMTP) -> None:
+        """Cierra una sesión ignorando errores (puede estar ya caída)"""
+        try:
+            if conexion.smtp.is_connected:
+                await conexion.smtp.quit()
+        except Exception:
+            conexion.smtp.close()
+    
+    async def _obtener(self) -> _ConexionSMTP:
+        """Devuelve la sesión libre más reciente o abre una nueva"""
+        ahora = time.monotonic()
+        
+        while self._libres:
+            conexion = self._libres.pop()
+            if conexion.smtp.is_connected and ahora - conexion.ultimo_uso < self.inactividad:
+                self._metricas["reutilizadas"] += 1
+                return conexion
+            
+            self._metricas["descartadas_inactivas"] += 1
+            await self._cerrar_conexion(conexion)
+        
+        return await self._conectar()
+    
+    async def enviar(self, mensaje: Message) -> None:
+        """
+        Envía un mensaje por una sesión del pool
+        
+        Si el servidor cerró la sesión reutilizada se reconecta una vez y
+        se reintenta. Cualquier otro error se propaga.
+        """
+        async with self._semaforo:
+            conexion = await self._obtener()
+            try:
+                try:
+                    await conexion.smtp.send_message(mensaje)
+                except ERRORES_DESCONEXION:
+                    await self._cerrar_conexion(conexion)
+                    self._metricas["reconexiones"] += 1
+                    conexion = await self._conectar()
+                    await conexion.smtp.send_message(mensaje)
+            except Exception:
+                self._metricas["errores"] += 1
+                await self._cerrar_conexion(conexion)
+                raise
+            
+            self._metricas["envios"] += 1
+            conexion.ultimo_uso = time.monotonic()
+            self._libres.append(conexion)
+    
+    async def cerrar(self) -> None:
+        """Cierra todas las sesiones abiertas"""
+        libres, self._libres = self._libres, []
+        for conexion in libres:
+            await self._cerrar_conexion(conexion)
+    
+    def metricas(self) -> Dict[str, int]:
+        """Contadores de reutilización y reconexión"""
+        return {**self._metricas, "conexiones_libres": len(self._libres)}
+
+
 class EmailService:
     """Servicio para envío de emails"""
     
@@ -20,6 +153,20 @@ class EmailService:
         self.smtp_user = settings.smtp_user
         self.smtp_password = settings.smtp_password
         self.email_from = settings.email_from
+        self.pool = PoolSMTP(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            tamano=settings.smtp_pool_tamano,
+            inactividad=settings.smtp_pool_inactividad,
+            timeout=settings.smtp_timeout
+        )
+    
+    @property
+    def configurado(self) -> bool:
+        """True si hay credenciales SMTP"""
+        return bool(self.smtp_user and self.smtp_password)
     
     async def enviar_email(
         self,
@@ -55,15 +202,8 @@ class EmailService:
             parte_html = MIMEText(contenido_html, "html", "utf-8")
             mensaje.attach(parte_html)
             
-            # Enviar
-            await aiosmtplib.send(
-                mensaje,
-                hostname=self.smtp_host,
-                port=self.smtp_port,
-                username=self.smtp_user,
-                password=self.smtp_password,
-                start_tls=True
-            )
+            # Enviar por una conexión del pool
+            await self.pool.enviar(mensaje)
             
             logger.info(f"Email enviado a {destinatario}: {asunto}")
             return True
@@ -72,6 +212,14 @@ class EmailService:
             logger.error(f"Error enviando email: {e}")
             return False
     
+    async def cerrar(self) -> None:
+        """Cierra las conexiones SMTP del pool (al apagar la aplicación)"""
+        await self.pool.cerrar()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Métricas del pool SMTP"""
+        return self.pool.metricas()
+    
     async def notificar_nuevo_lead(self, lead_data: dict) -> bool:
         """
         Envía notificación de nuevo lead (equivalente al workflow de n8n)
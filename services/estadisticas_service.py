@@ -0,0 +1,113 @@
+"""
+Servicio de Estadísticas - Contadores diarios de leads para /api/stats
+
+Cada alta de lead suma 1 al contador de su día (tabla `estadisticas_diarias`)
+dentro de la misma transacción, con un UPSERT atómico. Al ser una tabla
+compartida, los contadores son correctos con varios workers de gunicorn.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy import select, func, case, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, engine
+from models import Lead, EstadisticaDiaria
+
+logger = logging.getLogger(__name__)
+
+
+def _insert():
+    """INSERT del dialecto en uso (ambos soportan ON CONFLICT)"""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(EstadisticaDiaria)
+    return sqlite.insert(EstadisticaDiaria)
+
+
+class EstadisticasService:
+    """Rollup diario de leads"""
+    
+    async def registrar_leads(
+        self,
+        db: AsyncSession,
+        cantidad: int = 1,
+        fecha: Optional[date] = None
+    ) -> None:
+        """
+        Suma leads al contador del día. No hace commit: debe ir en la misma
+        transacción que el INSERT de los leads.
+        """
+        stmt = _insert().values(fecha=fecha or datetime.utcnow().date(), leads=cantidad)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EstadisticaDiaria.fecha],
+            set_={"leads": EstadisticaDiaria.leads + stmt.excluded.leads}
+        )
+        await db.execute(stmt)
+    
+    async def sincronizar(self) -> None:
+        """
+        Reconstruye el rollup si no cuadra con la tabla de leads (primera
+        ejecución o leads insertados por otras vías). Solo se llama al arrancar.
+        """
+        async with AsyncSessionLocal() as db:
+            total_leads = (await db.execute(select(func.count()).select_from(Lead))).scalar()
+            total_rollup = (await db.execute(select(func.sum(EstadisticaDiaria.leads)))).scalar() or 0
+            
+            if total_leads == total_rollup:
+                return
+            
+            logger.info(f"Reconstruyendo estadísticas diarias ({total_rollup} != {total_leads})")
+            
+            dia = func.date(Lead.created_at)
+            result = await db.execute(
+                select(dia, func.count()).where(Lead.created_at.is_not(None)).group_by(dia)
+            )
+            filas = [
+                {
+                    # SQLite devuelve la fecha como texto
+                    "fecha": date.fromisoformat(fecha) if isinstance(fecha, str) else fecha,
+                    "leads": cantidad
+                }
+                for fecha, cantidad in result.all()
+            ]
+            
+            try:
+                await db.execute(delete(EstadisticaDiaria))
+                if filas:
+                    await db.execute(_insert(), filas)
+                await db.commit()
+            except Exception as e:
+                # Otro worker la está reconstruyendo a la vez
+                await db.rollback()
+                logger.warning(f"No se pudo reconstruir el rollup: {e}")
+    
+    async def resumen(self) -> Dict[str, int]:
+        """Total, hoy y últimos 7 días naturales (incluido hoy) en una consulta"""
+        hoy = datetime.utcnow().date()
+        inicio_semana = hoy - timedelta(days=6)
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    func.coalesce(func.sum(EstadisticaDiaria.leads), 0),
+                    func.coalesce(func.sum(
+                        case((EstadisticaDiaria.fecha == hoy, EstadisticaDiaria.leads), else_=0)
+                    ), 0),
+                    func.coalesce(func.sum(
+                        case((EstadisticaDiaria.fecha >= inicio_semana, EstadisticaDiaria.leads), else_=0)
+                    ), 0)
+                )
+            )
+            total, leads_hoy, leads_semana = result.one()
+        
+        return {
+            "total_leads": total,
+            "leads_hoy": leads_hoy,
+            "leads_semana": leads_semana
+        }
+
+
+# Instancia singleton
+estadisticas_service = EstadisticasService()
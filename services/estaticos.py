@@ -0,0 +1,488 @@
+"""
+Estáticos - Ficheros con hash en el nombre, precomprimidos y cacheables para siempre
+
+El paso de build (scripts/construir_estaticos.py) copia cada fichero de
+static/ a static/dist/ con un hash de su contenido en el nombre
+(css/styles.css -> css/styles.1a2b3c4d5e.css) y, para los de texto, escribe
+al lado las versiones .gz y .br. El manifiesto static/dist/manifest.json
+relaciona cada ruta original con su versión con hash.
+
+- asset_url("css/styles.css") (global de Jinja) devuelve la URL con hash;
+  en debug, o si no se ha hecho el build, la ruta normal de /static
+- /static/dist sirve la variante comprimida que acepte el navegador
+  (Accept-Encoding) con Cache-Control immutable: si el fichero cambia,
+  cambia su nombre
+- podar() borra de static/dist lo que ya no usa ningún manifiesto, pasado
+  un margen (GRACIA_PODA) para los workers que aún sirven el anterior
+
+Las imágenes (png/jpg) se reducen además a varios anchos en AVIF y WebP,
+más una de respaldo en JPEG (o PNG si tiene transparencia); van en
+static/dist/imagenes.json y la macro picture() de templates/macros/imagenes.html
+las convierte en <picture> con srcset, width y height.
+
+Las hojas de estilo se publican minificadas y, por cada página, su CSS
+crítico (services/css_critico.py) se guarda en static/dist/critico.json para
+ir en línea en el <head>.
+
+static/dist/fechas.json guarda la fecha del último commit de cada plantilla
+(git log, en el build): es el <lastmod> del sitemap, porque en el servidor el
+mtime de los ficheros es el del checkout, no el del último cambio.
+"""
+from pathlib import Path
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import stat
+import subprocess
+import time
+
+import anyio
+from markupsafe import Markup
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from config import settings
+from .css_critico import critico_con_cache, minificar_con_cache
+
+try:
+    import brotli
+except ImportError:  # solo se generan los .gz
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # sin variantes de imágenes: se sirve el original
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_ORIGEN = Path("static")
+DIRECTORIO_DIST = DIRECTORIO_ORIGEN / "dist"
+URL_ESTATICOS = "/static"
+URL_DIST = "/static/dist"
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+# Se comprimen los de texto; las imágenes ya vienen comprimidas
+COMPRIMIBLES = frozenset({".css", ".js", ".svg", ".json", ".txt", ".xml", ".html", ".map"})
+
+# Ficheros que se sirven con su nombre de siempre
+SIN_HASH = frozenset({"robots.txt"})
+
+# Por orden de preferencia
+CODIFICACIONES: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+# Variantes de imágenes: anchos (hasta el del original) y formatos por orden
+# de preferencia del <picture>
+IMAGENES = frozenset({".png", ".jpg", ".jpeg"})
+ANCHOS_IMAGEN = (160, 320, 480, 640, 960, 1280, 1920)
+FORMATOS_IMAGEN: Tuple[Tuple[str, Dict], ...] = (
+    ("avif", {"quality": 50, "speed": 4}),
+    ("webp", {"quality": 80, "method": 6}),
+)
+ANCHO_RESPALDO = 960  # <img src> para navegadores sin AVIF ni WebP
+
+# Hoja de la que se extrae el CSS crítico de cada página
+HOJA_CRITICA = "css/styles.css"
+
+# Ficheros de static/dist que describen el build (no llevan hash)
+METADATOS = ("manifest.json", "imagenes.json", "critico.json", "fechas.json")
+
+# Lo que deja de usarse se borra pasado este plazo (segundos)
+GRACIA_PODA = 24 * 3600
+OBSOLETOS = "obsoletos.json"  # desde cuándo no se usa cada fichero
+
+
+# =============================================
+# BUILD
+# =============================================
+
+def _hash(contenido: bytes) -> str:
+    return hashlib.blake2b(contenido, digest_size=5).hexdigest()
+
+
+def _escribir_si_falta(ruta: Path, generar: Callable[[], bytes]) -> None:
+    """Escribe el fichero si no existe (con renombrado: nunca queda a medias)"""
+    if ruta.exists():
+        return
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    temporal.write_bytes(generar())
+    os.replace(temporal, ruta)
+
+
+def construir(origen: Path = DIRECTORIO_ORIGEN, destino: Path = DIRECTORIO_DIST) -> Dict[str, str]:
+    """
+    Copia los estáticos a `destino` con hash en el nombre y los precomprime
+    
+    Returns:
+        Dict[str, str]: Manifiesto (ruta original -> ruta con hash)
+    """
+    manifiesto: Dict[str, str] = {}
+    destino.mkdir(parents=True, exist_ok=True)
+    
+    for ruta in sorted(origen.rglob("*")):
+        relativa = ruta.relative_to(origen)
+        if not ruta.is_file() or destino in ruta.parents or relativa.as_posix() in SIN_HASH:
+            continue
+        
+        contenido = ruta.read_bytes()
+        if ruta.suffix == ".css":
+            contenido = minificar_con_cache(contenido.decode("utf-8")).encode("utf-8")
+        con_hash = relativa.with_name(f"{ruta.stem}.{_hash(contenido)}{ruta.suffix}")
+        salida = destino / con_hash
+        manifiesto[relativa.as_posix()] = con_hash.as_posix()
+        
+        # Cada fichero por separado: un build interrumpido, o uno anterior sin
+        # Brotli, se completa en el siguiente
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        _escribir_si_falta(salida, lambda: contenido)
+        if ruta.suffix in COMPRIMIBLES:
+            # mtime=0: el .gz es idéntico en cada build
+            _escribir_si_falta(salida.with_name(salida.name + ".gz"), lambda: gzip.compress(contenido, 9, mtime=0))
+            if brotli is not None:
+                _escribir_si_falta(salida.with_name(salida.name + ".br"), lambda: brotli.compress(contenido, quality=11))
+    
+    _escribir_json(destino / "manifest.json", manifiesto)
+    return manifiesto
+
+
+def podar(destino: Path = DIRECTORIO_DIST, gracia: float = GRACIA_PODA) -> List[str]:
+    """
+    Borra los ficheros de `destino` que no usa el build actual desde hace
+    más de `gracia` segundos
+    
+    Se ejecuta al final del build. Lo que deja de usarse se apunta en
+    obsoletos.json con la hora, y se borra en un build posterior pasado el
+    margen: mientras tanto, los workers que aún no han reiniciado con el
+    manifiesto nuevo siguen encontrando sus ficheros.
+    
+    Returns:
+        List[str]: Rutas borradas
+    """
+    def leer(nombre: str) -> Dict:
+        try:
+            return json.loads((destino / nombre).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    vigentes = set(METADATOS) | {OBSOLETOS}
+    for con_hash in leer("manifest.json").values():
+        vigentes.update(con_hash + extension for extension in ("", ".gz", ".br"))
+    for datos in leer("imagenes.json").values():
+        vigentes.add(datos["respaldo"])
+        vigentes.update(ruta for variantes in datos["variantes"].values() for _, ruta in variantes)
+    
+    ahora = time.time()
+    anteriores = leer(OBSOLETOS)
+    obsoletos: Dict[str, float] = {}
+    borrados: List[str] = []
+    for ruta in sorted(destino.rglob("*")):
+        relativa = ruta.relative_to(destino).as_posix()
+        if not ruta.is_file() or relativa in vigentes:
+            continue
+        desde = anteriores.get(relativa, ahora)
+        if ahora - desde >= gracia:
+            ruta.unlink()
+            borrados.append(relativa)
+        else:
+            obsoletos[relativa] = desde
+    
+    _escribir_json(destino / OBSOLETOS, obsoletos)
+    return borrados
+
+
+def _escribir_json(ruta: Path, datos: Dict) -> None:
+    """Escribe y renombra: los workers nunca leen un fichero a medias"""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    temporal.write_text(json.dumps(datos, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporal, ruta)
+
+
+def construir_imagenes(origen: Path = DIRECTORIO_ORIGEN, destino: Path = DIRECTORIO_DIST) -> Dict[str, Dict]:
+    """
+    Genera las variantes AVIF/WebP por ancho y la imagen de respaldo
+    
+    Returns:
+        Dict[str, Dict]: Por imagen original: ancho, alto, respaldo y
+        variantes {formato: [[ancho, ruta], ...]}
+    """
+    if Image is None:
+        raise RuntimeError("Pillow no está instalado (pip install Pillow)")
+    
+    imagenes: Dict[str, Dict] = {}
+    for ruta in sorted(origen.rglob("*")):
+        relativa = ruta.relative_to(origen)
+        if not ruta.is_file() or destino in ruta.parents or ruta.suffix.lower() not in IMAGENES:
+            continue
+        
+        base = relativa.with_name(f"{ruta.stem}.{_hash(ruta.read_bytes())}")
+        with Image.open(ruta) as original:
+            original.load()
+        ancho, alto = original.size
+        anchos = [a for a in ANCHOS_IMAGEN if a < ancho] + [ancho]
+        opaca = original.mode not in ("RGBA", "LA", "P") or original.convert("RGBA").getchannel("A").getextrema()[0] == 255
+        if opaca:
+            original = original.convert("RGB")
+        
+        def variante(ancho_variante: int, formato: str, opciones: Dict) -> str:
+            salida = base.with_name(f"{base.name}.{ancho_variante}w.{formato}")
+            if not (destino / salida).exists():
+                (destino / salida).parent.mkdir(parents=True, exist_ok=True)
+                alto_variante = round(alto * ancho_variante / ancho)
+                reducida = original.resize((ancho_variante, alto_variante), Image.LANCZOS)
+                reducida.save(destino / salida, format=formato.upper(), **opciones)
+            return salida.as_posix()
+        
+        respaldo_ancho = min(ANCHO_RESPALDO, ancho)
+        respaldo = (
+            variante(respaldo_ancho, "jpeg", {"quality": 82, "optimize": True, "progressive": True})
+            if opaca else variante(respaldo_ancho, "png", {"optimize": True})
+        )
+        imagenes[relativa.as_posix()] = {
+            "ancho": ancho,
+            "alto": alto,
+            "respaldo": respaldo,
+            "variantes": {
+                formato: [[a, variante(a, formato, opciones)] for a in anchos]
+                for formato, opciones in FORMATOS_IMAGEN
+            }
+        }
+    
+    _escribir_json(destino / "imagenes.json", imagenes)
+    return imagenes
+
+
+def construir_critico(paginas: Dict[str, str], destino: Path = DIRECTORIO_DIST) -> Dict[str, str]:
+    """
+    Extrae el CSS crítico de cada página de la hoja ya construida
+    
+    Args:
+        paginas: Plantilla -> HTML renderizado
+    
+    Returns:
+        Dict[str, str]: Plantilla -> CSS crítico minificado
+    """
+    rutas = json.loads((destino / "manifest.json").read_text(encoding="utf-8"))
+    css = (destino / rutas[HOJA_CRITICA]).read_text(encoding="utf-8")
+    criticos = {plantilla: critico_con_cache(css, html) for plantilla, html in paginas.items()}
+    _escribir_json(destino / "critico.json", criticos)
+    return criticos
+
+
+def construir_fechas(plantillas: Iterable[str], destino: Path = DIRECTORIO_DIST) -> Dict[str, str]:
+    """
+    Fecha del último commit de cada plantilla (git log -1 --format=%cI)
+    
+    Args:
+        plantillas: Rutas dentro de templates/
+    
+    Returns:
+        Dict[str, str]: Plantilla -> fecha ISO 8601 (sin las que git no conoce)
+    """
+    fechas = {}
+    for plantilla in sorted(set(plantillas)):
+        try:
+            salida = subprocess.run(
+                ["git", "log", "-1", "--format=%cI", "--", str(Path("templates") / plantilla)],
+                capture_output=True, text=True, timeout=30
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"git log de templates/{plantilla}: {e!r}")
+            continue
+        if salida:
+            fechas[plantilla] = salida
+    _escribir_json(destino / "fechas.json", fechas)
+    return fechas
+
+
+# =============================================
+# URLS (JINJA)
+# =============================================
+
+class FormatoImagen(NamedTuple):
+    tipo: str  # image/avif, image/webp
+    srcset: str
+
+
+class ImagenResponsive(NamedTuple):
+    """Datos de una imagen para la macro picture()"""
+    src: str
+    ancho: Optional[int]
+    alto: Optional[int]
+    formatos: List[FormatoImagen]
+
+
+@lru_cache(maxsize=None)
+def _dimensiones(ruta: str) -> Tuple[Optional[int], Optional[int]]:
+    """Ancho y alto leyendo solo la cabecera de la imagen original"""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(DIRECTORIO_ORIGEN / ruta) as imagen:
+            return imagen.size
+    except OSError:
+        return None, None
+
+
+class Manifiesto:
+    """Rutas con hash, variantes de imágenes, CSS crítico y fechas del último build, leídos una vez"""
+    
+    def __init__(self, directorio: Path = DIRECTORIO_DIST, activo: bool = True, avisar: bool = True):
+        self.directorio = directorio
+        self.activo = activo
+        self.avisar = avisar  # el build lee el manifiesto mientras lo escribe: sin avisos
+        self._rutas: Optional[Dict[str, str]] = None
+        self._imagenes: Optional[Dict[str, Dict]] = None
+        self._criticos: Optional[Dict[str, str]] = None
+        self._fechas: Optional[Dict[str, str]] = None
+    
+    def _cargar(self, nombre: str) -> Dict:
+        try:
+            return json.loads((self.directorio / nombre).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            if self.avisar:
+                logger.warning(f"Sin {self.directorio}/{nombre}: estáticos sin build (python scripts/construir_estaticos.py)")
+        except ValueError as e:
+            logger.error(f"{self.directorio}/{nombre} inválido: {e}")
+        return {}
+    
+    def url(self, ruta: str) -> str:
+        """URL pública de un estático (con hash si hay build)"""
+        ruta = ruta.lstrip("/")
+        if self.activo:
+            if self._rutas is None:
+                self._rutas = self._cargar("manifest.json")
+            con_hash = self._rutas.get(ruta)
+            if con_hash is not None:
+                return f"{URL_DIST}/{con_hash}"
+        return f"{URL_ESTATICOS}/{ruta}"
+    
+    def imagen(self, ruta: str) -> ImagenResponsive:
+        """Variantes de una imagen; sin build, solo el original con sus dimensiones"""
+        ruta = ruta.lstrip("/")
+        datos = None
+        if self.activo:
+            if self._imagenes is None:
+                self._imagenes = self._cargar("imagenes.json")
+            datos = self._imagenes.get(ruta)
+        
+        if datos is None:
+            return ImagenResponsive(self.url(ruta), *_dimensiones(ruta), [])
+        return ImagenResponsive(
+            src=f"{URL_DIST}/{datos['respaldo']}",
+            ancho=datos["ancho"],
+            alto=datos["alto"],
+            formatos=[
+                FormatoImagen(
+                    f"image/{formato}",
+                    ", ".join(f"{URL_DIST}/{variante} {ancho}w" for ancho, variante in variantes)
+                )
+                for formato, variantes in datos["variantes"].items()
+            ]
+        )
+    
+    def critico(self, plantilla: str) -> str:
+        """CSS crítico de una página ("" sin build: se carga la hoja entera)"""
+        if not self.activo:
+            return ""
+        if self._criticos is None:
+            self._criticos = self._cargar("critico.json")
+        return self._criticos.get(plantilla, "")
+    
+    def fecha(self, plantilla: str) -> Optional[str]:
+        """Fecha del último commit de una plantilla (None sin build o si git no la conoce)"""
+        if self._fechas is None:
+            self._fechas = self._cargar("fechas.json")
+        return self._fechas.get(plantilla)
+    
+    def globales_jinja(self) -> Dict[str, Callable]:
+        """asset_url, imagen y css_critico leyendo de este manifiesto"""
+        return {
+            "asset_url": self.url,
+            "imagen": self.imagen,
+            "css_critico": lambda plantilla: Markup(self.critico(plantilla))
+        }
+
+
+# En debug se sirven los ficheros de static/ tal cual, para ver los cambios al momento
+manifiesto = Manifiesto(activo=not settings.debug)
+
+
+def asset_url(ruta: str) -> str:
+    """Global de Jinja: {{ asset_url('css/styles.css') }}"""
+    return manifiesto.url(ruta)
+
+
+def imagen(ruta: str) -> ImagenResponsive:
+    """Global de Jinja usado por la macro picture()"""
+    return manifiesto.imagen(ruta)
+
+
+def css_critico(plantilla: str) -> Markup:
+    """Global de Jinja: CSS para el <style> del <head> (sin escapar: es del build)"""
+    return Markup(manifiesto.critico(plantilla))
+
+
+# =============================================
+# SERVIDOR
+# =============================================
+
+def codificaciones_aceptadas(cabecera: str) -> Set[str]:
+    """Codificaciones de Accept-Encoding (sin las de q=0)"""
+    aceptadas = set()
+    for parte in cabecera.split(","):
+        nombre, _, parametros = parte.partition(";")
+        nombre = nombre.strip().lower()
+        parametros = parametros.replace(" ", "")
+        if nombre and parametros not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            aceptadas.add(nombre)
+    return aceptadas
+
+
+class EstaticosInmutables(StaticFiles):
+    """
+    StaticFiles para static/dist: variantes .br/.gz y caché immutable
+    
+    Los metadatos del build (manifest.json, obsoletos.json...) y los .tmp no
+    llevan hash y cambian en cada build: no se sirven.
+    """
+    
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if path in METADATOS or path == OBSOLETOS or path.endswith(".tmp"):
+            raise HTTPException(status_code=404)
+        
+        aceptadas = codificaciones_aceptadas(Headers(scope=scope).get("accept-encoding", ""))
+        if "*" in aceptadas:
+            aceptadas.update(c for c, _ in CODIFICACIONES)
+        
+        respuesta = None
+        if scope["method"] in ("GET", "HEAD") and Path(path).suffix in COMPRIMIBLES:
+            for codificacion, extension in CODIFICACIONES:
+                if codificacion not in aceptadas:
+                    continue
+                ruta, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + extension)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    respuesta = self.file_response(ruta, stat_result, scope)
+                    respuesta.headers["Content-Encoding"] = codificacion
+                    tipo = mimetypes.guess_type(path)[0]
+                    if tipo and respuesta.status_code == 200:
+                        respuesta.headers["Content-Type"] = (
+                            f"{tipo}; charset=utf-8" if tipo.startswith("text/") else tipo
+                        )
+                    break
+        
+        if respuesta is None:
+            respuesta = await super().get_response(path, scope)
+        
+        respuesta.headers["Cache-Control"] = CACHE_INMUTABLE
+        if Path(path).suffix in COMPRIMIBLES:
+            respuesta.headers["Vary"] = "Accept-Encoding"
+        return respuesta
@@ -0,0 +1,200 @@
+"""
+Servicio de Importación - Carga masiva de leads (Google Sheets, comparadores)
+
+Lee el cuerpo de la petición en streaming (NDJSON o CSV), valida cada fila con
+`LeadCreate` e inserta por lotes a través del servicio de ingesta. La
+memoria usada no depende del tamaño del fichero: solo se mantiene un lote y un
+número acotado de errores.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from schemas import LeadCreate
+from .ingesta_service import ingesta_service
+
+logger = logging.getLogger(__name__)
+
+
+# Longitud máxima de una línea/registro antes de considerar el fichero corrupto
+MAX_LONGITUD_LINEA = 64 * 1024
+
+# En importaciones nunca se envía confirmación al cliente
+NOTIFICACIONES_IMPORTACION = ("email_admin", "telegram")
+
+
+class ErrorFormato(ValueError):
+    """El cuerpo no se puede leer como NDJSON/CSV"""
+
+
+async def _lineas(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Convierte un stream de bytes en líneas de texto sin cargarlo entero"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pendiente = ""
+    
+    async for trozo in stream:
+        pendiente += decoder.decode(trozo)
+        *lineas, pendiente = pendiente.split("\n")
+        for linea in lineas:
+            yield linea.rstrip("\r")
+        if len(pendiente) > MAX_LONGITUD_LINEA:
+            raise ErrorFormato("Línea demasiado larga")
+    
+    pendiente += decoder.decode(b"", final=True)
+    if pendiente:
+        yield pendiente.rstrip("\r")
+
+
+async def _filas_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Una fila por línea JSON. Las líneas vacías se ignoran."""
+    numero = 0
+    async for linea in _lineas(stream):
+        numero += 1
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, ErrorFormato(f"JSON inválido: {e.msg}")
+
+
+async def _filas_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    CSV con cabecera. Un registro puede ocupar varias líneas si tiene campos
+    entre comillas con saltos de línea: se acumulan líneas hasta que el número
+    de comillas es par.
+    """
+    cabecera: Optional[List[str]] = None
+    registro = ""
+    numero = 0
+    
+    async for linea in _lineas(stream):
+        registro = f"{registro}\n{linea}" if registro else linea
+        if registro.count('"') % 2:
+            if len(registro) > MAX_LONGITUD_LINEA:
+                raise ErrorFormato("Registro CSV demasiado largo")
+            continue
+        
+        valores = next(csv.reader([registro]), [])
+        registro = ""
+        
+        if cabecera is None:
+            cabecera = [c.strip() for c in valores]
+            continue
+        
+        numero += 1
+        if not any(v.strip() for v in valores):
+            continue
+        if len(valores) != len(cabecera):
+            yield numero, ErrorFormato(
+                f"Se esperaban {len(cabecera)} columnas y hay {len(valores)}"
+            )
+            continue
+        
+        # Las celdas vacías equivalen a campos no informados
+        yield numero, {k: v for k, v in zip(cabecera, valores) if v != ""}
+
+
+class ImportacionService:
+    """Importación masiva de leads por lotes"""
+    
+    def __init__(self):
+        self.tamano_lote = settings.importacion_lote
+        self.max_errores = settings.importacion_max_errores
+    
+    async def importar(
+        self,
+        db: AsyncSession,
+        stream: AsyncIterator[bytes],
+        formato: str = "ndjson",
+        notificar: bool = False
+    ) -> Dict:
+        """
+        Importa leads desde un stream NDJSON o CSV
+        
+        Args:
+            db: Sesión de BD (se hace commit por cada lote)
+            stream: Cuerpo de la petición en trozos
+            formato: "ndjson" o "csv"
+            notificar: Encolar email/Telegram internos por cada lead
+        
+        Returns:
+            Dict con procesadas, insertadas, con_errores y errores
+        """
+        filas = _filas_csv(stream) if formato == "csv" else _filas_ndjson(stream)
+        
+        resultado = {"procesadas": 0, "insertadas": 0, "con_errores": 0, "errores": []}
+        lote: List[Tuple[int, LeadCreate]] = []
+        
+        async for numero, fila in filas:
+            resultado["procesadas"] += 1
+            
+            if isinstance(fila, ErrorFormato):
+                self._registrar_error(resultado, numero, [str(fila)])
+                continue
+            if not isinstance(fila, dict):
+                self._registrar_error(resultado, numero, ["La fila debe ser un objeto"])
+                continue
+            
+            try:
+                lead = LeadCreate.model_validate({"origen": "importacion", **fila})
+            except ValidationError as e:
+                self._registrar_error(resultado, numero, [
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ])
+                continue
+            
+            lote.append((numero, lead))
+            if len(lote) >= self.tamano_lote:
+                await self._insertar_lote(db, lote, notificar, resultado)
+                lote = []
+        
+        if lote:
+            await self._insertar_lote(db, lote, notificar, resultado)
+        
+        logger.info(
+            f"Importación de leads: {resultado['insertadas']} insertados, "
+            f"{resultado['con_errores']} con errores"
+        )
+        return resultado
+    
+    def _registrar_error(self, resultado: Dict, fila: int, errores: List[str]) -> None:
+        """Cuenta el error y guarda el detalle solo hasta el máximo configurado"""
+        resultado["con_errores"] += 1
+        if len(resultado["errores"]) < self.max_errores:
+            resultado["errores"].append({"fila": fila, "errores": errores})
+    
+    async def _insertar_lote(
+        self,
+        db: AsyncSession,
+        lote: List[Tuple[int, LeadCreate]],
+        notificar: bool,
+        resultado: Dict
+    ) -> None:
+        """Inserta un lote en una transacción (executemany)"""
+        filas = [
+            {**lead.model_dump(), "tipo_seguro": lead.tipo_seguro.value}
+            for _, lead in lote
+        ]
+        
+        try:
+            resultado["insertadas"] += await ingesta_service.crear_lote(
+                db,
+                filas,
+                tipos=NOTIFICACIONES_IMPORTACION if notificar else ()
+            )
+        except Exception as e:
+            logger.error(f"Error insertando lote de importación: {e}")
+            for numero, _ in lote:
+                self._registrar_error(resultado, numero, [f"Error al guardar: {e}"])
+
+
+# Instancia singleton
+importacion_service = ImportacionService()
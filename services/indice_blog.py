@@ -0,0 +1,402 @@
+"""
+Índice del blog - Búsqueda vectorial local sobre los artículos del blog
+
+El indexador (scripts/indexar_blog.py) trocea las guías de
+templates/pages/blog/ por secciones y calcula para cada fragmento un
+vector TF-IDF con el truco del hashing: unigramas y bigramas normalizados
+(sin acentos ni palabras vacías) se reparten en DIMENSIONES columnas por
+crc32, con signo para que las colisiones se compensen. Los vectores se
+guardan normalizados (L2) como matriz dispersa por columnas (CSC: indptr,
+filas y pesos en .npy) que cada worker abre con mmap, así que no ocupan
+memoria propia y el tamaño crece con los términos, no con DIMENSIONES. La
+consulta solo tiene unas decenas de términos: la búsqueda lee el tramo de
+cada una de esas columnas y suma sus pesos en las filas donde aparecen.
+
+ChatbotService lo consulta antes de llamar a OpenAI:
+- acierto muy claro en una pregunta sin contexto: se responde con el
+  fragmento y el enlace al artículo, sin llamar al modelo
+- acierto razonable: los mejores fragmentos van al prompt como contexto
+
+Sin índice construido (o sin numpy) la búsqueda no devuelve nada y el chat
+funciona como antes.
+"""
+from collections import Counter
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import math
+import os
+import re
+import time
+import zlib
+
+from config import settings
+from .normalizacion import normalizar
+
+try:
+    import numpy as np
+except ImportError:  # el chat funciona sin índice
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONES = 1 << 14
+PALABRAS_POR_FRAGMENTO = 90
+
+DIRECTORIO_BLOG = Path("templates/pages/blog")
+
+PALABRAS_VACIAS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bien cada como con contra cual
+cuales cuando de del desde donde dos el ella ellas ellos en entre era es esa esas ese eso esos esta
+estan estas este esto estos fue ha hay hasta la las le les lo los mas me mi mis mucho muy nada ni no
+nos nuestra nuestro o os otra otro para pero poco por porque que quien se sea ser si sin sobre solo
+son su sus tambien te tiene tienes toda todas todo todos tu tus un una unas uno unos usted ya yo
+puedo puede quiero necesito saber hola cual cuanto
+""".split())
+
+_JINJA = re.compile(r"\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\}", re.DOTALL)
+_FRASES = re.compile(r"(?<=[.!?])\s+")
+
+
+class Fragmento(NamedTuple):
+    """Trozo de un artículo con su enlace"""
+    url: str
+    titulo: str
+    seccion: str
+    texto: str
+
+
+class Resultado(NamedTuple):
+    fragmento: Fragmento
+    puntuacion: float  # similitud coseno, 0..1
+
+
+# =============================================
+# TÉRMINOS Y VECTORES
+# =============================================
+
+def terminos(texto: str) -> List[str]:
+    """Unigramas y bigramas normalizados, sin palabras vacías"""
+    palabras = [p for p in normalizar(texto).split() if len(p) > 1 and p not in PALABRAS_VACIAS]
+    return palabras + [f"{a} {b}" for a, b in zip(palabras, palabras[1:])]
+
+
+def _columna(termino: str) -> Tuple[int, float]:
+    """Columna y signo del término en el vector (hashing)"""
+    h = zlib.crc32(termino.encode())
+    return h % DIMENSIONES, (1.0 if h & 0x80000000 else -1.0)
+
+
+def _vector(texto: str, idf: "np.ndarray") -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+    """
+    Vector TF-IDF normalizado de un texto en forma dispersa: (columnas,
+    valores). None si el texto no tiene términos.
+    """
+    pesos: Dict[int, float] = {}
+    for termino, n in Counter(terminos(texto)).items():
+        columna, signo = _columna(termino)
+        pesos[columna] = pesos.get(columna, 0.0) + signo * (1 + math.log(n)) * float(idf[columna])
+    columnas = np.fromiter(pesos.keys(), dtype=np.intp, count=len(pesos))
+    valores = np.fromiter(pesos.values(), dtype=np.float32, count=len(pesos))
+    norma = float(np.linalg.norm(valores))
+    if not norma:
+        return None
+    return columnas, valores / norma
+
+
+# =============================================
+# EXTRACCIÓN DE TEXTO DE LAS PLANTILLAS
+# =============================================
+
+_VACIOS = frozenset({"area", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"})
+_SALTAR = frozenset({"script", "style", "nav", "form", "button", "svg"})
+# Navegación, llamadas a la acción, autor y "artículos relacionados"
+_CLASES_SALTAR = frozenset({
+    "breadcrumbs", "table-of-contents", "blog-category", "article-meta", "article-footer",
+    "author-box", "cta-box", "services", "blog-grid"
+})
+_BLOQUES = frozenset({"p", "li", "h3", "h4", "td", "th", "blockquote", "div", "section"})
+
+
+class _ExtractorArticulo(HTMLParser):
+    """Título (h1) y texto por secciones (h2) de una plantilla del blog"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.titulo = ""
+        self.secciones: List[Tuple[str, List[str]]] = [("", [])]
+        self._saltando = 0  # profundidad dentro de un elemento ignorado
+        self._en: Optional[str] = None  # "h1" o "h2" mientras se lee el encabezado
+        self._actual: List[str] = []
+    
+    def handle_starttag(self, tag, attrs):
+        if self._saltando:
+            if tag not in _VACIOS:
+                self._saltando += 1
+            return
+        clases = (dict(attrs).get("class") or "").split()
+        if tag in _SALTAR or not _CLASES_SALTAR.isdisjoint(clases):
+            if tag not in _VACIOS:
+                self._saltando = 1
+            return
+        if tag in ("h1", "h2"):
+            self._cerrar_bloque()
+            self._en = tag
+        elif tag in _BLOQUES:
+            self._cerrar_bloque()
+    
+    def handle_endtag(self, tag):
+        if self._saltando:
+            self._saltando -= 1
+            return
+        if tag == self._en:
+            texto = " ".join("".join(self._actual).split())
+            self._actual = []
+            if self._en == "h1":
+                self.titulo = texto
+            else:
+                self.secciones.append((texto, []))
+            self._en = None
+        elif tag in _BLOQUES:
+            self._cerrar_bloque()
+    
+    def handle_data(self, data):
+        if not self._saltando:
+            self._actual.append(data)
+    
+    def _cerrar_bloque(self):
+        if self._en:
+            return
+        texto = " ".join("".join(self._actual).split())
+        self._actual = []
+        if texto:
+            self.secciones[-1][1].append(texto)
+
+
+def _trocear(bloques: List[str]) -> Iterator[str]:
+    """
+    Agrupa las frases de una sección en fragmentos de unas
+    PALABRAS_POR_FRAGMENTO palabras; cada fragmento repite la última frase
+    del anterior para no partir una idea entre dos fragmentos
+    """
+    actual: List[str] = []
+    nuevas = 0  # frases de `actual` que no estaban en el fragmento anterior
+    for bloque in bloques:
+        for frase in _FRASES.split(bloque):
+            actual.append(frase)
+            nuevas += 1
+            if sum(len(f.split()) for f in actual) >= PALABRAS_POR_FRAGMENTO:
+                yield " ".join(actual)
+                actual = actual[-1:] if len(actual) > 1 else []
+                nuevas = 0
+    if nuevas:
+        yield " ".join(actual)
+
+
+def fragmentos_plantillas(directorio: Path = DIRECTORIO_BLOG) -> Iterator[Fragmento]:
+    """Fragmentos de las guías del blog (una URL /blog/<nombre> por plantilla)"""
+    for ruta in sorted(directorio.glob("*.html")):
+        extractor = _ExtractorArticulo()
+        extractor.feed(_JINJA.sub(" ", ruta.read_text(encoding="utf-8")))
+        extractor.close()
+        
+        url = f"/blog/{ruta.stem}"
+        titulo = extractor.titulo or ruta.stem.replace("-", " ")
+        for seccion, bloques in extractor.secciones:
+            for texto in _trocear(bloques):
+                if len(texto.split()) >= 8:
+                    yield Fragmento(url, titulo, seccion, texto)
+
+
+# =============================================
+# CONSTRUCCIÓN (OFFLINE)
+# =============================================
+
+def construir(fragmentos: Iterable[Fragmento], directorio: str) -> int:
+    """
+    Calcula los vectores y escribe el índice en `directorio`
+    
+    Ficheros: la matriz de vectores en CSC (indptr.npy con DIMENSIONES + 1
+    posiciones, filas.npy y pesos.npy), idf.npy y fragmentos.json. Se escriben con otro nombre y se renombran al final,
+    así un worker nunca abre un índice a medias.
+    
+    Returns:
+        int: Número de fragmentos indexados
+    """
+    fragmentos = list(fragmentos)
+    
+    # IDF por columna: en cuántos fragmentos aparece algún término de la columna
+    documentos = np.zeros(DIMENSIONES, dtype=np.float64)
+    for fragmento in fragmentos:
+        columnas = {_columna(t)[0] for t in terminos(f"{fragmento.seccion} {fragmento.texto}")}
+        documentos[list(columnas)] += 1
+    idf = np.log((1 + len(fragmentos)) / (1 + documentos)).astype(np.float32) + 1
+    
+    utiles: List[Fragmento] = []
+    columnas: List["np.ndarray"] = []
+    filas: List["np.ndarray"] = []
+    pesos: List["np.ndarray"] = []
+    for fragmento in fragmentos:
+        # El título y la sección cuentan como parte del texto del fragmento
+        disperso = _vector(f"{fragmento.titulo} {fragmento.seccion} {fragmento.texto}", idf)
+        if disperso is not None:
+            columnas.append(disperso[0])
+            filas.append(np.full(len(disperso[0]), len(utiles), dtype=np.int32))
+            pesos.append(disperso[1])
+            utiles.append(fragmento)
+    
+    # De (fila, columna, peso) a CSC: ordenado por columna, indptr[c]:indptr[c + 1]
+    # es el tramo de la columna c
+    columna = np.concatenate(columnas) if columnas else np.zeros(0, dtype=np.intp)
+    orden = np.argsort(columna, kind="stable")
+    matriz = {
+        "indptr": np.concatenate(([0], np.cumsum(np.bincount(columna, minlength=DIMENSIONES)))).astype(np.int32),
+        "filas": (np.concatenate(filas) if filas else np.zeros(0, dtype=np.int32))[orden],
+        "pesos": (np.concatenate(pesos) if pesos else np.zeros(0, dtype=np.float32))[orden],
+        "idf": idf
+    }
+    
+    destino = Path(directorio)
+    destino.mkdir(parents=True, exist_ok=True)
+    for nombre, datos in matriz.items():
+        with open(destino / f"{nombre}.npy.tmp", "wb") as f:
+            np.save(f, datos)
+    (destino / "fragmentos.json.tmp").write_text(
+        json.dumps([f._asdict() for f in utiles], ensure_ascii=False), encoding="utf-8"
+    )
+    for nombre in [*(f"{n}.npy" for n in matriz), "fragmentos.json"]:
+        os.replace(destino / f"{nombre}.tmp", destino / nombre)
+    # Formato anterior (matriz densa)
+    (destino / "vectores.npy").unlink(missing_ok=True)
+    return len(utiles)
+
+
+# =============================================
+# CONSULTA
+# =============================================
+
+class IndiceBlog:
+    """Índice de solo lectura, cargado la primera vez que se consulta"""
+    
+    def __init__(self, directorio: str):
+        self.directorio = Path(directorio)
+        self._indptr: Optional["np.ndarray"] = None
+        self._filas: Optional["np.ndarray"] = None
+        self._pesos: Optional["np.ndarray"] = None
+        self._idf: Optional["np.ndarray"] = None
+        self._fragmentos: List[Fragmento] = []
+        self._cargado = False
+        self._metricas: Dict[str, int] = {
+            "consultas": 0,
+            "con_resultado": 0,
+            "respuestas_directas": 0,
+            "microsegundos": 0
+        }
+    
+    def cargar(self) -> bool:
+        """Abre el índice (la matriz con mmap). False si no existe"""
+        self._cargado = True
+        if np is None:
+            logger.warning("numpy no está instalado: chat sin índice del blog")
+            return False
+        try:
+            # np.asarray: vista ndarray del mmap, sin el coste de np.memmap al trocear
+            self._indptr = np.asarray(np.load(self.directorio / "indptr.npy", mmap_mode="r"))
+            self._filas = np.asarray(np.load(self.directorio / "filas.npy", mmap_mode="r"))
+            self._pesos = np.asarray(np.load(self.directorio / "pesos.npy", mmap_mode="r"))
+            self._idf = np.load(self.directorio / "idf.npy")
+            self._fragmentos = [
+                Fragmento(**f)
+                for f in json.loads((self.directorio / "fragmentos.json").read_text(encoding="utf-8"))
+            ]
+        except FileNotFoundError:
+            logger.info(f"Sin índice del blog en {self.directorio} (python scripts/indexar_blog.py)")
+            self._indptr, self._filas, self._pesos, self._idf, self._fragmentos = None, None, None, None, []
+            return False
+        logger.info(f"Índice del blog: {len(self._fragmentos)} fragmentos")
+        return True
+    
+    def buscar(self, texto: str, k: int = 3, minimo: float = 0.0) -> List[Resultado]:
+        """Los `k` fragmentos más parecidos al texto con puntuación >= `minimo`"""
+        if not self._cargado:
+            self.cargar()
+        if self._indptr is None or not len(self._fragmentos):
+            return []
+        
+        inicio = time.perf_counter()
+        consulta = _vector(texto, self._idf)
+        resultados: List[Resultado] = []
+        if consulta is not None:
+            # Producto disperso: solo los tramos de las columnas de la consulta
+            # (unas decenas), juntos en un único índice
+            columnas, valores = consulta
+            desde = self._indptr[columnas]
+            largos = self._indptr[columnas + 1] - desde
+            posiciones = np.repeat(desde - np.cumsum(largos) + largos, largos) + np.arange(largos.sum())
+            puntuaciones = np.bincount(
+                self._filas[posiciones],
+                weights=self._pesos[posiciones] * np.repeat(valores, largos),
+                minlength=len(self._fragmentos)
+            )
+            k = min(k, len(puntuaciones))
+            mejores = np.argpartition(-puntuaciones, k - 1)[:k]
+            for i in mejores[np.argsort(-puntuaciones[mejores])]:
+                if puntuaciones[i] <= 0 or puntuaciones[i] < minimo:
+                    break
+                resultados.append(Resultado(self._fragmentos[i], float(puntuaciones[i])))
+        
+        self._metricas["consultas"] += 1
+        self._metricas["con_resultado"] += bool(resultados)
+        self._metricas["microsegundos"] += int((time.perf_counter() - inicio) * 1e6)
+        return resultados
+    
+    def respuesta_directa(self, resultado: Resultado) -> str:
+        """Respuesta del chat con el extracto del fragmento y el enlace al artículo"""
+        self._metricas["respuestas_directas"] += 1
+        fragmento = resultado.fragmento
+        return (
+            f"{extracto(fragmento)}\n\n"
+            f"📖 Te lo contamos con detalle en «{fragmento.titulo}»: {fragmento.url}\n\n"
+            "¿Quieres que un asesor te prepare una cotización personalizada? 😊"
+        )
+    
+    def metricas(self) -> Dict[str, int]:
+        """Tamaño del índice y coste medio de las consultas"""
+        consultas = self._metricas["consultas"]
+        return {
+            **self._metricas,
+            "fragmentos": len(self._fragmentos),
+            "media_microsegundos": self._metricas["microsegundos"] // consultas if consultas else 0
+        }
+
+
+def extracto(fragmento: Fragmento, max_caracteres: int = 320) -> str:
+    """Primeras frases completas del fragmento"""
+    texto = ""
+    for frase in _FRASES.split(fragmento.texto):
+        if texto and len(texto) + len(frase) + 1 > max_caracteres:
+            break
+        texto = f"{texto} {frase}".strip()
+    if len(texto) > max_caracteres:
+        texto = texto[:max_caracteres - 1].rstrip() + "…"
+    return texto
+
+
+def documentacion(resultados: List[Resultado], max_caracteres: int = 600) -> Optional[str]:
+    """Mensaje de sistema con los fragmentos encontrados (None si no hay)"""
+    if not resultados:
+        return None
+    lineas = [
+        "Información de las guías del blog de SegurosPy relacionada con la pregunta. "
+        "Úsala solo si responde a lo que pregunta el usuario y, en ese caso, incluye el enlace:"
+    ]
+    for resultado in resultados:
+        f = resultado.fragmento
+        lineas.append(f"- «{f.titulo}» ({f.url}), {f.seccion or 'introducción'}: {extracto(f, max_caracteres)}")
+    return "\n".join(lineas)
+
+
+# Instancia singleton
+indice_blog = IndiceBlog(settings.chat_indice_dir)
@@ -0,0 +1,287 @@
+"""
+Servicio de Ingesta - Único punto de escritura de leads
+
+Todos los endpoints que crean leads (formulario, contacto, comparador e
+importación masiva) pasan por aquí. El lead se inserta con
+`INSERT ... RETURNING` (SQLite >= 3.35 y PostgreSQL), de modo que id y
+created_at vuelven en la misma ida y vuelta, y en la misma transacción se
+encolan las notificaciones y se actualiza el rollup diario.
+
+Opcionalmente (LEADS_GROUP_COMMIT=true) las altas que llegan con pocos
+milisegundos de diferencia se agrupan en una sola transacción: en SQLite cada
+transacción es un fsync y un bloqueo de escritura, así que durante un pico el
+throughput crece con la concurrencia en lugar de hundirse.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Lead
+from .outbox_service import outbox_service, NOTIFICACIONES_LEAD
+from .conteo_service import conteo_leads_service
+from .estadisticas_service import estadisticas_service
+
+logger = logging.getLogger(__name__)
+
+
+class _AltaPendiente:
+    """Alta esperando a su lote en el escritor agrupado"""
+    __slots__ = ("datos", "tipos", "notificacion", "futuro")
+    
+    def __init__(self, datos: Dict, tipos: Tuple[str, ...], notificacion: Optional[Dict]):
+        self.datos = datos
+        self.tipos = tipos
+        self.notificacion = notificacion
+        self.futuro = asyncio.get_running_loop().create_future()
+
+
+class EscritorAgrupado:
+    """
+    Group commit para altas concurrentes
+    
+    La primera alta abre una ventana de `espera_ms`; lo que llegue en ella
+    (hasta `max_lote`) se inserta en la misma transacción y cada petición
+    recibe su propio Lead. Si el lote falla se reintenta alta por alta para
+    que un dato erróneo no arrastre a los demás.
+    """
+    
+    def __init__(self, servicio: "IngestaLeadsService", max_lote: int, espera_ms: float):
+        self.servicio = servicio
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000
+        
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._metricas: Dict[str, int] = {"lotes": 0, "altas": 0, "reintentos_individuales": 0}
+    
+    async def crear(
+        self,
+        datos: Dict,
+        tipos: Tuple[str, ...],
+        notificacion: Optional[Dict]
+    ) -> Lead:
+        """Encola el alta y espera a que su lote haga commit"""
+        if self._tarea is None or self._tarea.done():
+            self._cola = asyncio.Queue()
+            self._tarea = asyncio.create_task(self._bucle(), name="ingesta-group-commit")
+        
+        pendiente = _AltaPendiente(datos, tipos, notificacion)
+        await self._cola.put(pendiente)
+        return await pendiente.futuro
+    
+    async def _bucle(self) -> None:
+        """Reúne lotes por tamaño o tiempo y los escribe"""
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            limite = loop.time() + self.espera
+            
+            while len(lote) < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._escribir(lote)
+    
+    async def _escribir(self, lote: List[_AltaPendiente]) -> None:
+        """Escribe un lote y resuelve los futuros de cada petición"""
+        try:
+            async with AsyncSessionLocal() as db:
+                leads = await self.servicio._insertar(db, lote)
+        except Exception as e:
+            if len(lote) == 1:
+                if not lote[0].futuro.done():
+                    lote[0].futuro.set_exception(e)
+                return
+            
+            logger.warning(f"Lote de {len(lote)} altas fallido, reintentando una a una: {e}")
+            self._metricas["reintentos_individuales"] += 1
+            for pendiente in lote:
+                await self._escribir([pendiente])
+            return
+        
+        self._metricas["lotes"] += 1
+        self._metricas["altas"] += len(lote)
+        for pendiente, lead in zip(lote, leads):
+            if not pendiente.futuro.done():
+                pendiente.futuro.set_result(lead)
+    
+    async def detener(self) -> None:
+        """Escribe lo que quede en cola y para el bucle"""
+        if self._tarea is None:
+            return
+        
+        self._tarea.cancel()
+        await asyncio.gather(self._tarea, return_exceptions=True)
+        self._tarea = None
+        
+        pendientes = []
+        while not self._cola.empty():
+            pendientes.append(self._cola.get_nowait())
+        for inicio in range(0, len(pendientes), self.max_lote):
+            await self._escribir(pendientes[inicio:inicio + self.max_lote])
+    
+    def metricas(self) -> Dict[str, int]:
+        """Lotes escritos, altas agrupadas y cola pendiente"""
+        en_cola = self._cola.qsize() if self._cola is not None else 0
+        return {**self._metricas, "en_cola": en_cola}
+
+
+class IngestaLeadsService:
+    """Alta de leads con notificaciones y contadores en una sola transacción"""
+    
+    def __init__(self):
+        self.escritor: Optional[EscritorAgrupado] = None
+        if settings.leads_group_commit:
+            self.escritor = EscritorAgrupado(
+                self,
+                max_lote=settings.leads_group_commit_max_lote,
+                espera_ms=settings.leads_group_commit_espera_ms
+            )
+    
+    @staticmethod
+    def payload_notificacion(lead: Lead, **cambios) -> Dict:
+        """
+        Datos que reciben email y Telegram
+        
+        Args:
+            lead: Lead recién insertado
+            cambios: Campos a mostrar distinto de lo guardado (p. ej. contacto)
+        """
+        return {
+            "nombre": lead.nombre,
+            "email": lead.email,
+            "telefono": lead.telefono,
+            "tipo_seguro": lead.tipo_seguro,
+            "mensaje": lead.mensaje,
+            "origen": lead.origen,
+            "created_at": lead.created_at.strftime("%d/%m/%Y %H:%M"),
+            **cambios
+        }
+    
+    async def crear(
+        self,
+        db: AsyncSession,
+        datos: Dict,
+        tipos: Iterable[str] = NOTIFICACIONES_LEAD,
+        notificacion: Optional[Dict] = None
+    ) -> Lead:
+        """
+        Inserta un lead y hace commit
+        
+        Args:
+            db: Sesión del endpoint (con group commit se usa la del escritor)
+            datos: Columnas del Lead
+            tipos: Notificaciones a encolar
+            notificacion: Cambios sobre el payload de notificación por defecto
+        
+        Returns:
+            Lead: El lead insertado (con id, estado y fechas)
+        """
+        if self.escritor is not None:
+            return await self.escritor.crear(datos, tuple(tipos), notificacion)
+        
+        leads = await self._insertar(db, [_AltaPendiente(datos, tuple(tipos), notificacion)])
+        return leads[0]
+    
+    async def _insertar(self, db: AsyncSession, altas: List[_AltaPendiente]) -> List[Lead]:
+        """
+        INSERT ... RETURNING de una o varias altas, notificaciones y rollup en
+        una transacción. Devuelve los leads en el mismo orden que `altas`.
+        """
+        # executemany necesita las mismas columnas en todas las filas
+        grupos: Dict[frozenset, List[int]] = {}
+        for posicion, alta in enumerate(altas):
+            grupos.setdefault(frozenset(alta.datos), []).append(posicion)
+        
+        leads: List[Optional[Lead]] = [None] * len(altas)
+        try:
+            for posiciones in grupos.values():
+                result = await db.execute(
+                    insert(Lead).returning(Lead, sort_by_parameter_order=True),
+                    [altas[p].datos for p in posiciones]
+                )
+                for posicion, lead in zip(posiciones, result.scalars()):
+                    leads[posicion] = lead
+            
+            for alta, lead in zip(altas, leads):
+                payload = self.payload_notificacion(lead, **(alta.notificacion or {}))
+                outbox_service.encolar(db, lead.id, payload, tipos=alta.tipos)
+            
+            por_dia = Counter(lead.created_at.date() for lead in leads)
+            for fecha, cantidad in por_dia.items():
+                await estadisticas_service.registrar_leads(db, cantidad=cantidad, fecha=fecha)
+            
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        
+        outbox_service.despertar()
+        for lead in leads:
+            conteo_leads_service.registrar_alta(lead.estado, lead.tipo_seguro)
+        return leads
+    
+    async def detener(self) -> None:
+        """Vacía el escritor agrupado (al apagar la aplicación)"""
+        if self.escritor is not None:
+            await self.escritor.detener()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Métricas del group commit (vacías si está desactivado)"""
+        return self.escritor.metricas() if self.escritor is not None else {}
+    
+    async def crear_lote(
+        self,
+        db: AsyncSession,
+        filas: List[Dict],
+        tipos: Iterable[str] = ()
+    ) -> int:
+        """
+        Inserta muchos leads en una transacción (executemany) y hace commit.
+        Si falla se propaga la excepción y no se guarda ninguno.
+        
+        Args:
+            db: Sesión de BD
+            filas: Columnas de cada Lead
+            tipos: Notificaciones a encolar por cada lead (ninguna por defecto)
+        
+        Returns:
+            int: Leads insertados
+        """
+        try:
+            if tipos:
+                result = await db.execute(
+                    insert(Lead).returning(Lead, sort_by_parameter_order=True),
+                    filas
+                )
+                for lead in result.scalars():
+                    outbox_service.encolar(db, lead.id, self.payload_notificacion(lead), tipos=tipos)
+            else:
+                await db.execute(insert(Lead), filas)
+            
+            await estadisticas_service.registrar_leads(db, cantidad=len(filas))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        
+        if tipos:
+            outbox_service.despertar()
+        for fila in filas:
+            conteo_leads_service.registrar_alta(fila.get("estado", "nuevo"), fila["tipo_seguro"])
+        return len(filas)
+
+
+# Instancia singleton
+ingesta_service = IngestaLeadsService()
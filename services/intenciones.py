@@ -0,0 +1,158 @@
+"""
+Detección de intenciones para las respuestas predefinidas del chatbot
+
+La tabla INTENCIONES se compila una sola vez en una única expresión regular
+con forma de árbol de prefijos (`c(?:asa|o(?:che|ste)|...)`), que se aplica
+sobre el texto sin acentos: una pasada por mensaje y, en cada posición, una
+sola rama por carácter sea cual sea el número de palabras clave. Cada
+palabra encontrada se traduce a su intención con un diccionario.
+
+Palabras clave:
+- se escriben sin acentos ("vehiculo" cubre "vehículo")
+- coinciden como subcadena, igual que la cadena if/elif a la que sustituye:
+  "perr" cubre "perros" y "perrito", "llam" cubre "llamar" y "llámame"
+
+Si varias intenciones aparecen en el mensaje gana la de mayor puntuación
+(peso x palabras clave distintas encontradas); a igualdad, la que va antes.
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import re
+
+from .normalizacion import plegar_acentos
+
+
+class Intencion(NamedTuple):
+    """Intención del usuario con sus palabras clave y su respuesta"""
+    nombre: str
+    palabras: Tuple[str, ...]
+    respuesta: str
+    peso: float = 1.0
+
+
+INTENCIONES: List[Intencion] = [
+    Intencion(
+        "precio",
+        ("precio", "coste", "cuanto", "cuanta", "cuesta", "tarifa", "presupuesto", "cotizacion"),
+        "💰 El precio depende de varios factores. Un asesor te preparará una cotización personalizada gratuita. ¿Quieres que te llamemos? Déjanos tu teléfono.",
+        peso=3.0
+    ),
+    Intencion(
+        "hogar",
+        ("hogar", "casa", "vivienda", "piso"),
+        "🏠 ¡El seguro de hogar es fundamental! Cubrimos daños por agua, incendio, robo y mucho más. ¿Te gustaría que un asesor te explique las opciones?",
+        peso=2.0
+    ),
+    Intencion(
+        "auto",
+        ("coche", "auto", "automovil", "vehiculo", "moto"),
+        "🚗 Comparamos más de 20 aseguradoras para encontrarte el mejor precio en seguro de coche. ¿Tienes el vehículo ya o es nuevo?",
+        peso=2.0
+    ),
+    Intencion(
+        "vida",
+        ("vida",),
+        "💚 El seguro de vida protege a tu familia económicamente. Podemos encontrar opciones desde 10€/mes. ¿Quieres más información?",
+        peso=2.0
+    ),
+    Intencion(
+        "decesos",
+        ("decesos", "funeral", "entierro"),
+        "🕊️ El seguro de decesos cubre todos los gastos y gestiones. Es muy económico y da tranquilidad a la familia. ¿Te informamos?",
+        peso=2.0
+    ),
+    Intencion(
+        "salud",
+        ("salud", "medico", "dentista", "especialista"),
+        "🏥 Con el seguro de salud tendrás acceso a los mejores especialistas sin esperas. ¿Buscas cobertura individual o familiar?",
+        peso=2.0
+    ),
+    Intencion(
+        "mascotas",
+        ("mascota", "perr", "gato", "veterinario"),
+        "🐾 ¡Protege a tu peludo! Cubrimos veterinario, responsabilidad civil y más. ¿Qué tipo de mascota tienes?",
+        peso=2.0
+    ),
+    Intencion(
+        "saludo",
+        ("hola", "buenos", "buenas"),
+        "👋 ¡Hola! Soy el asistente virtual de SegurosPy. ¿En qué puedo ayudarte? Puedo informarte sobre seguros de hogar, auto, vida, salud y más.",
+        peso=0.5
+    ),
+    Intencion(
+        "contacto",
+        ("contacto", "llam", "telefono", "whatsapp", "horario", "email"),
+        "📞 Puedes contactarnos en:\n• Teléfono/WhatsApp: 661 854 126\n• Email: info@segurospy.com\n• Horario: L-V 10:00-19:00",
+        peso=2.5
+    ),
+]
+
+RESPUESTA_POR_DEFECTO = "Gracias por tu mensaje. Para darte la mejor información, ¿podrías indicarme qué tipo de seguro te interesa? (hogar, coche, vida, salud, decesos, mascotas)"
+
+
+_FIN = ""  # marca de palabra completa en un nodo del árbol
+
+
+def _patron_arbol(nodo: Dict) -> str:
+    """Expresión regular de un nodo del árbol de prefijos"""
+    ramas = [
+        re.escape(caracter) + _patron_arbol(hijo)
+        for caracter, hijo in sorted((c, h) for c, h in nodo.items() if c != _FIN)
+    ]
+    
+    if not ramas:
+        return ""
+    cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+    return f"(?:{cuerpo})?" if _FIN in nodo else cuerpo
+
+
+def compilar(intenciones: List[Intencion]) -> "re.Pattern[str]":
+    """Todas las palabras clave en un árbol de prefijos, sin anclar a palabras"""
+    raiz: Dict = {}
+    for intencion in intenciones:
+        for palabra in intencion.palabras:
+            nodo = raiz
+            for caracter in palabra:
+                nodo = nodo.setdefault(caracter, {})
+            nodo[_FIN] = {}
+    return re.compile(_patron_arbol(raiz))
+
+
+class DetectorIntenciones:
+    """Elige la intención predominante de un mensaje"""
+    
+    def __init__(self, intenciones: List[Intencion] = INTENCIONES):
+        self.intenciones = intenciones
+        self._patron = compilar(intenciones)
+        
+        # Palabra clave -> índice de su intención (gana la primera si se repite)
+        self._palabras: Dict[str, int] = {}
+        for indice, intencion in enumerate(intenciones):
+            for palabra in intencion.palabras:
+                self._palabras.setdefault(palabra, indice)
+    
+    def detectar(self, mensaje: str) -> Optional[Intencion]:
+        """Intención con mayor puntuación o None si no hay ninguna"""
+        encontradas = set(self._patron.findall(plegar_acentos(mensaje)))
+        if not encontradas:
+            return None
+        
+        # Cada palabra clave distinta suma el peso de su intención
+        puntos: Dict[int, float] = {}
+        for palabra in encontradas:
+            indice = self._palabras[palabra]
+            puntos[indice] = puntos.get(indice, 0.0) + self.intenciones[indice].peso
+        
+        if len(puntos) == 1:
+            return self.intenciones[indice]
+
+        mejor = min(puntos, key=lambda i: (-puntos[i], i))
+        return self.intenciones[mejor]
+    
+    def responder(self, mensaje: str) -> str:
+        """Respuesta predefinida para el mensaje"""
+        intencion = self.detectar(mensaje)
+        return intencion.respuesta if intencion else RESPUESTA_POR_DEFECTO
+
+
+# Instancia compartida (la expresión se compila al importar)
+detector_intenciones = DetectorIntenciones()
@@ -0,0 +1,208 @@
+"""
+Servicio de Límite del Chat - Token bucket por sesión y por IP
+
+Cada mensaje consume un token de la cubeta de su sesión y otro de la de su
+IP; las cubetas se rellenan a ritmo constante hasta su capacidad (ráfaga).
+Si alguna está vacía el endpoint responde 429 con Retry-After y no se
+consume de ninguna.
+
+Dos almacenes:
+- "bd" (por defecto): tabla `limites_chat`, compartida por los workers de
+  gunicorn. Cada cubeta se consume con un UPSERT condicional (recarga +
+  resta en SQL); los de la sesión y la IP van en una sola transacción, que
+  se deshace si alguna está vacía.
+- "memoria": por proceso, acotado a CHAT_LIMITE_MAX_CLAVES cubetas (LRU).
+  Con varios workers cada uno aplica el límite por su cuenta.
+
+Si la BD falla se deja pasar el mensaje: el límite protege el presupuesto
+de OpenAI, no debe tumbar el chat.
+"""
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import logging
+import time
+
+from sqlalchemy import select, delete, case
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+from database import AsyncSessionLocal, engine
+from models import LimiteChat
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se borran de la tabla las cubetas que ya estarían llenas
+INTERVALO_LIMPIEZA = 600.0
+
+
+class Cubeta(NamedTuple):
+    """Parámetros de un token bucket"""
+    capacidad: float  # mensajes seguidos permitidos
+    ritmo: float  # tokens por segundo
+    
+    @classmethod
+    def por_minuto(cls, rafaga: int, por_minuto: float) -> "Cubeta":
+        """Cubeta de `rafaga` mensajes que se recupera a `por_minuto` mensajes/min"""
+        return cls(float(rafaga), por_minuto / 60)
+    
+    def espera(self, tokens: float) -> float:
+        """Segundos hasta tener un token"""
+        return max(0.0, (1 - tokens) / self.ritmo)
+
+
+def _insert():
+    """INSERT del dialecto en uso (ambos soportan ON CONFLICT)"""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(LimiteChat)
+    return sqlite.insert(LimiteChat)
+
+
+class LimitadorChat:
+    """Límite de mensajes del chat por sesión y por IP"""
+    
+    def __init__(
+        self,
+        cubeta_sesion: Cubeta,
+        cubeta_ip: Cubeta,
+        almacen: str = "bd",
+        max_claves: int = 10000
+    ):
+        self.cubetas = {"sesion": cubeta_sesion, "ip": cubeta_ip}
+        self.almacen = almacen
+        self.max_claves = max_claves
+        
+        self._memoria: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # clave -> (tokens, instante)
+        self._ultima_limpieza = time.time()
+        self._metricas: Dict[str, int] = {
+            "permitidos": 0,
+            "rechazados_sesion": 0,
+            "rechazados_ip": 0,
+            "errores": 0
+        }
+    
+    async def consumir(self, session_id: Optional[str], ip: str) -> float:
+        """
+        Consume un mensaje de las cubetas de la sesión y de la IP
+        
+        Se consume de las dos o de ninguna: un mensaje rechazado por la IP
+        no gasta el token de la sesión.
+        
+        Returns:
+            float: 0 si se permite; si no, segundos que hay que esperar
+        """
+        claves = [("ip", f"ip:{ip}")]
+        if session_id:
+            claves.insert(0, ("sesion", f"sesion:{session_id[:100]}"))
+        
+        ahora = time.time()
+        try:
+            if self.almacen == "memoria":
+                esperas = self._consumir_memoria(claves, ahora)
+            else:
+                esperas = await self._consumir_bd(claves, ahora)
+        except Exception as e:
+            self._metricas["errores"] += 1
+            logger.error(f"Error en el límite del chat ({', '.join(c for _, c in claves)}): {e}")
+            esperas = {}
+        
+        if esperas:
+            tipo = next(t for t, _ in claves if t in esperas)
+            self._metricas[f"rechazados_{tipo}"] += 1
+            return max(esperas.values())
+        
+        self._metricas["permitidos"] += 1
+        if self.almacen != "memoria" and ahora - self._ultima_limpieza > INTERVALO_LIMPIEZA:
+            await self._limpiar(ahora)
+        return 0.0
+    
+    def _consumir_memoria(self, claves: List[Tuple[str, str]], ahora: float) -> Dict[str, float]:
+        """Token buckets en un OrderedDict acotado; devuelve la espera de las cubetas vacías"""
+        recargadas: Dict[str, float] = {}
+        esperas: Dict[str, float] = {}
+        for tipo, clave in claves:
+            cubeta = self.cubetas[tipo]
+            tokens, instante = self._memoria.pop(clave, (cubeta.capacidad, ahora))
+            recargadas[clave] = min(cubeta.capacidad, tokens + (ahora - instante) * cubeta.ritmo)
+            espera = cubeta.espera(recargadas[clave])
+            if espera > 0:
+                esperas[tipo] = espera
+        
+        # Una cubeta expulsada vuelve llena: el tope solo acota la memoria
+        for clave, tokens in recargadas.items():
+            self._memoria[clave] = (tokens if esperas else tokens - 1, ahora)
+        while len(self._memoria) > self.max_claves:
+            self._memoria.popitem(last=False)
+        return esperas
+    
+    def _upsert(self, clave: str, cubeta: Cubeta, ahora: float):
+        """Recarga y consumo en un UPSERT; si no hay token no se escribe nada (RETURNING vacío)"""
+        recargados = LimiteChat.tokens + (ahora - LimiteChat.actualizado) * cubeta.ritmo
+        recargados = case((recargados > cubeta.capacidad, cubeta.capacidad), else_=recargados)
+        
+        stmt = _insert().values(clave=clave, tokens=cubeta.capacidad - 1, actualizado=ahora)
+        return stmt.on_conflict_do_update(
+            index_elements=[LimiteChat.clave],
+            set_={"tokens": recargados - 1, "actualizado": ahora},
+            where=recargados >= 1
+        ).returning(LimiteChat.tokens)
+    
+    async def _consumir_bd(self, claves: List[Tuple[str, str]], ahora: float) -> Dict[str, float]:
+        """
+        Los UPSERT de todas las cubetas en una sola transacción
+        
+        Si alguna no tiene token se deshace la transacción (no se consume de
+        ninguna) y se calcula la espera de cada cubeta.
+        """
+        async with AsyncSessionLocal() as db:
+            for tipo, clave in claves:
+                if (await db.execute(self._upsert(clave, self.cubetas[tipo], ahora))).first() is None:
+                    vacia = tipo
+                    break
+            else:
+                await db.commit()
+                return {}
+            
+            await db.rollback()
+            filas = (await db.execute(
+                select(LimiteChat.clave, LimiteChat.tokens, LimiteChat.actualizado)
+                .where(LimiteChat.clave.in_([clave for _, clave in claves]))
+            )).all()
+        
+        por_clave = {fila.clave: fila for fila in filas}
+        esperas: Dict[str, float] = {}
+        for tipo, clave in claves:
+            fila = por_clave.get(clave)
+            if fila is None:
+                continue
+            cubeta = self.cubetas[tipo]
+            espera = cubeta.espera(min(cubeta.capacidad, fila.tokens + (ahora - fila.actualizado) * cubeta.ritmo))
+            if espera > 0:
+                esperas[tipo] = espera
+        
+        # La que no tenía token espera algo aunque se haya rellenado entre tanto
+        esperas[vacia] = max(esperas.get(vacia, 0.0), 0.001)
+        return esperas
+    
+    async def _limpiar(self, ahora: float) -> None:
+        """Borra las cubetas que ya se habrían rellenado del todo"""
+        self._ultima_limpieza = ahora
+        llenado = max(c.capacidad / c.ritmo for c in self.cubetas.values())
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(LimiteChat).where(LimiteChat.actualizado < ahora - llenado))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"No se pudieron limpiar los límites del chat: {e}")
+    
+    def metricas(self) -> Dict[str, int]:
+        """Mensajes permitidos y rechazados"""
+        return {**self._metricas, "claves_en_memoria": len(self._memoria)}
+
+
+# Instancia singleton
+limitador_chat = LimitadorChat(
+    cubeta_sesion=Cubeta.por_minuto(settings.chat_limite_sesion_rafaga, settings.chat_limite_sesion_por_minuto),
+    cubeta_ip=Cubeta.por_minuto(settings.chat_limite_ip_rafaga, settings.chat_limite_ip_por_minuto),
+    almacen=settings.chat_limite_almacen,
+    max_claves=settings.chat_limite_max_claves
+)
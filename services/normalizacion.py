@@ -0,0 +1,34 @@
+"""
+Normalización de texto para comparar mensajes del chat
+
+Minúsculas, sin acentos ni diéresis ("cuánto" == "cuanto", "vehículo" ==
+"vehiculo") y con signos de puntuación, emojis y espacios repetidos
+reducidos a un único espacio.
+"""
+import re
+
+# Vocales acentuadas y ç de Latin-1; la ñ se conserva
+_SIN_ACENTOS = tuple(zip("áàâäãéèêëíìîïóòôöõúùûüç", "aaaaaeeeeiiiiooooouuuuc"))
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9ñ]+")
+
+
+def plegar_acentos(texto: str) -> str:
+    """Minúsculas y sin acentos (se llama en cada mensaje: evita unicodedata)"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    # `in` y `replace` por carácter recorren el texto en C: más barato que re.sub con lambda
+    for acentuada, sin_acento in _SIN_ACENTOS:
+        if acentuada in texto:
+            texto = texto.replace(acentuada, sin_acento)
+    return texto
+
+
+def normalizar(texto: str) -> str:
+    """
+    Forma canónica de un mensaje
+    
+    >>> normalizar("  ¿Cuánto   cuesta el seguro de HOGAR?? 🏠")
+    'cuanto cuesta el seguro de hogar'
+    """
+    return _NO_ALFANUMERICO.sub(" ", plegar_acentos(texto)).strip()
@@ -0,0 +1,287 @@
+"""
+Servicio de Outbox - Notificaciones de leads en segundo plano
+
+Los endpoints guardan las notificaciones en la tabla `notificaciones_pendientes`
+dentro de la misma transacción que el Lead. Un pool de workers asíncronos las
+envía después (email y Telegram) con reintentos y backoff exponencial, de modo
+que el formulario solo espera al commit de la base de datos.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import NotificacionPendiente
+from .email_service import email_service
+from .telegram_service import telegram_service
+
+logger = logging.getLogger(__name__)
+
+
+# Tipos de notificación que genera un lead nuevo
+NOTIFICACIONES_LEAD = ("email_admin", "telegram", "email_cliente")
+
+
+class OutboxService:
+    """Cola persistente de notificaciones con pool de workers"""
+    
+    def __init__(self):
+        self.num_workers = settings.outbox_workers
+        self.intervalo = settings.outbox_intervalo
+        self.max_intentos = settings.outbox_max_intentos
+        self.backoff_base = settings.outbox_backoff_base
+        self.backoff_max = settings.outbox_backoff_max
+        self.bloqueo = timedelta(seconds=settings.outbox_bloqueo)
+        self.retencion = timedelta(days=settings.outbox_retencion_dias)
+        
+        self._workers: List[asyncio.Task] = []
+        self._evento: Optional[asyncio.Event] = None
+        self._detenido = True
+    
+    # =============================================
+    # ENCOLAR (dentro de la transacción del endpoint)
+    # =============================================
+    
+    def encolar(
+        self,
+        db: AsyncSession,
+        lead_id: Optional[int],
+        lead_data: dict,
+        tipos: Iterable[str] = NOTIFICACIONES_LEAD
+    ) -> None:
+        """
+        Añade las notificaciones a la sesión sin hacer commit
+        
+        Args:
+            db: Sesión del endpoint (el commit lo hace quien llama)
+            lead_id: ID del lead asociado
+            lead_data: Datos que reciben los servicios de email/Telegram
+            tipos: Notificaciones a generar
+        """
+        payload = json.dumps(lead_data, ensure_ascii=False, default=str)
+        for tipo in tipos:
+            db.add(NotificacionPendiente(
+                lead_id=lead_id,
+                tipo=tipo,
+                payload=payload
+            ))
+    
+    def despertar(self) -> None:
+        """Avisa a los workers de que hay trabajo nuevo (llamar tras el commit)"""
+        if self._evento is not None:
+            self._evento.set()
+    
+    # =============================================
+    # CICLO DE VIDA
+    # =============================================
+    
+    async def iniciar(self) -> None:
+        """Arranca el pool de workers"""
+        if not self._detenido:
+            return
+        
+        self._detenido = False
+        self._evento = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(n), name=f"outbox-{n}")
+            for n in range(self.num_workers)
+        ]
+        # Procesar lo que quedó pendiente de una ejecución anterior
+        self._evento.set()
+        logger.info(f"Outbox iniciado con {self.num_workers} workers")
+    
+    async def detener(self, timeout: float = 10.0) -> None:
+        """
+        Detiene los workers. Las notificaciones que estaban en curso siguen
+        reservadas hasta que caduque el bloqueo y se reintentan después.
+        """
+        if self._detenido:
+            return
+        
+        self._detenido = True
+        self.despertar()
+        
+        _, pendientes = await asyncio.wait(self._workers, timeout=timeout)
+        for tarea in pendientes:
+            tarea.cancel()
+        await asyncio.gather(*pendientes, return_exceptions=True)
+        
+        self._workers = []
+        logger.info("Outbox detenido")
+    
+    # =============================================
+    # WORKERS
+    # =============================================
+    
+    async def _worker(self, numero: int) -> None:
+        """Bucle de un worker: procesa hasta vaciar y luego espera"""
+        while not self._detenido:
+            self._evento.clear()
+            
+            try:
+                procesada = await self._procesar_siguiente()
+            except Exception as e:
+                logger.error(f"Error en worker de outbox {numero}: {e}")
+                procesada = False
+            
+            if procesada:
+                continue
+            
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _reservar(self) -> Optional[NotificacionPendiente]:
+        """
+        Reserva una notificación pendiente moviendo su próximo intento al futuro.
+        El UPDATE condicional evita que otro worker (u otro proceso de gunicorn)
+        coja la misma fila. Si el proceso muere, la reserva caduca sola.
+        """
+        ahora = datetime.utcnow()
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(NotificacionPendiente.id)
+                .where(
+                    NotificacionPendiente.estado == "pendiente",
+                    NotificacionPendiente.proximo_intento <= ahora
+                )
+                .order_by(NotificacionPendiente.proximo_intento)
+                .limit(self.num_workers * 2)
+            )
+            candidatas = result.scalars().all()
+            
+            for notificacion_id in candidatas:
+                reserva = await db.execute(
+                    update(NotificacionPendiente)
+                    .where(
+                        NotificacionPendiente.id == notificacion_id,
+                        NotificacionPendiente.estado == "pendiente",
+                        NotificacionPendiente.proximo_intento <= ahora
+                    )
+                    .values(
+                        proximo_intento=ahora + self.bloqueo,
+                        intentos=NotificacionPendiente.intentos + 1
+                    )
+                )
+                if reserva.rowcount == 1:
+                    await db.commit()
+                    return await db.get(NotificacionPendiente, notificacion_id)
+            
+            await db.rollback()
+            return None
+    
+    async def _procesar_siguiente(self) -> bool:
+        """
+        Envía una notificación pendiente
+        
+        Returns:
+            bool: True si había algo que procesar
+        """
+        notificacion = await self._reservar()
+        if notificacion is None:
+            return False
+        
+        error = None
+        estado = None
+        try:
+            exito = await self._enviar(notificacion.tipo, json.loads(notificacion.payload))
+            if exito is None:
+                estado = "descartada"
+                error = "Canal no configurado"
+            elif not exito:
+                error = "El servicio devolvió error"
+        except Exception as e:
+            exito = False
+            error = str(e)
+        
+        ahora = datetime.utcnow()
+        valores: Dict = {"ultimo_error": error}
+        
+        if estado == "descartada":
+            valores["estado"] = estado
+        elif exito:
+            valores.update(estado="enviada", enviada_at=ahora)
+        elif notificacion.intentos >= self.max_intentos:
+            valores["estado"] = "fallida"
+            logger.error(
+                f"Notificación {notificacion.id} ({notificacion.tipo}) fallida "
+                f"tras {notificacion.intentos} intentos: {error}"
+            )
+        else:
+            espera = min(
+                self.backoff_base * (2 ** (notificacion.intentos - 1)),
+                self.backoff_max
+            )
+            valores["proximo_intento"] = ahora + timedelta(seconds=espera)
+            logger.warning(
+                f"Notificación {notificacion.id} ({notificacion.tipo}) "
+                f"reintento en {int(espera)}s: {error}"
+            )
+        
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(NotificacionPendiente)
+                .where(NotificacionPendiente.id == notificacion.id)
+                .values(**valores)
+            )
+            await db.commit()
+        
+        return True
+    
+    async def _enviar(self, tipo: str, lead_data: dict) -> Optional[bool]:
+        """
+        Despacha la notificación al servicio correspondiente
+        
+        Returns:
+            True/False según el resultado, None si el canal no está configurado
+        """
+        if tipo == "telegram":
+            if not telegram_service.configurado:
+                return None
+            return await telegram_service.notificar_nuevo_lead(lead_data)
+        
+        if not email_service.configurado:
+            return None
+        
+        if tipo == "email_admin":
+            return await email_service.notificar_nuevo_lead(lead_data)
+        if tipo == "email_cliente":
+            return await email_service.enviar_confirmacion_cliente(lead_data)
+        
+        raise ValueError(f"Tipo de notificación desconocido: {tipo}")
+
+    
+    # =============================================
+    # RETENCIÓN
+    # =============================================
+    
+    async def purgar(self) -> int:
+        """
+        Borra las notificaciones ya resueltas (enviadas o descartadas) más
+        antiguas que la retención. Las fallidas se conservan para revisarlas.
+        
+        Returns:
+            int: Filas borradas
+        """
+        limite = datetime.utcnow() - self.retencion
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(NotificacionPendiente).where(
+                    NotificacionPendiente.estado.in_(("enviada", "descartada")),
+                    NotificacionPendiente.created_at < limite
+                )
+            )
+            await db.commit()
+        return result.rowcount
+
+
+# Instancia singleton
+outbox_service = OutboxService()
@@ -0,0 +1,205 @@
+"""
+Protección de las llamadas a OpenAI - Concurrencia, plazo y circuit breaker
+
+- Como mucho OPENAI_MAX_CONCURRENCIA llamadas a la vez por worker; quien no
+  consigue hueco en OPENAI_ESPERA_HUECO segundos pasa directamente a las
+  respuestas predefinidas en lugar de hacer cola.
+- Cada llamada tiene un plazo total (OPENAI_TIMEOUT) que incluye los
+  reintentos del SDK y, en streaming, la espera de cada fragmento.
+- Tras OPENAI_CIRCUITO_FALLOS fallos seguidos de OpenAI (caídas, timeouts,
+  5xx o 429) el circuito se abre y no se llama durante
+  OPENAI_CIRCUITO_REAPERTURA segundos; después una única llamada de prueba
+  (semiabierto) decide si se vuelve a cerrar o se abre otra vez.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Dict, TypeVar, Union
+import asyncio
+import logging
+import time
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+# Errores que indican que OpenAI no está respondiendo bien (los 4xx de
+# petición no abren el circuito: no se arreglan esperando)
+FALLOS_SERVICIO = (
+    openai.APIConnectionError,  # incluye APITimeoutError
+    openai.InternalServerError,
+    openai.RateLimitError,
+    asyncio.TimeoutError
+)
+
+
+class OpenAINoDisponible(Exception):
+    """La llamada no se hizo: circuito abierto o sin hueco a tiempo"""
+    pass
+
+
+class Circuito:
+    """Circuit breaker de tres estados"""
+    
+    def __init__(self, umbral_fallos: int = 5, reapertura: float = 30.0):
+        self.umbral_fallos = umbral_fallos
+        self.reapertura = reapertura
+        
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self._abierto_hasta = 0.0
+        self._sonda_en_curso = False
+        self._metricas: Dict[str, int] = {"aperturas": 0, "semiaperturas": 0, "cierres": 0}
+    
+    def _cambiar(self, estado: str) -> None:
+        """Transición de estado (queda en el log y en las métricas)"""
+        logger.warning(f"Circuito OpenAI: {self.estado} -> {estado}")
+        self.estado = estado
+        if estado == ABIERTO:
+            self._metricas["aperturas"] += 1
+            self._abierto_hasta = time.monotonic() + self.reapertura
+        elif estado == SEMIABIERTO:
+            self._metricas["semiaperturas"] += 1
+        else:
+            self._metricas["cierres"] += 1
+    
+    def permitir(self) -> bool:
+        """¿Se puede llamar ahora? En semiabierto solo pasa una llamada de prueba"""
+        if self.estado == ABIERTO:
+            if time.monotonic() < self._abierto_hasta:
+                return False
+            self._cambiar(SEMIABIERTO)
+        
+        if self.estado == SEMIABIERTO:
+            if self._sonda_en_curso:
+                return False
+            self._sonda_en_curso = True
+        return True
+    
+    def exito(self) -> None:
+        """Llamada correcta: cierra el circuito"""
+        self._sonda_en_curso = False
+        self.fallos_seguidos = 0
+        if self.estado != CERRADO:
+            self._cambiar(CERRADO)
+    
+    def fallo(self) -> None:
+        """Fallo de OpenAI: abre el circuito al llegar al umbral o si fallaba la prueba"""
+        self._sonda_en_curso = False
+        self.fallos_seguidos += 1
+        if self.estado == SEMIABIERTO or (
+            self.estado == CERRADO and self.fallos_seguidos >= self.umbral_fallos
+        ):
+            self._cambiar(ABIERTO)
+    
+    def abandono(self) -> None:
+        """La llamada no llegó a resolverse (cancelada o sin hueco): no cuenta"""
+        self._sonda_en_curso = False
+    
+    def metricas(self) -> Dict[str, Union[int, str]]:
+        """Estado actual y transiciones"""
+        return {**self._metricas, "estado": self.estado, "fallos_seguidos": self.fallos_seguidos}
+
+
+class _Llamada:
+    """Plazo de una llamada en curso"""
+    __slots__ = ("limite",)
+    
+    def __init__(self, limite: float):
+        self.limite = limite
+    
+    async def esperar(self, aw: Awaitable[T]) -> T:
+        """Espera `aw` como mucho hasta el final del plazo"""
+        restante = self.limite - asyncio.get_running_loop().time()
+        if restante <= 0:
+            if asyncio.iscoroutine(aw):
+                aw.close()
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(aw, restante)
+
+
+class ProteccionOpenAI:
+    """Semáforo, plazo por llamada y circuit breaker"""
+    
+    def __init__(
+        self,
+        max_concurrencia: int = 8,
+        espera_hueco: float = 2.0,
+        plazo: float = 15.0,
+        umbral_fallos: int = 5,
+        reapertura: float = 30.0
+    ):
+        self.max_concurrencia = max_concurrencia
+        self.espera_hueco = espera_hueco
+        self.plazo = plazo
+        self.circuito = Circuito(umbral_fallos, reapertura)
+        
+        self._semaforo = asyncio.Semaphore(max_concurrencia)
+        self._en_curso = 0
+        self._metricas: Dict[str, int] = {
+            "llamadas": 0,
+            "exitos": 0,
+            "fallos": 0,
+            "timeouts": 0,
+            "rechazadas_circuito": 0,
+            "rechazadas_saturacion": 0
+        }
+    
+    @asynccontextmanager
+    async def llamada(self) -> AsyncIterator[_Llamada]:
+        """
+        Reserva una llamada a OpenAI
+        
+        Uso:
+            async with proteccion.llamada() as llamada:
+                respuesta = await llamada.esperar(client.chat.completions.create(...))
+        
+        Raises:
+            OpenAINoDisponible: Circuito abierto o sin hueco a tiempo
+        """
+        if not self.circuito.permitir():
+            self._metricas["rechazadas_circuito"] += 1
+            raise OpenAINoDisponible("circuito abierto")
+        
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + self.plazo
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), min(self.espera_hueco, self.plazo))
+        except asyncio.TimeoutError:
+            self.circuito.abandono()
+            self._metricas["rechazadas_saturacion"] += 1
+            raise OpenAINoDisponible("sin hueco para llamar a OpenAI")
+        
+        self._metricas["llamadas"] += 1
+        self._en_curso += 1
+        try:
+            yield _Llamada(limite)
+        except FALLOS_SERVICIO as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self._metricas["timeouts"] += 1
+            self._metricas["fallos"] += 1
+            self.circuito.fallo()
+            raise
+        except BaseException:
+            # Errores de la petición o cancelación: no dicen nada de OpenAI
+            self.circuito.abandono()
+            raise
+        else:
+            self._metricas["exitos"] += 1
+            self.circuito.exito()
+        finally:
+            self._en_curso -= 1
+            self._semaforo.release()
+    
+    def metricas(self) -> Dict[str, Union[int, str]]:
+        """Llamadas, rechazos, timeouts y estado del circuito"""
+        return {
+            **self._metricas,
+            "en_curso": self._en_curso,
+            "max_concurrencia": self.max_concurrencia,
+            **{f"circuito_{k}": v for k, v in self.circuito.metricas().items()}
+        }
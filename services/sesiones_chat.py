@@ -0,0 +1,127 @@
+"""
+Almacén de sesiones del chatbot - LRU con TTL y tope de mensajes
+
+Sustituye al diccionario sin límite `conversaciones`: como mucho guarda
+`max_sesiones` sesiones, descarta las que llevan `ttl` segundos sin actividad
+y cada sesión conserva solo sus últimos `max_mensajes` turnos. Los turnos son
+tuplas (sin un dict por mensaje) y las sesiones usan __slots__.
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+import time
+
+
+class Turno(NamedTuple):
+    """Un mensaje de la conversación"""
+    rol: str  # user, assistant
+    contenido: str
+
+
+class Sesion:
+    """
+    Historial de una sesión
+    
+    `ultimo_id` y `propios` los usa la persistencia en BD: último id de
+    `conversaciones` incorporado y ids escritos por este proceso que aún no
+    ha visto una lectura incremental.
+    """
+    __slots__ = ("turnos", "ultimo_acceso", "ultimo_id", "propios")
+    
+    def __init__(self, max_mensajes: int):
+        self.turnos: Deque[Turno] = deque(maxlen=max_mensajes)
+        self.ultimo_acceso = time.monotonic()
+        self.ultimo_id = 0
+        self.propios: Set[int] = set()
+
+
+class AlmacenSesiones:
+    """
+    Sesiones de chat en memoria con expulsión LRU y caducidad por inactividad
+    
+    El OrderedDict se mantiene en orden de último acceso, así que tanto la
+    expulsión LRU como la purga por TTL empiezan por el principio y cuestan
+    O(1) amortizado por operación.
+    """
+    
+    def __init__(self, max_sesiones: int = 2000, ttl: float = 1800.0, max_mensajes: int = 20):
+        self.max_sesiones = max_sesiones
+        self.ttl = ttl
+        self.max_mensajes = max_mensajes
+        
+        self._sesiones: "OrderedDict[str, Sesion]" = OrderedDict()
+        self._stats: Dict[str, int] = {
+            "aciertos": 0,
+            "fallos": 0,
+            "expulsadas_lru": 0,
+            "caducadas_ttl": 0
+        }
+    
+    def __len__(self) -> int:
+        return len(self._sesiones)
+    
+    def __contains__(self, session_id: str) -> bool:
+        sesion = self._sesiones.get(session_id)
+        return sesion is not None and time.monotonic() - sesion.ultimo_acceso < self.ttl
+    
+    def _purgar_caducadas(self, ahora: float) -> None:
+        """Elimina desde el principio las sesiones inactivas más de `ttl`"""
+        while self._sesiones:
+            session_id, sesion = next(iter(self._sesiones.items()))
+            if ahora - sesion.ultimo_acceso < self.ttl:
+                break
+            del self._sesiones[session_id]
+            self._stats["caducadas_ttl"] += 1
+    
+    def obtener(self, session_id: str, crear: bool = True) -> Optional[Sesion]:
+        """
+        Devuelve la sesión marcándola como usada
+        
+        Args:
+            session_id: ID de la sesión
+            crear: Crear la sesión vacía si no existe
+        """
+        ahora = time.monotonic()
+        self._purgar_caducadas(ahora)
+        
+        sesion = self._sesiones.get(session_id)
+        if sesion is not None:
+            self._stats["aciertos"] += 1
+            self._sesiones.move_to_end(session_id)
+            sesion.ultimo_acceso = ahora
+            return sesion
+        
+        self._stats["fallos"] += 1
+        if not crear:
+            return None
+        
+        sesion = Sesion(self.max_mensajes)
+        self._sesiones[session_id] = sesion
+        while len(self._sesiones) > self.max_sesiones:
+            self._sesiones.popitem(last=False)
+            self._stats["expulsadas_lru"] += 1
+        return sesion
+    
+    def consultar(self, session_id: str) -> Optional[Sesion]:
+        """Devuelve la sesión sin marcarla como usada ni contar acierto/fallo"""
+        return self._sesiones.get(session_id)
+    
+    def historial(self, session_id: str) -> List[Turno]:
+        """Turnos guardados de la sesión (lista vacía si no existe)"""
+        sesion = self.obtener(session_id, crear=False)
+        return list(sesion.turnos) if sesion is not None else []
+    
+    def agregar(self, session_id: str, rol: str, contenido: str) -> None:
+        """Añade un turno; si se supera el tope se descarta el más antiguo"""
+        self.obtener(session_id).turnos.append(Turno(rol, contenido))
+    
+    def eliminar(self, session_id: str) -> None:
+        """Olvida una sesión"""
+        self._sesiones.pop(session_id, None)
+    
+    def estadisticas(self) -> Dict[str, int]:
+        """Aciertos, fallos, expulsiones y tamaño actual"""
+        return {
+            **self._stats,
+            "sesiones": len(self._sesiones),
+            "turnos": sum(len(s.turnos) for s in self._sesiones.values())
+        }
@@ -3,11 +3,21 @@ Servicio de Telegram - Equivalente al nodo de Telegram en n8n
 """
 import httpx
 from config import settings
+from typing import Dict, Optional
+import asyncio
+import itertools
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+# Prioridades de la cola de envío (menor = antes)
+PRIORIDAD_ALTA = 0     # Errores y alertas
+PRIORIDAD_NORMAL = 1   # Notificaciones de leads
+PRIORIDAD_BAJA = 2     # Informes periódicos
+
+
 class TelegramService:
     """Servicio para enviar notificaciones a Telegram"""
     
@@ -15,43 +25,169 @@ class TelegramService:
         self.bot_token = settings.telegram_bot_token
         self.chat_id = settings.telegram_chat_id
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.intervalo_chat = settings.telegram_intervalo_chat
+        self.max_reintentos = settings.telegram_max_reintentos
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cola: Optional[asyncio.PriorityQueue] = None
+        self._emisor: Optional[asyncio.Task] = None
+        self._secuencia = itertools.count()
+        self._siguiente_envio: Dict[str, float] = {}  # chat_id -> instante permitido
+        self._metricas: Dict[str, int] = {
+            "enviados": 0,
+            "errores": 0,
+            "limitados_429": 0
+        }
+    
+    @property
+    def configurado(self) -> bool:
+        """True si hay bot y chat configurados"""
+        return bool(self.bot_token and self.chat_id)
+    
+    # =============================================
+    # CICLO DE VIDA
+    # =============================================
+    
+    async def iniciar(self) -> None:
+        """Crea el cliente HTTP compartido y arranca el emisor de la cola"""
+        self._get_client()
+        if self._emisor is None or self._emisor.done():
+            self._cola = asyncio.PriorityQueue()
+            self._emisor = asyncio.create_task(self._procesar_cola(), name="telegram-emisor")
+    
+    async def cerrar(self) -> None:
+        """Detiene el emisor y cierra el cliente HTTP"""
+        if self._emisor is not None:
+            self._emisor.cancel()
+            await asyncio.gather(self._emisor, return_exceptions=True)
+            self._emisor = None
+        
+        # Lo que quede en cola no se enviará
+        while self._cola is not None and not self._cola.empty():
+            *_, futuro = self._cola.get_nowait()
+            if not futuro.done():
+                futuro.set_result(False)
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente keep-alive compartido por todos los envíos"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.telegram_timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=settings.telegram_max_conexiones,
+                    max_keepalive_connections=settings.telegram_max_conexiones
+                )
+            )
+        return self._client
+    
+    def metricas(self) -> Dict[str, int]:
+        """Contadores de envío y tamaño de la cola"""
+        en_cola = self._cola.qsize() if self._cola is not None else 0
+        return {**self._metricas, "en_cola": en_cola}
+    
+    # =============================================
+    # ENVÍO
+    # =============================================
     
-    async def enviar_mensaje(self, mensaje: str, parse_mode: str = "HTML") -> bool:
+    async def enviar_mensaje(
+        self,
+        mensaje: str,
+        parse_mode: str = "HTML",
+        prioridad: int = PRIORIDAD_NORMAL
+    ) -> bool:
         """
         Envía un mensaje a Telegram
         
+        El mensaje pasa por una cola con prioridad que respeta el límite por
+        chat de Telegram y el retry_after de las respuestas 429.
+        
         Args:
             mensaje: Texto del mensaje (puede incluir HTML)
             parse_mode: Formato del mensaje (HTML o Markdown)
+            prioridad: PRIORIDAD_ALTA, PRIORIDAD_NORMAL o PRIORIDAD_BAJA
         
         Returns:
             bool: True si se envió correctamente
         """
-        if not self.bot_token or not self.chat_id:
+        if not self.configurado:
             logger.warning("Telegram no configurado")
             return False
         
+        await self.iniciar()
+        
+        futuro = asyncio.get_running_loop().create_future()
+        payload = {
+            "chat_id": self.chat_id,
+            "text": mensaje,
+            "parse_mode": parse_mode
+        }
+        await self._cola.put((prioridad, next(self._secuencia), 0, payload, futuro))
+        return await futuro
+    
+    async def _procesar_cola(self) -> None:
+        """Emisor único: saca mensajes por prioridad y los envía a su ritmo"""
+        while True:
+            prioridad, secuencia, intentos, payload, futuro = await self._cola.get()
+            chat_id = str(payload["chat_id"])
+            
+            # Respetar el intervalo mínimo (o el retry_after) de este chat
+            espera = self._siguiente_envio.get(chat_id, 0.0) - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            
+            retry_after = await self._enviar(payload, futuro)
+            self._siguiente_envio[chat_id] = time.monotonic() + max(
+                self.intervalo_chat, retry_after or 0
+            )
+            
+            if retry_after is not None:
+                if intentos < self.max_reintentos:
+                    # Volver a la cola con su prioridad y orden originales
+                    await self._cola.put((prioridad, secuencia, intentos + 1, payload, futuro))
+                elif not futuro.done():
+                    futuro.set_result(False)
+    
+    async def _enviar(self, payload: dict, futuro: asyncio.Future) -> Optional[float]:
+        """
+        Hace la llamada a sendMessage y resuelve el futuro
+        
+        Returns:
+            Segundos a esperar si Telegram respondió 429 (el futuro queda pendiente)
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": mensaje,
-                        "parse_mode": parse_mode
-                    }
-                )
+            response = await self._get_client().post("/sendMessage", json=payload)
+            
+            if response.status_code == 429:
+                self._metricas["limitados_429"] += 1
+                try:
+                    retry_after = float(response.json()["parameters"]["retry_after"])
+                except (ValueError, KeyError, TypeError):
+                    retry_after = float(response.headers.get("retry-after", 1))
+                logger.warning(f"Telegram 429, reintentando en {retry_after}s")
+                return retry_after
+            
+            if response.status_code == 200:
+                self._metricas["enviados"] += 1
+                logger.info("Mensaje de Telegram enviado")
+                resultado = True
+            else:
+                self._metricas["errores"] += 1
+                logger.error(f"Error Telegram: {response.text}")
+                resultado = False
                 
-                if response.status_code == 200:
-                    logger.info("Mensaje de Telegram enviado")
-                    return True
-                else:
-                    logger.error(f"Error Telegram: {response.text}")
-                    return False
-                    
         except Exception as e:
+            self._metricas["errores"] += 1
             logger.error(f"Error enviando a Telegram: {e}")
-            return False
+            resultado = False
+        
+        if not futuro.done():
+            futuro.set_result(resultado)
+        return None
     
     async def notificar_nuevo_lead(self, lead_data: dict) -> bool:
         """
@@ -85,7 +221,7 @@ class TelegramService:
 📋 <b>Contexto:</b> {contexto}
         """
         
-        return await self.enviar_mensaje(mensaje.strip())
+        return await self.enviar_mensaje(mensaje.strip(), prioridad=PRIORIDAD_ALTA)
 
 
 # Instancia singleton
@@ -47,7 +47,7 @@ async function sendMessage() {
     showTyping();
 
     try {
-        const response = await fetch('/api/chat/', {
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -58,22 +58,37 @@ async function sendMessage() {
             })
         });
 
-        const data = await response.json();
+        if (response.status === 429) {
+            hideTyping();
+            addMessage('Estás enviando muchos mensajes seguidos. Espera unos segundos y vuelve a intentarlo 🙏', 'bot');
+            return;
+        }
 
-        // Ocultar indicador de escritura
-        hideTyping();
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP ${response.status}`);
+        }
 
-        if (data.respuesta) {
-            addMessage(data.respuesta, 'bot');
-            if (data.session_id) {
+        // La respuesta llega como Server-Sent Events: se pinta token a token
+        let messageDiv = null;
+        await readEventStream(response, (evento, data) => {
+            if (evento === 'inicio' && data.session_id) {
                 chatSessionId = data.session_id;
+            } else if (evento === 'token') {
+                if (!messageDiv) {
+                    // Ocultar indicador de escritura con el primer token
+                    hideTyping();
+                    messageDiv = addMessage('', 'bot');
+                }
+                appendToMessage(messageDiv, data.texto);
+            } else if (evento === 'fin') {
+                // Mostrar sugerencias si las hay
+                if (data.sugerencias && data.sugerencias.length > 0) {
+                    addSuggestions(data.sugerencias);
+                }
             }
+        });
 
-            // Mostrar sugerencias si las hay
-            if (data.sugerencias && data.sugerencias.length > 0) {
-                addSuggestions(data.sugerencias);
-            }
-        }
+        hideTyping();
     } catch (error) {
         hideTyping();
         addMessage('Lo siento, ha ocurrido un error. ¿Puedes intentarlo de nuevo? 💜', 'bot');
@@ -81,6 +96,40 @@ async function sendMessage() {
     }
 }
 
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // Cada evento termina con una línea en blanco
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            let evento = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    evento = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+
+            if (data) {
+                onEvent(evento, JSON.parse(data));
+            }
+        }
+    }
+}
+
 function addMessage(text, type) {
     const messagesContainer = document.getElementById('chat-messages');
     const messageDiv = document.createElement('div');
@@ -88,6 +137,13 @@ function addMessage(text, type) {
     messageDiv.textContent = text;
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    return messageDiv;
+}
+
+function appendToMessage(messageDiv, text) {
+    const messagesContainer = document.getElementById('chat-messages');
+    messageDiv.textContent += text;
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
 
 function showTyping() {
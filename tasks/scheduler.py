@@ -12,6 +12,7 @@ import logging
 from database import AsyncSessionLocal
 from models import Lead, SolicitudResena
 from services import email_service, telegram_service
+from services.telegram_service import PRIORIDAD_ALTA, PRIORIDAD_BAJA
 
 logger = logging.getLogger(__name__)
 
@@ -62,8 +63,8 @@ async def tarea_informe_diario():
         
         mensaje += f"\n⏰ Generado: {datetime.now().strftime('%H:%M')}"
         
-        # Enviar por Telegram
-        await telegram_service.enviar_mensaje(mensaje)
+        # Enviar por Telegram (los informes ceden el paso a leads y alertas)
+        await telegram_service.enviar_mensaje(mensaje, prioridad=PRIORIDAD_BAJA)
         
         logger.info(f"Informe diario enviado: {len(leads_hoy)} leads")
 
@@ -179,7 +180,7 @@ Los siguientes leads llevan más de 24 horas sin respuesta:
             if len(leads_pendientes) > 10:
                 mensaje += f"\n... y {len(leads_pendientes) - 10} más"
             
-            await telegram_service.enviar_mensaje(mensaje)
+            await telegram_service.enviar_mensaje(mensaje, prioridad=PRIORIDAD_ALTA)
             
         logger.info(f"Leads pendientes: {len(leads_pendientes)}")
 
@@ -190,7 +191,8 @@ Los siguientes leads llevan más de 24 horas sin respuesta:
 
 async def tarea_limpieza():
     """
-    Limpia conversaciones del chatbot antiguas (más de 7 días)
+    Limpia conversaciones del chatbot antiguas (más de 7 días) y las
+    notificaciones del outbox ya resueltas (OUTBOX_RETENCION_DIAS)
     Se ejecuta cada domingo a las 03:00
     """
     logger.info("Ejecutando tarea: Limpieza de datos")
@@ -206,6 +208,11 @@ async def tarea_limpieza():
         await db.commit()
         
         logger.info(f"Conversaciones eliminadas: {result.rowcount}")
+    
+    from services.outbox_service import outbox_service
+    
+    notificaciones = await outbox_service.purgar()
+    logger.info(f"Notificaciones del outbox eliminadas: {notificaciones}")
 
 
 # =============================================